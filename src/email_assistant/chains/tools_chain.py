@@ -1,6 +1,7 @@
 from langchain.chat_models import init_chat_model
 
 from email_assistant.config import USE_GMAIL
+from email_assistant.prompt_assembly import track_prompt_cache
 from email_assistant.tools import get_tools
 from src.email_assistant.chains import wx_credentials
 
@@ -32,5 +33,7 @@ elif model_name.startswith("ollama:"):
 else:
     raise ValueError(f"Unknown model: {model_name}")
 
+# Cached input tokens of the agent calls, see prompt_assembly.py
+llm = track_prompt_cache(llm, "agent")
 
 llm_with_tools = llm.bind_tools(tools, tool_choice=tool_choice)
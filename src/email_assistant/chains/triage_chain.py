@@ -3,6 +3,8 @@ from typing import Literal
 from langchain.chat_models import init_chat_model
 from pydantic import BaseModel, Field
 
+from email_assistant.prompt_assembly import track_prompt_cache
+from email_assistant.schemas import BatchRouterSchema, StreamingRouterSchema
 from src.email_assistant.chains import wx_credentials
 
 
@@ -23,18 +25,29 @@ model_name = "openai:gpt-4.1"
 # model_name = "ollama:granite3.3:8b"
 # model_name = "ollama:gpt-oss:20b"
 
-# Initialize the LLM for use with router / structured output
-if model_name.startswith("ibm:"):
-    from ibm_watsonx_ai.foundation_models.schema import TextChatParameters
 
-    params = TextChatParameters(max_tokens=100, temperature=0.0, seed=122)
-    llm = init_chat_model(model=model_name, params=params, **wx_credentials)
-elif model_name.startswith("openai:"):
-    llm = init_chat_model(model=model_name, temperature=0.0)
-elif model_name.startswith("ollama:"):
-    llm = init_chat_model(model=model_name, temperature=0.0, seed=122, num_predict=100)
-else:
-    raise ValueError(f"Unknown model: {model_name}")
+def init_triage_llm(name: str):
+    """Initialize a chat model for the router / structured output from its ``provider:model`` name."""
+    if name.startswith("ibm:"):
+        from ibm_watsonx_ai.foundation_models.schema import TextChatParameters
+
+        params = TextChatParameters(max_tokens=100, temperature=0.0, seed=122)
+        return init_chat_model(model=name, params=params, **wx_credentials)
+    elif name.startswith("openai:"):
+        return init_chat_model(model=name, temperature=0.0)
+    elif name.startswith("ollama:"):
+        return init_chat_model(model=name, temperature=0.0, seed=122, num_predict=100)
+    else:
+        raise ValueError(f"Unknown model: {name}")
+
 
+# Initialize the LLM for use with router / structured output
+llm = track_prompt_cache(init_triage_llm(model_name), "triage")
 
 llm_router = llm.with_config({"tags": ["triage_decision"]}).with_structured_output(RouterSchema)
+
+# One structured-output call classifying a batch of emails, see triage/batch.py
+llm_batch_router = llm.with_config({"tags": ["triage_decision"]}).with_structured_output(BatchRouterSchema)
+
+# Classification streamed before the reasoning, see triage/streaming.py
+llm_streaming_router = llm.with_config({"tags": ["triage_decision"]}).with_structured_output(StreamingRouterSchema)
@@ -2,7 +2,16 @@ from dataclasses import dataclass
 
 from langgraph.graph import StateGraph
 
+from email_assistant.tools.gmail.admission import (
+    DEFAULT_BACKLOG_PROBE_INTERVAL,
+    DEFAULT_MAX_ADMISSION_DELAY,
+)
+from email_assistant.tools.gmail.langgraph_client import (
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+)
 from email_assistant.tools.gmail.run_ingest import fetch_and_process_emails
+from email_assistant.triage.batch import TRIAGE_BATCH_MAX_WAIT
 
 
 @dataclass(kw_only=True)
@@ -17,6 +26,18 @@ class JobKickoff:
     rerun: bool = False
     early: bool = False
     skip_filters: bool = False
+    incremental: bool = False
+    ledger: str = "sqlite"
+    ledger_path: str | None = None
+    concurrency: int = 1
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+    max_pending_runs: int = 0
+    resume_pending_runs: int | None = None
+    max_admission_delay: float = DEFAULT_MAX_ADMISSION_DELAY
+    backlog_probe_interval: float = DEFAULT_BACKLOG_PROBE_INTERVAL
+    batch_triage: int = 0
+    batch_triage_wait: float = TRIAGE_BATCH_MAX_WAIT
 
 
 async def main(state: JobKickoff):
@@ -43,6 +64,18 @@ async def main(state: JobKickoff):
             rerun=state.rerun,
             early=state.early,
             skip_filters=state.skip_filters,
+            incremental=state.incremental,
+            ledger=state.ledger,
+            ledger_path=state.ledger_path,
+            concurrency=state.concurrency,
+            max_connections=state.max_connections,
+            max_keepalive_connections=state.max_keepalive_connections,
+            max_pending_runs=state.max_pending_runs,
+            resume_pending_runs=state.resume_pending_runs,
+            max_admission_delay=state.max_admission_delay,
+            backlog_probe_interval=state.backlog_probe_interval,
+            batch_triage=state.batch_triage,
+            batch_triage_wait=state.batch_triage_wait,
         )
 
         # Print email and URL to verify they're being passed correctly
@@ -0,0 +1,229 @@
+"""Benchmark of ingestion admission control against a LangGraph server with a bounded run capacity.
+
+A local stub of the LangGraph server API executes runs in FIFO order on a fixed number of
+workers. An inbox burst is ingested with ``ingest_email_to_langgraph`` while an interactive user
+submits a run of another graph at a steady pace, standing in for the human-in-the-loop runs
+waiting behind the burst. Without admission control the whole burst is queued at once; with it
+the backlog stays near the watermarks and the interactive runs keep a short latency, at the cost
+of the throttled time reported for the ingestion.
+
+Usage:
+    python -m email_assistant.eval.benchmark_admission --emails 200 --workers 2 --run-seconds 0.1 --max-pending-runs 8
+"""
+
+import argparse
+import asyncio
+import collections
+import contextlib
+import io
+import json
+import logging
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.admission import AdmissionController, RunBacklogProbe
+from email_assistant.tools.gmail.ingest_stats import IngestStats, percentile
+from email_assistant.tools.gmail.langgraph_client import pooled_langgraph_client
+from email_assistant.tools.gmail.run_ingest import ingest_email_to_langgraph
+
+INGEST_GRAPH = "email_assistant_hitl"
+INTERACTIVE_GRAPH = "interactive"
+
+
+class StubRunQueueServer(ThreadingHTTPServer):
+    """LangGraph server stub running the submitted runs in FIFO order on ``workers`` workers."""
+
+    daemon_threads = True
+
+    def __init__(self, workers: int, run_seconds: float):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.run_seconds = run_seconds
+        self.queue = collections.deque()
+        self.busy = collections.Counter()
+        self.thread_graphs = {}
+        self.latencies = collections.defaultdict(list)
+        self.max_backlog = 0
+        self._condition = threading.Condition()
+        for idx in range(workers):
+            threading.Thread(target=self._work, name=f"stub-worker-{idx}", daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def submit(self, thread_id: str, graph: str):
+        """Queue a run of ``graph`` on a thread, marking the thread busy until a worker completes it."""
+        with self._condition:
+            self.queue.append((thread_id, graph, time.perf_counter()))
+            self.busy[thread_id] += 1
+            self.thread_graphs[thread_id] = graph
+            self.max_backlog = max(self.max_backlog, sum(1 for t in self.busy if self.thread_graphs[t] == graph))
+            self._condition.notify()
+
+    def busy_threads(self, graph: str, limit: int):
+        """Return the busy threads of ``graph``, as the thread search endpoint does."""
+        with self._condition:
+            threads = [t for t, count in self.busy.items() if count and self.thread_graphs[t] == graph]
+        return [{"thread_id": t, "status": "busy", "metadata": {"graph_id": graph}} for t in threads[:limit]]
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self.queue:
+                    self._condition.wait()
+                thread_id, graph, submitted = self.queue.popleft()
+            time.sleep(self.run_seconds)
+            with self._condition:
+                self.busy[thread_id] -= 1
+                if not self.busy[thread_id]:
+                    del self.busy[thread_id]
+                self.latencies[graph].append(time.perf_counter() - submitted)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length)) if length else {}
+
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts == ["threads", "search"]:
+            graph = (request.get("metadata") or {}).get("graph_id", INGEST_GRAPH)
+            body = self.server.busy_threads(graph, request.get("limit", 10))
+        elif parts[-1] == "runs" and self.command == "POST":
+            self.server.submit(parts[1], request["assistant_id"])
+            body = {"run_id": str(uuid.uuid4()), "thread_id": parts[1], "status": "pending"}
+        elif parts[-1] == "runs":
+            body = []
+        else:
+            body = {"thread_id": parts[1] if len(parts) > 1 else request.get("thread_id"), "metadata": {}}
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+
+def _email(idx: int) -> dict:
+    return {
+        "id": f"msg{idx:06d}",
+        "thread_id": f"thread{idx:06d}",
+        "from_email": "sender@example.com",
+        "to_email": "agentic@gmail.com",
+        "subject": f"Burst email {idx}",
+        "page_content": "Hello, can we meet next week?",
+    }
+
+
+async def run_case(args, high_watermark: int) -> dict:
+    """Ingest a burst while an interactive user submits runs, with admission control if ``high_watermark``."""
+    server = StubRunQueueServer(args.workers, args.run_seconds)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stats = IngestStats()
+
+    try:
+        async with pooled_langgraph_client(server.url) as client:
+            admission = None
+            if high_watermark:
+                probe = RunBacklogProbe(client, INGEST_GRAPH, limit=high_watermark + 1)
+                admission = AdmissionController(
+                    probe, high_watermark, max_delay=args.max_delay, probe_interval=args.probe_interval
+                )
+            semaphore = asyncio.Semaphore(args.concurrency)
+            ingesting = True
+
+            async def ingest(idx: int):
+                async with semaphore:
+                    await ingest_email_to_langgraph(
+                        _email(idx), INGEST_GRAPH, stats=stats, client=client, admission=admission
+                    )
+                    stats.ingested += 1
+
+            async def interactive_user():
+                idx = 0
+                while ingesting:
+                    await client.runs.create(f"user{idx}", INTERACTIVE_GRAPH, input={})
+                    idx += 1
+                    await asyncio.sleep(args.interactive_interval)
+
+            user = asyncio.create_task(interactive_user())
+            # ingest_email_to_langgraph reports progress with print, keep the benchmark output readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                await asyncio.gather(*(ingest(idx) for idx in range(args.emails)))
+            stats.finish()
+            ingesting = False
+            await user
+
+        # Let the queued runs finish so every latency is recorded
+        while server.queue or server.busy:
+            await asyncio.sleep(0.05)
+    finally:
+        server.shutdown()
+
+    interactive = server.latencies[INTERACTIVE_GRAPH]
+    return {
+        "submit_s": stats.elapsed,
+        "throttled_s": admission.throttled_seconds if admission else 0.0,
+        "max_backlog": server.max_backlog,
+        "interactive_runs": len(interactive),
+        "interactive_p50_ms": 1000 * percentile(interactive, 50),
+        "interactive_p95_ms": 1000 * percentile(interactive, 95),
+        "admission": admission.summary() if admission else None,
+    }
+
+
+async def main_async(args):
+    """Run the benchmark with the parsed command-line arguments."""
+    results = {
+        "unthrottled": await run_case(args, 0),
+        f"admission<={args.max_pending_runs}": await run_case(args, args.max_pending_runs),
+    }
+
+    capacity = args.workers / args.run_seconds
+    print(f"{args.emails} emails, server capacity {capacity:.0f} runs/s, interactive run every {args.interactive_interval}s")
+    print(
+        f"{'mode':<16}{'submit s':>10}{'throttled s':>13}{'max backlog':>13}{'interactive':>13}"
+        f"{'p50 ms':>10}{'p95 ms':>10}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<16}{result['submit_s']:>10.2f}{result['throttled_s']:>13.2f}{result['max_backlog']:>13}"
+            f"{result['interactive_runs']:>13}{result['interactive_p50_ms']:>10.0f}{result['interactive_p95_ms']:>10.0f}"
+        )
+    for name, result in results.items():
+        if result["admission"]:
+            print(f"{name}: {result['admission']}")
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark ingestion with and without admission control")
+    parser.add_argument("--emails", type=int, default=200, help="Number of emails in the burst")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of emails ingested concurrently")
+    parser.add_argument("--workers", type=int, default=2, help="Runs executed at the same time by the stub server")
+    parser.add_argument("--run-seconds", type=float, default=0.1, help="Duration of one run on the stub server")
+    parser.add_argument("--max-pending-runs", type=int, default=8, help="High watermark of the admission control")
+    parser.add_argument("--max-delay", type=float, default=0.2, help="Admission delay just below the high watermark")
+    parser.add_argument("--probe-interval", type=float, default=0.1, help="Seconds between backlog probes")
+    parser.add_argument("--interactive-interval", type=float, default=0.1, help="Seconds between interactive runs")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
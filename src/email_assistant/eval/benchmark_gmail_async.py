@@ -0,0 +1,208 @@
+"""Concurrency benchmark of the Gmail and Calendar tools under many simultaneous graph runs.
+
+Every simulated run checks the calendar, replies to an email, schedules a meeting and marks the
+email as read (5 Google API calls) against a local HTTP stub of the Gmail and Calendar APIs with
+a configurable latency. The blocking mode calls the synchronous helpers directly from the
+coroutines, as a blocking tool does inside an async node; the async mode awaits the tools, which
+run the calls in the bounded Gmail executor. A heartbeat task measures how long the event loop
+was stalled.
+
+Usage:
+    python -m email_assistant.eval.benchmark_gmail_async --runs 50 --latency 0.05 --workers 8
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.oauth2.credentials import Credentials
+
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.async_gmail import configure_gmail_executor
+from email_assistant.tools.gmail.gmail_tools import (
+    amark_as_read,
+    check_calendar_tool,
+    get_calendar_events,
+    mark_as_read,
+    schedule_meeting_tool,
+    send_calendar_invite,
+    send_email,
+    send_email_tool,
+)
+from email_assistant.tools.gmail.ingest_stats import percentile
+from email_assistant.tools.gmail.service_factory import (
+    GoogleServiceFactory,
+    set_service_factory,
+)
+
+
+class StubGoogleApiServer(ThreadingHTTPServer):
+    """Local stand-in for the Gmail and Calendar REST endpoints used by the tools."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        with self.server._lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/events"):
+            body = {"items": []} if self.command == "GET" else {"htmlLink": "http://stub/event"}
+        elif path.endswith("/send"):
+            body = {"id": "sent-message"}
+        elif path.endswith("/modify"):
+            body = {"id": path.split("/")[-2], "labelIds": ["INBOX"]}
+        else:
+            body = {
+                "id": path.split("/")[-1],
+                "threadId": "stub-thread",
+                "payload": {
+                    "headers": [
+                        {"name": "Subject", "value": "Quarterly planning"},
+                        {"name": "From", "value": "alice@example.com"},
+                    ]
+                },
+            }
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = _reply
+
+
+_MEETING = {
+    "attendees": ["alice@example.com", "agentic@gmail.com"],
+    "title": "Quarterly planning",
+    "start_time": "2025-08-12T14:00:00",
+    "end_time": "2025-08-12T14:30:00",
+    "organizer_email": "agentic@gmail.com",
+    "timezone": "America/Toronto",
+}
+
+
+async def blocking_run(idx: int):
+    """Run the tool calls of one graph run with blocking calls on the event loop."""
+    email_id = f"msg{idx}"
+    get_calendar_events(["12-08-2025"])
+    send_email(email_id, "Sounds good, see you then.", "agentic@gmail.com")
+    send_calendar_invite(**_MEETING)
+    mark_as_read(email_id)
+
+
+async def async_run(idx: int):
+    """Run the tool calls of one graph run as coroutines."""
+    email_id = f"msg{idx}"
+    await check_calendar_tool.ainvoke({"dates": ["12-08-2025"]})
+    await send_email_tool.ainvoke(
+        {"email_id": email_id, "response_text": "Sounds good, see you then.", "email_address": "agentic@gmail.com"}
+    )
+    await schedule_meeting_tool.ainvoke(_MEETING)
+    await amark_as_read(email_id)
+
+
+async def run_case(run, runs: int, interval: float = 0.01) -> dict:
+    """Start ``runs`` simultaneous runs while a heartbeat measures the event loop lag."""
+    lags = []
+    finished = asyncio.Event()
+
+    async def heartbeat():
+        while not finished.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    monitor = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    await asyncio.gather(*(run(idx) for idx in range(runs)))
+    elapsed = time.perf_counter() - start
+    finished.set()
+    await monitor
+
+    return {
+        "seconds": elapsed,
+        "runs_per_s": runs / elapsed,
+        "lag_p50_ms": 1000 * percentile(lags, 50),
+        "lag_p95_ms": 1000 * percentile(lags, 95),
+        "lag_max_ms": 1000 * max(lags, default=0.0),
+    }
+
+
+async def main_async(args):
+    """Run the benchmark with the parsed command-line arguments."""
+    server = StubGoogleApiServer(latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    credentials = Credentials(token="stub-token")
+    set_service_factory(
+        GoogleServiceFactory(
+            lambda gmail_token, gmail_secret: credentials,
+            api_endpoints={"gmail": server.url, "calendar": server.url},
+        )
+    )
+    configure_gmail_executor(args.workers)
+
+    results = {}
+    try:
+        # send_email prints the outgoing message, keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["blocking"] = await run_case(blocking_run, args.runs)
+            results["async"] = await run_case(async_run, args.runs)
+    finally:
+        server.shutdown()
+
+    print(f"{args.runs} simultaneous runs, 5 API calls each, {1000 * args.latency:.0f} ms per call, {args.workers} workers")
+    print(f"{'mode':<10}{'seconds':>9}{'runs/s':>9}{'loop lag p50 ms':>17}{'p95 ms':>9}{'max ms':>9}")
+    for name, result in results.items():
+        print(
+            f"{name:<10}{result['seconds']:>9.2f}{result['runs_per_s']:>9.1f}{result['lag_p50_ms']:>17.1f}"
+            f"{result['lag_p95_ms']:>9.1f}{result['lag_max_ms']:>9.1f}"
+        )
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs async Gmail tools under concurrent runs")
+    parser.add_argument("--runs", type=int, default=50, help="Number of simultaneous graph runs")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server latency per API call in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads of the Gmail executor")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
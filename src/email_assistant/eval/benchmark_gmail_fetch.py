@@ -0,0 +1,88 @@
+"""Benchmark the Gmail retrieval paths of ``iter_group_emails`` against recorded API fixtures.
+
+Compares the serial loop (one messages().get and one threads().get per matched message) with
+the batched path (Gmail batch HTTP requests of up to 100 sub-requests), and the batched path with
+the next search result page listed ahead while the current one is processed. The time to the
+first yielded email shows the effect of processing result pages as a stream.
+
+Usage:
+    python -m email_assistant.eval.benchmark_gmail_fetch --copies 60 --latency 0.05
+"""
+
+import argparse
+import logging
+import time
+
+from email_assistant.eval.gmail_stub import StubGmailService, StubMailbox, StubTransport
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.gmail_tools import (
+    GMAIL_BATCH_MAX_REQUESTS,
+    ThreadCache,
+    iter_group_emails,
+)
+
+
+def run_case(mailbox: StubMailbox, latency: float, **kwargs) -> dict:
+    """Fetch all emails from the stub mailbox and collect timing and request counts."""
+    transport = StubTransport(round_trip_latency=latency)
+    service = StubGmailService(mailbox, transport)
+    thread_cache = ThreadCache(mailbox.email_address)
+
+    start = time.perf_counter()
+    first_email = None
+    emails = []
+    for email in iter_group_emails(service, mailbox.email_address, minutes_since=60, thread_cache=thread_cache, **kwargs):
+        if first_email is None:
+            first_email = time.perf_counter() - start
+        emails.append(email)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "emails": len(emails),
+        "ids": [email["id"] for email in emails],
+        "http_requests": transport.http_requests,
+        "api_calls": transport.api_calls,
+        "bytes_downloaded": transport.bytes_downloaded,
+        "cache_hits": thread_cache.hits,
+        "cache_misses": thread_cache.misses,
+        "first_email_seconds": first_email or 0.0,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark serial, batched and prefetched Gmail retrieval")
+    parser.add_argument("--copies", type=int, default=60, help="Number of copies of the fixture mailbox")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated HTTP round trip latency in seconds")
+    parser.add_argument("--batch-size", type=int, default=GMAIL_BATCH_MAX_REQUESTS, help="Sub-requests per batch")
+    parser.add_argument("--prefetch-pages", type=int, default=1, help="Result pages listed ahead in prefetch mode")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    mailbox = StubMailbox.from_fixtures(copies=args.copies)
+    print(f"Mailbox with {len(mailbox.messages)} messages in {len(mailbox.threads)} threads")
+
+    serial = run_case(mailbox, args.latency)
+    batched = run_case(mailbox, args.latency, use_batch=True, batch_size=args.batch_size)
+    prefetched = run_case(
+        mailbox, args.latency, use_batch=True, batch_size=args.batch_size, prefetch_pages=args.prefetch_pages
+    )
+    assert serial["ids"] == batched["ids"], "Batched retrieval must yield the same emails as the serial loop"
+    assert serial["ids"] == prefetched["ids"], "Prefetched retrieval must yield the same emails as the serial loop"
+
+    print(
+        f"{'mode':<10}{'emails':>8}{'http requests':>15}{'api calls':>11}{'thread hits/misses':>20}"
+        f"{'kB downloaded':>15}{'first email s':>15}{'seconds':>10}"
+    )
+    for name, result in (("serial", serial), ("batched", batched), ("prefetch", prefetched)):
+        cache = f"{result['cache_hits']}/{result['cache_misses']}"
+        print(
+            f"{name:<10}{result['emails']:>8}{result['http_requests']:>15}{result['api_calls']:>11}{cache:>20}"
+            f"{result['bytes_downloaded'] / 1024:>15.1f}{result['first_email_seconds']:>15.2f}{result['seconds']:>10.2f}"
+        )
+    print(f"Speedup: {serial['seconds'] / batched['seconds']:.1f}x batched, {serial['seconds'] / prefetched['seconds']:.1f}x prefetch")
+
+
+if __name__ == "__main__":
+    main()
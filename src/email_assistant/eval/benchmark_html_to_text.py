@@ -0,0 +1,100 @@
+"""Benchmark of the HTML to text conversion of ``format_gmail_markdown`` on large marketing emails.
+
+A HITL run formats the same email body once in the triage router, once per tool call in the
+interrupt handler and once more in the triage interrupt handler. The benchmark times one
+conversion per backend, then the formatting of a whole run with and without the conversion cache,
+on synthetic marketing emails of growing size (nested layout tables, inline styles, tracking
+images, many links and entities).
+
+Usage:
+    python -m email_assistant.eval.benchmark_html_to_text --sizes 50 200 500 --calls-per-run 5
+"""
+
+import argparse
+import statistics
+import time
+
+from email_assistant import html_text
+from email_assistant.html_text import BACKENDS, html_text_cache
+from email_assistant.utils import format_gmail_markdown
+
+_STYLE = "<style>" + "".join(f".c{i}{{color:#{i:03x};padding:{i % 9}px}}" for i in range(200)) + "</style>"
+
+
+def marketing_email(target_kb: int) -> str:
+    """Return a newsletter-like HTML email of about ``target_kb`` KiB."""
+    blocks = []
+    size, idx = 0, 0
+    while size < target_kb * 1024:
+        block = (
+            f'<tr><td class="c{idx % 200}" style="padding:12px;font-family:Helvetica,Arial,sans-serif">'
+            f'<table role="presentation" width="100%" cellpadding="0" cellspacing="0"><tr>'
+            f'<td width="120"><img src="https://cdn.example.com/p/{idx}.jpg" alt="Product {idx}" width="120"></td>'
+            f'<td><h3 style="margin:0">Deal #{idx} &ndash; 30% off &amp; free shipping</h3>'
+            f"<p>Don&#39;t miss our <b>limited</b> offer on item {idx}. Prices valid until Sunday, "
+            f"while stocks last.&nbsp;Terms apply.</p>"
+            f'<a href="https://click.example.com/track?u=abc&amp;i={idx}" style="color:#0066cc">Shop now</a>'
+            f"</td></tr></table></td></tr>"
+        )
+        blocks.append(block)
+        size += len(block)
+        idx += 1
+    footer = (
+        '<tr><td><p style="font-size:10px">You received this email because you subscribed. '
+        '<a href="https://example.com/unsubscribe?u=abc">Unsubscribe</a></p>'
+        '<img src="https://track.example.com/open.gif" width="1" height="1"></td></tr>'
+    )
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Weekly deals</title>{_STYLE}</head>'
+        f'<body><center><table width="600" align="center">{"".join(blocks)}{footer}</table></center></body></html>'
+    )
+
+
+def _timed(fn, repeat: int) -> float:
+    """Return the median duration of ``fn`` in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return 1000 * statistics.median(durations)
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the HTML to text backends and cache")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500], help="Email sizes in KiB")
+    parser.add_argument("--calls-per-run", type=int, default=5, help="format_gmail_markdown calls per graph run")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of each measurement")
+    args = parser.parse_args()
+
+    print(
+        f"{'size KiB':>9}{'backend':>11}{'text KiB':>10}{'convert ms':>12}"
+        f"{'run uncached ms':>17}{'run cached ms':>15}{'speedup':>9}"
+    )
+    for size in args.sizes:
+        email = marketing_email(size)
+        for backend in BACKENDS:
+            text = html_text.html_to_text(email, backend=backend)
+            convert_ms = _timed(lambda: BACKENDS[backend](email), args.repeat)
+
+            def run():
+                # Every run of the graph starts with a cold cache for a new email
+                html_text_cache.clear()
+                for _ in range(args.calls_per_run):
+                    format_gmail_markdown("Weekly deals", "deals@example.com", "me@example.com", email, "id", backend)
+
+            maxsize = html_text_cache.maxsize
+            html_text_cache.maxsize = 0
+            uncached_ms = _timed(run, args.repeat)
+            html_text_cache.maxsize = maxsize
+            cached_ms = _timed(run, args.repeat)
+
+            print(
+                f"{len(email) // 1024:>9}{backend:>11}{len(text) // 1024:>10}{convert_ms:>12.1f}"
+                f"{uncached_ms:>17.1f}{cached_ms:>15.1f}{uncached_ms / cached_ms:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
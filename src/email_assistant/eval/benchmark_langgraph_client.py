@@ -0,0 +1,163 @@
+"""Micro-benchmark of the per-email LangGraph client overhead of ``ingest_email_to_langgraph``.
+
+Compares creating a new client with ``get_client`` for every email (new httpx client, new TCP
+connections) with one pooled keep-alive client shared by the whole run. The emails are sent to a
+local stub of the LangGraph server API, so the numbers only reflect client and connection cost.
+``--connect-latency`` adds a delay to every new connection to model a TLS handshake over a WAN.
+
+Usage:
+    python -m email_assistant.eval.benchmark_langgraph_client --emails 200 --connect-latency 0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from email_assistant.tools.gmail.ingest_stats import IngestStats
+from email_assistant.tools.gmail.langgraph_client import pooled_langgraph_client
+from email_assistant.tools.gmail.run_ingest import ingest_email_to_langgraph
+
+
+class StubLangGraphServer(ThreadingHTTPServer):
+    """Minimal HTTP/1.1 keep-alive server answering the thread and run endpoints used by ingestion."""
+
+    daemon_threads = True
+
+    def __init__(self, connect_latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self):
+        """Reset the connection and request counters."""
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        with self.server._lock:
+            self.server.requests += 1
+
+        parts = self.path.strip("/").split("/")
+        if self.command == "GET" and parts[-1] == "runs":
+            body = []
+        elif parts[-1] == "runs":
+            body = {"run_id": str(uuid.uuid4()), "thread_id": parts[1], "status": "pending"}
+        else:
+            body = {"thread_id": parts[1] if len(parts) > 1 else str(uuid.uuid4()), "metadata": {}}
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+
+def _email(idx: int) -> dict:
+    return {
+        "id": f"msg{idx:06d}",
+        "thread_id": f"thread{idx:06d}",
+        "from_email": "sender@example.com",
+        "to_email": "agentic@gmail.com",
+        "subject": f"Benchmark email {idx}",
+        "page_content": "Hello, can we meet next week?",
+    }
+
+
+async def run_case(server: StubLangGraphServer, emails: int, concurrency: int, client=None) -> dict:
+    """Ingest ``emails`` emails into the stub server and collect timing and connection counts."""
+    server.reset()
+    stats = IngestStats()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ingest(idx: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await ingest_email_to_langgraph(_email(idx), "email_assistant", url=server.url, stats=stats, client=client)
+            stats.record("email_total", time.perf_counter() - start)
+
+    # ingest_email_to_langgraph reports progress with print, keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        await asyncio.gather(*(ingest(idx) for idx in range(emails)))
+        elapsed = time.perf_counter() - start
+
+    per_email = stats.summary()["stages"]["email_total"]
+    return {
+        "seconds": elapsed,
+        "connections": server.connections,
+        "requests": server.requests,
+        "mean_ms": per_email["mean_ms"],
+        "p95_ms": per_email["p95_ms"],
+    }
+
+
+async def main_async(args):
+    """Run the benchmark with the parsed command-line arguments."""
+    server = StubLangGraphServer(connect_latency=args.connect_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        results = {"per-email": await run_case(server, args.emails, args.concurrency)}
+        async with pooled_langgraph_client(
+            server.url, max_connections=args.max_connections, max_keepalive_connections=args.max_connections
+        ) as client:
+            results["pooled"] = await run_case(server, args.emails, args.concurrency, client=client)
+    finally:
+        server.shutdown()
+
+    print(f"{'client':<12}{'emails':>8}{'connections':>13}{'requests':>10}{'mean ms':>10}{'p95 ms':>10}{'seconds':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<12}{args.emails:>8}{result['connections']:>13}{result['requests']:>10}"
+            f"{result['mean_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['seconds']:>10.2f}"
+        )
+    saved = results["per-email"]["mean_ms"] - results["pooled"]["mean_ms"]
+    print(f"Per-email overhead saved by the pooled client: {saved:.2f} ms")
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark per-email vs pooled LangGraph clients")
+    parser.add_argument("--emails", type=int, default=200, help="Number of emails to ingest")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of emails ingested concurrently")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="Simulated delay per new connection")
+    parser.add_argument("--max-connections", type=int, default=20, help="Connection pool size of the pooled client")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Benchmark of the Gmail MIME body extraction on common real-world message shapes.
+
+Compares the shared extractor of ``tools/gmail/mime.py`` with the two implementations it
+replaced: the recursive text/plain-first extractor of ``run_ingest`` and the extractor of
+``gmail_tools``, which concatenated every part with a body. The corpus combines the recorded
+fixtures with synthetic payloads of typical shapes: plain and HTML-only emails,
+multipart/alternative, attachments (binary and text), inline images, calendar invites,
+forwarded messages, legacy charsets and large marketing emails. The report shows the characters
+(and estimated tokens) each extractor sends to the LLM, its latency and its errors.
+
+Usage:
+    python -m email_assistant.eval.benchmark_mime_extract --copies 50
+"""
+
+import argparse
+import base64
+import json
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from email_assistant.eval.gmail_stub import FIXTURES_PATH
+from email_assistant.tools.gmail.ingest_stats import percentile
+from email_assistant.tools.gmail.mime import extract_message_part
+
+_PARAGRAPH = (
+    "Hi team, following up on the quarterly planning discussion. Could you send the updated "
+    "numbers before Thursday so we can review them together? Thanks! "
+)
+
+
+def _data(text: str, charset: str = "utf-8") -> str:
+    return base64.urlsafe_b64encode(text.encode(charset)).decode("ascii")
+
+
+def _text(mime_type: str, text: str, charset: str = "utf-8", filename: str = "") -> Dict[str, Any]:
+    return {
+        "mimeType": mime_type,
+        "filename": filename,
+        "headers": [{"name": "Content-Type", "value": f"{mime_type}; charset={charset}"}],
+        "body": {"size": len(text), "data": _data(text, charset)},
+    }
+
+
+def _html(text: str, repeat: int = 1) -> str:
+    rows = "".join(
+        f'<tr><td style="padding:8px;font-family:Arial"><a href="https://example.com/p/{i}">{text}</a></td></tr>'
+        for i in range(repeat)
+    )
+    return f'<!DOCTYPE html><html><head><style>td{{color:#333}}</style></head><body><table width="600">{rows}</table></body></html>'
+
+
+def _file(mime_type: str, filename: str, size: int) -> Dict[str, Any]:
+    return {"mimeType": mime_type, "filename": filename, "body": {"size": size, "attachmentId": f"att-{filename}"}}
+
+
+def _multipart(mime_type: str, *parts: Dict[str, Any]) -> Dict[str, Any]:
+    return {"mimeType": mime_type, "filename": "", "body": {"size": 0}, "parts": list(parts)}
+
+
+def synthetic_payloads() -> Dict[str, Dict[str, Any]]:
+    """Return one payload per common MIME shape."""
+    plain = _PARAGRAPH * 3
+    ics = "BEGIN:VCALENDAR\nBEGIN:VEVENT\nSUMMARY:Quarterly planning\nDTSTART:20250812T140000Z\nEND:VEVENT\nEND:VCALENDAR"
+    return {
+        "plain": _text("text/plain", plain),
+        "html_only": _text("text/html", _html(_PARAGRAPH, 3)),
+        "alternative": _multipart("multipart/alternative", _text("text/plain", plain), _text("text/html", _html(plain))),
+        "attachment": _multipart(
+            "multipart/mixed",
+            _multipart("multipart/alternative", _text("text/plain", plain), _text("text/html", _html(plain))),
+            _file("application/pdf", "report.pdf", 250_000),
+        ),
+        "text_attachment": _multipart(
+            "multipart/mixed",
+            _text("text/plain", plain),
+            _text("text/plain", "date,amount\n" + "2025-08-01,1000\n" * 3000, filename="export.csv"),
+        ),
+        "inline_image": _multipart(
+            "multipart/alternative",
+            _text("text/plain", plain),
+            _multipart("multipart/related", _text("text/html", _html(plain)), _file("image/png", "logo.png", 40_000)),
+        ),
+        "calendar_invite": _multipart(
+            "multipart/mixed",
+            _multipart(
+                "multipart/alternative",
+                _text("text/plain", plain),
+                _text("text/html", _html(plain)),
+                _text("text/calendar", ics),
+            ),
+            _file("application/ics", "invite.ics", len(ics)),
+        ),
+        "forwarded": _multipart(
+            "multipart/mixed",
+            _text("text/plain", "FYI, see below."),
+            _multipart(
+                "message/rfc822",
+                _multipart("multipart/alternative", _text("text/plain", plain), _text("text/html", _html(plain))),
+            ),
+        ),
+        "latin1": _text("text/plain", "Réunion prévue à 14h, merci de confirmer. " * 5, charset="iso-8859-1"),
+        "marketing_large": _multipart(
+            "multipart/alternative",
+            _text("text/plain", _PARAGRAPH * 150),
+            _text("text/html", _html(_PARAGRAPH, 1500)),
+        ),
+    }
+
+
+def fixture_payloads() -> Dict[str, Dict[str, Any]]:
+    """Return the payloads of the recorded Gmail fixtures."""
+    with open(FIXTURES_PATH) as f:
+        data = json.load(f)
+    return {
+        f"fixture_{message['id']}": message["payload"]
+        for thread in data["threads"]
+        for message in thread["messages"]
+        if "payload" in message
+    }
+
+
+def legacy_ingest_extract(payload: Dict[str, Any]) -> str:
+    """Former ``run_ingest.extract_message_part``: text/plain first, recursive."""
+    if payload.get("parts"):
+        for part in payload["parts"]:
+            if part.get("mimeType", "") == "text/plain" and part.get("body", {}).get("data"):
+                return base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
+        for part in payload["parts"]:
+            if part.get("mimeType", "") == "text/html" and part.get("body", {}).get("data"):
+                return base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
+        for part in payload["parts"]:
+            content = legacy_ingest_extract(part)
+            if content:
+                return content
+    if payload.get("body", {}).get("data"):
+        return base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8")
+    return ""
+
+
+def legacy_tools_extract(payload: Dict[str, Any]) -> str:
+    """Former ``gmail_tools.extract_message_part``: every part with a body, concatenated."""
+    if payload.get("body", {}).get("data"):
+        return base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8")
+    if payload.get("parts"):
+        return "\n".join(content for part in payload["parts"] if (content := legacy_tools_extract(part)))
+    return ""
+
+
+def run_extractor(extract: Callable[[Dict[str, Any]], str], corpus: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Extract every payload of the corpus, collecting output sizes, latencies and errors."""
+    chars, latencies, errors, per_shape = 0, [], 0, {}
+    for name, payload in corpus:
+        start = time.perf_counter()
+        try:
+            text = extract(payload)
+        except Exception:
+            errors += 1
+            text = ""
+        latencies.append(time.perf_counter() - start)
+        chars += len(text)
+        per_shape[name] = len(text)
+    return {
+        "chars": chars,
+        "tokens": chars // 4,
+        "errors": errors,
+        "mean_us": 1e6 * sum(latencies) / len(latencies),
+        "p95_us": 1e6 * percentile(latencies, 95),
+        "per_shape": per_shape,
+    }
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the Gmail MIME body extractors")
+    parser.add_argument("--copies", type=int, default=50, help="Copies of every payload in the corpus")
+    args = parser.parse_args()
+
+    payloads = {**synthetic_payloads(), **fixture_payloads()}
+    corpus = [(name, payload) for _ in range(args.copies) for name, payload in payloads.items()]
+
+    extractors = {
+        "ingest (old)": legacy_ingest_extract,
+        "tools (old)": legacy_tools_extract,
+        "shared": extract_message_part,
+    }
+    results = {name: run_extractor(extract, corpus) for name, extract in extractors.items()}
+
+    print(f"{len(corpus)} payloads ({len(payloads)} shapes x {args.copies})")
+    print(f"{'extractor':<14}{'chars':>12}{'~tokens':>11}{'errors':>8}{'mean us':>10}{'p95 us':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<14}{result['chars']:>12}{result['tokens']:>11}{result['errors']:>8}"
+            f"{result['mean_us']:>10.1f}{result['p95_us']:>10.1f}"
+        )
+
+    print("\nCharacters per message by shape")
+    print(f"{'shape':<28}" + "".join(f"{name:>14}" for name in extractors))
+    for shape in payloads:
+        print(f"{shape:<28}" + "".join(f"{results[name]['per_shape'][shape]:>14}" for name in extractors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark of the triage cascade on the triage dataset, to tune its tiers and threshold.
+
+Every email of the dataset is classified once by every cheap tier (``--models`` or
+``TRIAGE_CASCADE_MODELS``) and by the model of the triage chain. The cascade is then replayed for
+every threshold without calling the models again. The report shows, per tier, the latency and the
+share of invalid answers, and per threshold the escalation rate of every cheap tier, the agreement
+with the dataset labels and the mean triage latency of the cascade.
+
+Usage:
+    python -m email_assistant.eval.benchmark_triage_cascade --models ollama:granite3.3:8b
+"""
+
+import argparse
+import asyncio
+import time
+from statistics import mean
+
+from email_assistant.chains.triage_chain import init_triage_llm, llm_router, model_name
+from email_assistant.eval.email_dataset import examples_triage
+from email_assistant.prompt_assembly import triage_system_message
+from email_assistant.prompts import default_triage_instructions, triage_user_prompt
+from email_assistant.schemas import ScoredRouterSchema
+from email_assistant.triage.cascade import TRIAGE_CASCADE_MODELS
+from email_assistant.utils import parse_email
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+
+def triage_messages(email_input: dict) -> list:
+    """Return the system and user messages of the triage of an email."""
+    author, to, subject, email_thread = parse_email(email_input)
+    system_prompt = triage_system_message(default_triage_instructions)
+    user_prompt = triage_user_prompt.format(author=author, to=to, subject=subject, email_thread=email_thread)
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+
+
+async def run_tier(router, examples: list) -> list:
+    """Return the result (None when invalid) and the latency of a tier for every email."""
+    answers = []
+    for example in examples:
+        start = time.perf_counter()
+        try:
+            result = await router.ainvoke(triage_messages(example["inputs"]["email_input"]))
+        except Exception as e:
+            print(f"  {example['inputs']['email_input']['subject'][:40]!r}: {str(e)[:100]}")
+            result = None
+        answers.append((result, time.perf_counter() - start))
+    return answers
+
+
+async def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the triage cascade")
+    parser.add_argument("--models", type=str, default=",".join(TRIAGE_CASCADE_MODELS), help="Cheap tiers, in order")
+    args = parser.parse_args()
+    cheap_models = [name.strip() for name in args.models.split(",") if name.strip()]
+    labels = [example["outputs"]["classification"] for example in examples_triage]
+
+    tiers = {}
+    for name in cheap_models:
+        print(f"Running {name}")
+        router = init_triage_llm(name).with_structured_output(ScoredRouterSchema)
+        tiers[name] = await run_tier(router, examples_triage)
+    print(f"Running {model_name}")
+    final = await run_tier(llm_router, examples_triage)
+
+    print(f"\n{'tier':<40}{'mean ms':>9}{'invalid':>9}{'agree':>7}")
+    for name, answers in list(tiers.items()) + [(model_name, final)]:
+        invalid = sum(result is None for result, _ in answers)
+        agree = sum(result is not None and result.classification == label for (result, _), label in zip(answers, labels))
+        print(f"{name:<40}{1000 * mean(s for _, s in answers):>9.0f}{invalid:>9}{agree:>7}")
+
+    header = "".join(f"{'esc ' + name[-12:]:>18}" for name in cheap_models)
+    print(f"\n{'threshold':>10}{header}{'agree':>7}{'mean ms':>9}")
+    for threshold in THRESHOLDS:
+        escalated = {name: 0 for name in cheap_models}
+        agree, latencies = 0, []
+        for idx, label in enumerate(labels):
+            latency = 0.0
+            decision = None
+            for name in cheap_models:
+                result, seconds = tiers[name][idx]
+                latency += seconds
+                if result is not None and result.confidence >= threshold:
+                    decision = result.classification
+                    break
+                escalated[name] += 1
+            if decision is None:
+                result, seconds = final[idx]
+                latency += seconds
+                decision = result.classification if result is not None else None
+            agree += decision == label
+            latencies.append(latency)
+        rates = "".join(f"{100 * escalated[name] / len(labels):>17.0f}%" for name in cheap_models)
+        print(f"{threshold:>10.2f}{rates}{agree:>7}{1000 * mean(latencies):>9.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
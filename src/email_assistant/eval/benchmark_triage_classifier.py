@@ -0,0 +1,72 @@
+"""Offline benchmark of the local triage classifier: agreement with the labels versus LLM calls saved.
+
+The labelled emails (the triage dataset and, with ``--url``, the corrections stored on the LangGraph
+server) are split in ``--folds`` folds, leave-one-out by default. Every fold is classified by a model
+trained on the others. For every confidence threshold the report shows the share of the emails the
+classifier decides (the LLM calls saved), the agreement of these decisions with the labels, and the
+LLM latency saved at the given LLM triage latency.
+
+Usage:
+    python -m email_assistant.eval.benchmark_triage_classifier --url http://127.0.0.1:2024
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from langgraph_sdk import get_client
+
+from email_assistant.triage.classifier import TriageClassifier
+from email_assistant.triage.corrections import fetch_triage_corrections
+from email_assistant.triage.train_classifier import training_set
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+
+async def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the local triage classifier")
+    parser.add_argument("--url", type=str, default=None, help="LangGraph deployment to read the triage corrections from")
+    parser.add_argument("--folds", type=int, default=0, help="Cross-validation folds (0 for leave-one-out)")
+    parser.add_argument("--epochs", type=int, default=30, help="Training epochs")
+    parser.add_argument("--llm-latency-ms", type=float, default=1500, help="Latency of one LLM triage call")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the fold assignment")
+    args = parser.parse_args()
+
+    corrections = await fetch_triage_corrections(get_client(url=args.url)) if args.url else []
+    email_inputs, labels, weights = training_set(corrections)
+    n = len(labels)
+    folds = args.folds if 0 < args.folds < n else n
+    assignment = np.random.default_rng(args.seed).permutation(n) % folds
+    print(f"{n} labelled emails ({len(corrections)} corrections), {folds}-fold cross-validation")
+
+    predictions = [None] * n
+    predict_seconds = 0.0
+    for fold in range(folds):
+        train = [i for i in range(n) if assignment[i] != fold]
+        classifier = TriageClassifier.fit(
+            [email_inputs[i] for i in train],
+            [labels[i] for i in train],
+            sample_weights=[weights[i] for i in train],
+            epochs=args.epochs,
+        )
+        for i in np.flatnonzero(assignment == fold):
+            start = time.perf_counter()
+            predictions[i] = classifier.predict(email_inputs[i])
+            predict_seconds += time.perf_counter() - start
+
+    print(f"Mean prediction latency: {1e6 * predict_seconds / n:.0f} us")
+    print(f"{'threshold':>10}{'decided':>9}{'saved':>8}{'agree':>8}{'agreement':>11}{'LLM s saved':>13}")
+    for threshold in THRESHOLDS:
+        decided = [(p, label) for p, label in zip(predictions, labels) if p.confidence >= threshold]
+        agree = sum(p.classification == label for p, label in decided)
+        agreement = f"{100 * agree / len(decided):.0f}%" if decided else "-"
+        print(
+            f"{threshold:>10.2f}{len(decided):>9}{100 * len(decided) / n:>7.0f}%{agree:>8}{agreement:>11}"
+            f"{len(decided) * args.llm_latency_ms / 1000:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Latency benchmark of the triage few-shot retrieval at 10k and 100k corrections.
+
+Synthetic corrections are generated from the triage dataset with random word substitutions and
+embedded with ``--model`` (``hashing`` by default, no API calls). For every index size the report
+shows the time to embed the corrections, to build the index, the top-k search latency (p50/p99),
+and the embedding latency of an email without and with the embedding cache. ``--store`` also times
+the rebuild of the index from an in-memory LangGraph store, embeddings included.
+
+Usage:
+    python -m email_assistant.eval.benchmark_triage_few_shot --sizes 10000 100000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+from langgraph.store.memory import InMemoryStore
+
+from email_assistant.eval.email_dataset import examples_triage
+from email_assistant.triage.corrections import TRIAGE_CORRECTIONS_NAMESPACE
+from email_assistant.triage.few_shot import (
+    EmbeddingCache,
+    TriageExampleIndex,
+    TriageFewShot,
+    embedding_text,
+    init_triage_embeddings,
+)
+
+WORDS = "project budget meeting deadline invoice review release customer report update launch contract".split()
+
+
+def synthetic_corrections(n: int, seed: int = 0) -> list:
+    """Return ``n`` corrections derived from the triage dataset."""
+    rng = random.Random(seed)
+    corrections = []
+    for i in range(n):
+        example = examples_triage[i % len(examples_triage)]
+        email_input = dict(example["inputs"]["email_input"])
+        email_input["subject"] = f"{email_input['subject']} {rng.choice(WORDS)} #{i}"
+        email_input["email_thread"] = " ".join(rng.choice(WORDS) for _ in range(20)) + "\n\n" + email_input["email_thread"]
+        corrections.append({"email_input": email_input, "classification": example["outputs"]["classification"]})
+    return corrections
+
+
+def percentile_ms(samples: list, q: float) -> float:
+    """Return the ``q``-th percentile of latencies in seconds, in ms."""
+    return 1000 * float(np.percentile(samples, q))
+
+
+async def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the triage few-shot retrieval")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Numbers of corrections")
+    parser.add_argument("--model", type=str, default="hashing", help="TRIAGE_EMBEDDINGS_MODEL of the embeddings")
+    parser.add_argument("--k", type=int, default=5, help="Examples retrieved per email")
+    parser.add_argument("--queries", type=int, default=200, help="Searches timed per size")
+    parser.add_argument("--store", action="store_true", help="Also time the rebuild of the index from a store")
+    args = parser.parse_args()
+
+    embeddings = init_triage_embeddings(args.model)
+    queries = [example["inputs"]["email_input"] for example in examples_triage]
+
+    print(f"{'size':>8}{'embed s':>9}{'build ms':>10}{'search p50':>12}{'p99 ms':>8}{'cold ms':>9}{'cached ms':>11}{'store s':>9}")
+    for size in args.sizes:
+        corrections = synthetic_corrections(size)
+        cache = EmbeddingCache(embeddings, args.model, maxsize=len(queries))
+
+        start = time.perf_counter()
+        vectors = await EmbeddingCache(embeddings, args.model, maxsize=0).embed(
+            [embedding_text(c["email_input"]) for c in corrections]
+        )
+        embed_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = TriageExampleIndex(vectors.shape[1])
+        index.build(vectors, corrections)
+        build_ms = 1000 * (time.perf_counter() - start)
+
+        cold, cached, searches = [], [], []
+        for i in range(args.queries):
+            text = embedding_text(queries[i % len(queries)])
+            start = time.perf_counter()
+            vector = (await cache.embed([text]))[0]
+            (cold if i < len(queries) else cached).append(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.search(vector, args.k)
+            searches.append(time.perf_counter() - start)
+
+        store_s = float("nan")
+        if args.store:
+            store = InMemoryStore()
+            for i, correction in enumerate(corrections):
+                await store.aput(TRIAGE_CORRECTIONS_NAMESPACE, str(i), dict(correction, created_at=i), index=False)
+            few_shot = TriageFewShot(store, model=args.model, k=args.k)
+            start = time.perf_counter()
+            await few_shot.refresh()
+            store_s = time.perf_counter() - start
+
+        print(
+            f"{size:>8}{embed_s:>9.1f}{build_ms:>10.1f}{percentile_ms(searches, 50):>12.2f}{percentile_ms(searches, 99):>8.2f}"
+            f"{1000 * np.mean(cold):>9.2f}{1000 * np.mean(cached):>11.3f}{store_s:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""Benchmark of the sender and header triage rules on the evaluation dataset and the Gmail fixtures.
+
+Every email is matched against the configured rules (``TRIAGE_RULES_PATH`` or the defaults). The
+report shows the rule hit rate, the agreement of the hits with the ground truth of the triage
+dataset, the rule latency, and the LLM latency the hits save at the given LLM triage latency.
+
+Usage:
+    python -m email_assistant.eval.benchmark_triage_rules --llm-latency-ms 1500
+"""
+
+import argparse
+import json
+import time
+
+from email_assistant.eval.email_dataset import examples_triage
+from email_assistant.eval.gmail_stub import FIXTURES_PATH
+from email_assistant.tools.gmail.run_ingest import extract_email_data
+from email_assistant.triage.rules import get_triage_rules
+
+
+def fixture_inputs() -> list:
+    """Return the Gmail fixtures as email inputs of the graph, as ingestion builds them."""
+    with open(FIXTURES_PATH) as f:
+        data = json.load(f)
+    inputs = []
+    for thread in data["threads"]:
+        for message in thread["messages"]:
+            if "headers" not in message.get("payload", {}):
+                continue
+            email_data = extract_email_data(message)
+            inputs.append(
+                {
+                    "from": email_data["from_email"],
+                    "to": email_data["to_email"],
+                    "subject": email_data["subject"],
+                    "body": email_data["page_content"],
+                    "id": email_data["id"],
+                    "headers": email_data["headers"],
+                }
+            )
+    return inputs
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the triage rules")
+    parser.add_argument("--llm-latency-ms", type=float, default=1500, help="Latency of one LLM triage call")
+    parser.add_argument("--repeat", type=int, default=1000, help="Rule evaluations per email for the latency")
+    args = parser.parse_args()
+
+    rules = get_triage_rules()
+    corpora = {
+        "dataset": [(ex["inputs"]["email_input"], ex["outputs"]["classification"]) for ex in examples_triage],
+        "fixtures": [(email_input, None) for email_input in fixture_inputs()],
+    }
+
+    print(f"{'corpus':<10}{'emails':>8}{'hits':>6}{'hit rate':>10}{'agree':>7}{'rule us':>9}{'LLM s saved':>13}")
+    for name, corpus in corpora.items():
+        hits = agree = 0
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            matches = [rules.match(email_input) for email_input, _ in corpus]
+        rule_us = 1e6 * (time.perf_counter() - start) / (args.repeat * len(corpus))
+
+        for (email_input, expected), match in zip(corpus, matches):
+            if match:
+                hits += 1
+                agree += expected is None or match.classification == expected
+                print(f"  {email_input.get('subject', '')[:50]!r}: {match.rule} -> {match.classification}")
+        print(
+            f"{name:<10}{len(corpus):>8}{hits:>6}{100 * hits / len(corpus):>9.0f}%{agree:>7}{rule_us:>9.1f}"
+            f"{hits * args.llm_latency_ms / 1000:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
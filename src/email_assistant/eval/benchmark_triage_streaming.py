@@ -0,0 +1,75 @@
+"""Benchmark of the time to decision of the streaming triage against the blocking triage.
+
+Every email of the triage dataset is classified ``--runs`` times with the blocking ``llm_router``
+(reasoning first, ``TRIAGE_STREAMING=off``) and with the streaming router of every ``--modes``
+(classification first, routed as soon as the label has been streamed). The report shows, per
+mode, the p50, p90 and p99 time to decision and the agreement with the dataset labels. In
+``background`` mode the reasoning is finished after the decision and is not part of its time.
+
+Usage:
+    python -m email_assistant.eval.benchmark_triage_streaming --runs 3
+"""
+
+import argparse
+import asyncio
+import time
+
+from email_assistant.chains.triage_chain import (
+    llm_router,
+    llm_streaming_router,
+    model_name,
+)
+from email_assistant.eval.benchmark_triage_cascade import triage_messages
+from email_assistant.eval.email_dataset import examples_triage
+from email_assistant.triage.streaming import (
+    STREAMING_MODES,
+    TriageDecisionStats,
+    stream_triage,
+    wait_background_reasoning,
+)
+
+
+async def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the streaming triage")
+    parser.add_argument("--runs", type=int, default=1, help="Classifications of every email per mode")
+    parser.add_argument("--modes", type=str, nargs="+", default=["background", "label"], choices=STREAMING_MODES[1:])
+    args = parser.parse_args()
+
+    stats = TriageDecisionStats()
+    agree = {mode: 0 for mode in ["off"] + args.modes}
+    failed = {mode: 0 for mode in agree}
+    print(f"Benchmarking {model_name} on {len(examples_triage)} emails x {args.runs} runs")
+    for _ in range(args.runs):
+        for example in examples_triage:
+            messages = triage_messages(example["inputs"]["email_input"])
+            label = example["outputs"]["classification"]
+            for mode in agree:
+                start = time.perf_counter()
+                try:
+                    if mode == "off":
+                        result = await llm_router.ainvoke(messages)
+                    else:
+                        result = await stream_triage(llm_streaming_router, messages, mode)
+                except Exception as e:
+                    print(f"  {mode} {example['inputs']['email_input']['subject'][:40]!r}: {str(e)[:100]}")
+                    failed[mode] += 1
+                    continue
+                stats.record(mode, time.perf_counter() - start)
+                agree[mode] += result.classification == label
+                # Finish the background reasoning before timing the next call
+                await wait_background_reasoning()
+
+    total = args.runs * len(examples_triage)
+    summary = stats.summary()
+    print(f"\n{'mode':<12}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'agree':>9}{'failed':>8}")
+    for mode in agree:
+        row = summary.get(mode, {})
+        print(
+            f"{mode:<12}{row.get('p50_ms', float('nan')):>9.0f}{row.get('p90_ms', float('nan')):>9.0f}"
+            f"{row.get('p99_ms', float('nan')):>9.0f}{agree[mode]:>5}/{total:<3}{failed[mode]:>8}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
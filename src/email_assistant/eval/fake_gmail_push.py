@@ -0,0 +1,133 @@
+"""Local stand-in for Pub/Sub that posts fake Gmail watch notifications to the push receiver.
+
+Each burst posts several notifications for a mailbox, as Gmail does for a single new email
+(message added, labels changed, ...). Without ``--receiver`` an in-process receiver is started
+with a dry-run trigger, so the debouncing can be checked without Gmail or a LangGraph server.
+Against a receiver started with ``push_ingest --dry-run``, pass its URL instead.
+
+Usage:
+    python -m email_assistant.eval.fake_gmail_push --mailboxes 3 --bursts 5 --burst-size 4
+    python -m email_assistant.eval.fake_gmail_push --receiver http://127.0.0.1:8085/gmail/push
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import logging
+import time
+import uuid
+from datetime import UTC, datetime
+
+import httpx
+
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.ingest_stats import percentile
+from email_assistant.tools.gmail.push_ingest import (
+    STATS_PATH,
+    MailboxDebouncer,
+    PushReceiver,
+    dry_run_trigger,
+)
+
+
+def fake_notification(email_address: str, history_id: int, subscription: str = "projects/local/subscriptions/gmail") -> dict:
+    """Build a Pub/Sub push request body carrying a Gmail notification."""
+    data = json.dumps({"emailAddress": email_address, "historyId": history_id}).encode("utf-8")
+    return {
+        "message": {
+            "data": base64.b64encode(data).decode("ascii"),
+            "messageId": str(uuid.uuid4().int)[:16],
+            "publishTime": datetime.now(UTC).isoformat(),
+        },
+        "subscription": subscription,
+    }
+
+
+async def post_notifications(url: str, mailboxes: int, bursts: int, burst_size: int, burst_interval: float) -> dict:
+    """Post ``bursts`` bursts of ``burst_size`` notifications to every mailbox and time the acks."""
+    ack_latencies = []
+    statuses = {}
+    history_id = 1000
+
+    async with httpx.AsyncClient() as client:
+        for _ in range(bursts):
+            for mailbox in range(mailboxes):
+                for _ in range(burst_size):
+                    history_id += 1
+                    body = fake_notification(f"user{mailbox}@example.com", history_id)
+                    start = time.perf_counter()
+                    response = await client.post(url, json=body)
+                    ack_latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            await asyncio.sleep(burst_interval)
+
+    return {
+        "posted": len(ack_latencies),
+        "statuses": statuses,
+        "ack_p50_ms": 1000 * percentile(ack_latencies, 50),
+        "ack_p95_ms": 1000 * percentile(ack_latencies, 95),
+    }
+
+
+async def fetch_stats(url: str) -> dict:
+    """Read the statistics of the receiver posted to."""
+    stats_url = url.split("/gmail/push")[0] + STATS_PATH
+    async with httpx.AsyncClient() as client:
+        response = await client.get(stats_url)
+        response.raise_for_status()
+        return response.json()
+
+
+async def main_async(args):
+    """Post the notification bursts with the parsed command-line arguments."""
+    receiver: PushReceiver | None = None
+    url = args.receiver
+    if url is None:
+        debouncer = MailboxDebouncer(dry_run_trigger(args.fetch_latency), debounce=args.debounce, max_delay=args.max_delay)
+        receiver = PushReceiver(debouncer, port=0)
+        await receiver.start()
+        url = receiver.url
+
+    # The dry-run trigger prints every fetch, keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        posted = await post_notifications(url, args.mailboxes, args.bursts, args.burst_size, args.burst_interval)
+        if receiver is not None:
+            await receiver.debouncer.drain()
+            await receiver.close()
+            stats = {**receiver.stats.summary(), "pending_mailboxes": receiver.debouncer.pending()}
+        else:
+            # Give the external receiver time to run the last fetches
+            await asyncio.sleep(args.max_delay + args.fetch_latency)
+            stats = await fetch_stats(url)
+
+    print(f"Posted {posted['posted']} notifications to {url}: {posted['statuses']}")
+    print(f"Ack latency p50 {posted['ack_p50_ms']:.2f} ms, p95 {posted['ack_p95_ms']:.2f} ms")
+    print(
+        f"Receiver: {stats['notifications']} notifications, {stats['coalesced']} coalesced, "
+        f"{stats['fetches']} fetches ({stats['failed_fetches']} failed), "
+        f"trigger delay p50 {stats['trigger_delay_p50_ms']:.0f} ms / p95 {stats['trigger_delay_p95_ms']:.0f} ms"
+    )
+
+
+def main():
+    """Post fake notifications from the command line."""
+    parser = argparse.ArgumentParser(description="Post fake Gmail push notifications to the push receiver")
+    parser.add_argument("--receiver", type=str, default=None, help="Push endpoint URL (default: in-process receiver)")
+    parser.add_argument("--mailboxes", type=int, default=3, help="Number of distinct mailboxes")
+    parser.add_argument("--bursts", type=int, default=5, help="Number of notification bursts per mailbox")
+    parser.add_argument("--burst-size", type=int, default=4, help="Notifications per burst")
+    parser.add_argument("--burst-interval", type=float, default=0.5, help="Seconds between bursts")
+    parser.add_argument("--debounce", type=float, default=0.2, help="Debounce of the in-process receiver")
+    parser.add_argument("--max-delay", type=float, default=2.0, help="Maximum delay of the in-process receiver")
+    parser.add_argument("--fetch-latency", type=float, default=0.3, help="Simulated fetch duration")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""In-process stand-in for the Gmail API used by the ingestion benchmarks.
+
+The stub replays the responses stored in ``fixtures/gmail_api_responses.json`` and mimics
+the small subset of the ``googleapiclient`` resource interface used by the email assistant
+(``users().messages()``, ``users().threads()``, ``users().history()`` and batch HTTP requests). Every HTTP round
+trip sleeps for a configurable latency and is counted, so the benchmarks can compare request
+counts and wall-clock time without network access. The ``format``, ``metadataHeaders`` and
+``fields`` partial-response parameters are honoured and the JSON size of every response is
+counted as downloaded bytes.
+"""
+
+import copy
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+FIXTURES_PATH = Path(__file__).parent / "fixtures" / "gmail_api_responses.json"
+
+
+class StubHttpError(Exception):
+    """Error raised by the stub for unknown resources, mirroring googleapiclient's HttpError."""
+
+    def __init__(self, status: int, reason: str):
+        super().__init__(f"<HttpError {status} {reason}>")
+        self.status_code = status
+        self.reason = reason
+        self.resp = type("Resp", (), {"status": status})()
+
+
+class StubTransport:
+    """Count and delay simulated HTTP round trips."""
+
+    def __init__(self, round_trip_latency: float = 0.05, per_call_latency: float = 0.002):
+        self.round_trip_latency = round_trip_latency
+        self.per_call_latency = per_call_latency
+        self.http_requests = 0
+        self.api_calls = 0
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+
+    def round_trip(self, api_calls: int = 1, response_bytes: int = 0):
+        """Simulate one HTTP round trip carrying ``api_calls`` API calls."""
+        with self._lock:
+            self.http_requests += 1
+            self.api_calls += api_calls
+            self.bytes_downloaded += response_bytes
+        time.sleep(self.round_trip_latency + self.per_call_latency * api_calls)
+
+    def reset(self):
+        """Reset the counters."""
+        with self._lock:
+            self.http_requests = 0
+            self.api_calls = 0
+            self.bytes_downloaded = 0
+
+
+def _response_size(response: Any) -> int:
+    return len(json.dumps(response).encode("utf-8"))
+
+
+def _parse_fields(fields: str) -> Dict[str, Any]:
+    """Parse a partial-response field mask into a tree, an empty dict selecting the whole value."""
+    tree: Dict[str, Any] = {}
+    node, parents, name = tree, [], ""
+
+    def _select(node: Dict[str, Any], path: str) -> Dict[str, Any]:
+        for key in path.strip().split("/"):
+            node = node.setdefault(key, {})
+        return node
+
+    for char in fields + ",":
+        if char == "(":
+            parents.append(node)
+            node, name = _select(node, name), ""
+        elif char in ",)":
+            if name.strip():
+                _select(node, name)
+            name = ""
+            if char == ")":
+                node = parents.pop()
+        else:
+            name += char
+    return tree
+
+
+def _apply_fields(value: Any, mask: Dict[str, Any]) -> Any:
+    if not mask:
+        return value
+    if isinstance(value, list):
+        return [_apply_fields(item, mask) for item in value]
+    if isinstance(value, dict):
+        return {key: _apply_fields(value[key], sub_mask) for key, sub_mask in mask.items() if key in value}
+    return value
+
+
+def _apply_format(message: Dict[str, Any], format: str, metadata_headers: List[str] | None) -> Dict[str, Any]:
+    """Reduce a full message to what Gmail returns for the ``minimal`` and ``metadata`` formats."""
+    if format == "full":
+        return message
+    reduced = {key: value for key, value in message.items() if key != "payload"}
+    if format == "metadata":
+        payload = message.get("payload", {})
+        headers = payload.get("headers", [])
+        if metadata_headers:
+            wanted = {name.lower() for name in metadata_headers}
+            headers = [header for header in headers if header["name"].lower() in wanted]
+        reduced["payload"] = {"mimeType": payload.get("mimeType"), "headers": headers}
+    return reduced
+
+
+def _partial_response(
+    message_or_thread: Dict[str, Any],
+    format: str = "full",
+    metadataHeaders: List[str] | None = None,
+    fields: str | None = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """Apply the ``format``, ``metadataHeaders`` and ``fields`` parameters of a get call."""
+    if "messages" in message_or_thread:
+        response = dict(message_or_thread)
+        response["messages"] = [_apply_format(m, format, metadataHeaders) for m in message_or_thread["messages"]]
+    else:
+        response = _apply_format(message_or_thread, format, metadataHeaders)
+    return _apply_fields(response, _parse_fields(fields)) if fields else response
+
+
+class StubRequest:
+    """Deferred API call, equivalent to googleapiclient's HttpRequest."""
+
+    def __init__(self, transport: StubTransport, resolver: Callable[[], Any]):
+        self._transport = transport
+        self._resolver = resolver
+
+    def resolve(self) -> Any:
+        """Compute the response without any simulated network cost."""
+        return copy.deepcopy(self._resolver())
+
+    def execute(self, http=None, num_retries: int = 0) -> Any:
+        """Execute the call as a single HTTP round trip."""
+        try:
+            response = self.resolve()
+        except StubHttpError:
+            self._transport.round_trip()
+            raise
+        self._transport.round_trip(response_bytes=_response_size(response))
+        return response
+
+
+class StubBatchRequest:
+    """Equivalent of googleapiclient's BatchHttpRequest."""
+
+    def __init__(self, transport: StubTransport, callback: Callable | None = None):
+        self._transport = transport
+        self._callback = callback
+        self._requests: List[tuple] = []
+
+    def add(self, request: StubRequest, callback: Callable | None = None, request_id: str | None = None):
+        """Queue a request in the batch."""
+        if request_id is None:
+            request_id = str(len(self._requests) + 1)
+        if any(existing_id == request_id for existing_id, _, _ in self._requests):
+            raise KeyError(f"A request with this ID already exists: {request_id}")
+        if len(self._requests) >= 1000:
+            raise ValueError("Exceeded the maximum calls (1000) in a single batch request.")
+        self._requests.append((request_id, request, callback))
+
+    def execute(self, http=None):
+        """Send all queued requests in one HTTP round trip and dispatch callbacks."""
+        results = []
+        for request_id, request, callback in self._requests:
+            response, exception = None, None
+            try:
+                response = request.resolve()
+            except StubHttpError as e:
+                exception = e
+            results.append((request_id, callback, response, exception))
+
+        response_bytes = sum(_response_size(response) for _, _, response, _ in results if response is not None)
+        self._transport.round_trip(api_calls=len(self._requests), response_bytes=response_bytes)
+        for request_id, callback, response, exception in results:
+            for cb in (callback, self._callback):
+                if cb is not None:
+                    cb(request_id, response, exception)
+
+
+class StubMailbox:
+    """Gmail mailbox content loaded from the recorded fixtures."""
+
+    def __init__(self, email_address: str, threads: List[Dict[str, Any]], history_id: str = "1"):
+        self.email_address = email_address
+        self.threads = {thread["id"]: thread for thread in threads}
+        self.messages = {message["id"]: message for thread in threads for message in thread["messages"]}
+        known_history_ids = [int(m["historyId"]) for m in self.messages.values() if "historyId" in m]
+        self.history_id = max([int(history_id)] + known_history_ids)
+        # Oldest historyId Gmail still holds records for, older start IDs get a 404
+        self.oldest_history_id = min(known_history_ids, default=self.history_id)
+
+    def deliver(self, message: Dict[str, Any]):
+        """Add a new message to the mailbox, creating its thread if needed."""
+        self.history_id += 1
+        message["historyId"] = str(self.history_id)
+        thread = self.threads.setdefault(message["threadId"], {"id": message["threadId"], "messages": []})
+        thread["messages"].append(message)
+        thread["historyId"] = message["historyId"]
+        self.messages[message["id"]] = message
+
+    @classmethod
+    def from_fixtures(cls, copies: int = 1, path: Path = FIXTURES_PATH) -> "StubMailbox":
+        """Load the fixtures, replicating every thread ``copies`` times with distinct IDs."""
+        with open(path) as f:
+            data = json.load(f)
+
+        threads = []
+        for copy_idx in range(copies):
+            for thread in data["threads"]:
+                thread = copy.deepcopy(thread)
+                suffix = f"{copy_idx:04x}"
+                thread["id"] = f"{thread['id']}{suffix}"
+                for message in thread["messages"]:
+                    message["id"] = f"{message['id']}{suffix}"
+                    message["threadId"] = thread["id"]
+                    # Spread copies over time so the newest-first ordering stays realistic
+                    message["internalDate"] = str(int(message["internalDate"]) + copy_idx * 1000)
+                threads.append(thread)
+        return cls(data["emailAddress"], threads, history_id=data.get("historyId", "1"))
+
+
+class _MessagesResource:
+    def __init__(self, service: "StubGmailService"):
+        self._service = service
+
+    def list(
+        self,
+        userId: str,
+        q: str = "",
+        pageToken: str | None = None,
+        maxResults: int = 100,
+        fields: str | None = None,
+        **kwargs,
+    ):
+        def _resolve():
+            matches = [
+                m
+                for m in self._service.mailbox.messages.values()
+                if "is:unread" not in q or "UNREAD" in m.get("labelIds", [])
+            ]
+            matches.sort(key=lambda m: int(m["internalDate"]), reverse=True)
+            start = int(pageToken or 0)
+            page = matches[start : start + maxResults]
+            result: Dict[str, Any] = {"resultSizeEstimate": len(matches)}
+            if page:
+                result["messages"] = [{"id": m["id"], "threadId": m["threadId"]} for m in page]
+            if start + maxResults < len(matches):
+                result["nextPageToken"] = str(start + maxResults)
+            return _apply_fields(result, _parse_fields(fields)) if fields else result
+
+        return StubRequest(self._service.transport, _resolve)
+
+    def get(self, userId: str, id: str, **kwargs):
+        def _resolve():
+            if id not in self._service.mailbox.messages:
+                raise StubHttpError(404, "Requested entity was not found.")
+            return _partial_response(self._service.mailbox.messages[id], **kwargs)
+
+        return StubRequest(self._service.transport, _resolve)
+
+
+class _ThreadsResource:
+    def __init__(self, service: "StubGmailService"):
+        self._service = service
+
+    def get(self, userId: str, id: str, **kwargs):
+        def _resolve():
+            if id not in self._service.mailbox.threads:
+                raise StubHttpError(404, "Requested entity was not found.")
+            return _partial_response(self._service.mailbox.threads[id], **kwargs)
+
+        return StubRequest(self._service.transport, _resolve)
+
+
+class _HistoryResource:
+    def __init__(self, service: "StubGmailService"):
+        self._service = service
+
+    def list(self, userId: str, startHistoryId: str, pageToken: str | None = None, maxResults: int = 100, **kwargs):
+        def _resolve():
+            mailbox = self._service.mailbox
+            start = int(startHistoryId)
+            if start < mailbox.oldest_history_id:
+                raise StubHttpError(404, "Requested entity was not found.")
+            added = sorted(
+                (m for m in mailbox.messages.values() if int(m.get("historyId", 0)) > start),
+                key=lambda m: int(m["historyId"]),
+            )
+            offset = int(pageToken or 0)
+            page = added[offset : offset + maxResults]
+            result: Dict[str, Any] = {"historyId": str(mailbox.history_id)}
+            if page:
+                result["history"] = [
+                    {
+                        "id": m["historyId"],
+                        "messages": [{"id": m["id"], "threadId": m["threadId"]}],
+                        "messagesAdded": [
+                            {"message": {"id": m["id"], "threadId": m["threadId"], "labelIds": m.get("labelIds", [])}}
+                        ],
+                    }
+                    for m in page
+                ]
+            if offset + maxResults < len(added):
+                result["nextPageToken"] = str(offset + maxResults)
+            return result
+
+        return StubRequest(self._service.transport, _resolve)
+
+
+class _UsersResource:
+    def __init__(self, service: "StubGmailService"):
+        self._service = service
+
+    def messages(self):
+        return _MessagesResource(self._service)
+
+    def threads(self):
+        return _ThreadsResource(self._service)
+
+    def history(self):
+        return _HistoryResource(self._service)
+
+    def getProfile(self, userId: str):
+        mailbox = self._service.mailbox
+
+        def _resolve():
+            return {
+                "emailAddress": mailbox.email_address,
+                "messagesTotal": len(mailbox.messages),
+                "threadsTotal": len(mailbox.threads),
+                "historyId": str(mailbox.history_id),
+            }
+
+        return StubRequest(self._service.transport, _resolve)
+
+
+class StubGmailService:
+    """Drop-in replacement for ``build("gmail", "v1", ...)`` backed by a StubMailbox."""
+
+    def __init__(self, mailbox: StubMailbox, transport: StubTransport | None = None):
+        self.mailbox = mailbox
+        self.transport = transport or StubTransport()
+
+    def users(self):
+        """Return the users resource."""
+        return _UsersResource(self)
+
+    def new_batch_http_request(self, callback: Callable | None = None):
+        """Return a batch request executed against the stub transport."""
+        return StubBatchRequest(self.transport, callback=callback)
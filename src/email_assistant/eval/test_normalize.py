@@ -0,0 +1,78 @@
+"""Tests of the signature and footer stripping of the email body normalization."""
+
+import pytest
+
+from email_assistant.tools.gmail.normalize import (
+    NormalizationPolicy,
+    normalize_email_body,
+)
+
+SIGNATURE_ONLY = NormalizationPolicy.parse("signature")
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "Hi Lance,\n\nThanks!\nCan we meet Tuesday at 3pm to go over the launch?\nPlease confirm by EOD.\n\nBob",
+        "Best,\nI need the API docs. Where are they?\nAlice",
+        "Hi Lance,\n\nThanks for the update.\n\nRegards\nThe deadline moved to Friday. Can you make it?",
+    ],
+)
+def test_closing_followed_by_content_is_kept(body):
+    """Test that a closing followed by a request is not taken for the start of a signature."""
+    assert normalize_email_body(body, SIGNATURE_ONLY).text == body
+    assert normalize_email_body(body).text == body
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (
+            "Hi,\n\nThe report is attached.\n\nBest regards,\nAlice Smith\nSr. Product Manager | Acme Inc.\n"
+            "+1 (555) 123-4567\nalice@acme.com",
+            "Hi,\n\nThe report is attached.\n\nBest regards,",
+        ),
+        ("Can you review the PR?\n\nThanks,\nBob", "Can you review the PR?\n\nThanks,"),
+        ("Can you review the PR?\n\nThanks,\nBob\n-- \nSent with a mail client", "Can you review the PR?\n\nThanks,"),
+    ],
+)
+def test_signature_after_closing_is_removed(body, expected):
+    """Test that the name, title and phone lines after a closing are removed."""
+    assert normalize_email_body(body, SIGNATURE_ONLY).text == expected
+
+
+FOOTER_ONLY = NormalizationPolicy.parse("footer")
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "Hi Lance,\n\nThis is confidential: we are acquiring Acme next week. Can you prepare the term sheet by Friday?",
+        "Hi,\n\nThe weekly report keeps landing in my inbox.\n\nI want to unsubscribe from the weekly report.",
+        "Hi Lance,\n\nThis message is confidential and privileged.",
+    ],
+)
+def test_content_with_footer_words_is_kept(body):
+    """Test that a content paragraph mentioning a confidentiality or unsubscribe notice is not removed."""
+    assert normalize_email_body(body, FOOTER_ONLY).text == body
+    assert normalize_email_body(body).text == body
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (
+            "Can you review the PR?\n\nThanks,\nBob\n\nThis email is confidential and intended only for the named recipient.",
+            "Can you review the PR?\n\nThanks,\nBob",
+        ),
+        ("Can you review the PR?\n\n---\nThis email is confidential.", "Can you review the PR?"),
+        ("Can you review the PR?\n\n___\n\nThis email is confidential.", "Can you review the PR?"),
+        (
+            "Your order shipped.\n\nYou are receiving this email because you opted in. Unsubscribe | Manage your preferences",
+            "Your order shipped.",
+        ),
+    ],
+)
+def test_footer_is_removed(body, expected):
+    """Test that notices after a signature or a separator line, or carrying several notices, are removed."""
+    assert normalize_email_body(body, FOOTER_ONLY).text == expected
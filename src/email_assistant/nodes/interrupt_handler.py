@@ -22,6 +22,8 @@ from email_assistant.tools import (
     schedule_meeting,
     write_email,
 )
+from email_assistant.triage.corrections import record_triage_correction
+from email_assistant.triage.few_shot import TRIAGE_FEW_SHOT
 from email_assistant.utils import (
     format_email_markdown,
     format_for_display,
@@ -142,7 +144,7 @@ async def interrupt_handler_node(
             # Update the write_email tool call with the edited content from Agent Inbox
             if tool_call["name"] in ["write_email", "send_email_tool"]:
                 # Execute the tool with edited args
-                observation = tool.invoke(edited_args)
+                observation = await tool.ainvoke(edited_args)
 
                 # Add only the tool response message
                 result.append({"role": "tool", "content": observation, "tool_call_id": current_id})
@@ -202,6 +204,9 @@ async def interrupt_handler_node(
                 goto = END
 
                 if store:
+                    # The user did not want to deal with an email classified as respond
+                    await record_triage_correction(store, state["email_input"], "ignore", predicted="respond")
+                if store and not TRIAGE_FEW_SHOT:
                     logger.info(f"***{INTERRUPT_HANDLER_NODE} update long-term memory for ignore to write_email ***")
                     await update_memory(
                         store,
@@ -230,6 +235,9 @@ async def interrupt_handler_node(
                 goto = END
 
                 if store:
+                    # The user did not want to deal with an email classified as respond
+                    await record_triage_correction(store, state["email_input"], "ignore", predicted="respond")
+                if store and not TRIAGE_FEW_SHOT:
                     logger.info(f"***{INTERRUPT_HANDLER_NODE} update long-term memory for ignore to schedule_meeting ***")
                     await update_memory(
                         store,
@@ -257,6 +265,9 @@ async def interrupt_handler_node(
                 # Go to END
                 goto = END
                 if store:
+                    # The user did not want to deal with an email classified as respond
+                    await record_triage_correction(store, state["email_input"], "ignore", predicted="respond")
+                if store and not TRIAGE_FEW_SHOT:
                     logger.info(f"***{INTERRUPT_HANDLER_NODE} update long-term memory for ignore Question ***")
                     await update_memory(
                         store,
@@ -6,9 +6,8 @@ from email_assistant.chains.tools_chain import llm_with_tools
 from email_assistant.consts import LLM_CALL_NODE, LLM_CALL_NODE_HITL
 from email_assistant.logger import logger
 from email_assistant.persistence.long_term_memory import get_memory
+from email_assistant.prompt_assembly import agent_system_message
 from email_assistant.prompts import (
-    agent_system_prompt,
-    default_background,
     default_cal_preferences,
     default_response_preferences,
 )
@@ -36,12 +35,7 @@ async def llm_call_node(state: EmailAgentState, use_gmail_tools: bool, store: Op
     messages = [
         {
             "role": "system",
-            "content": agent_system_prompt.format(
-                tools_prompt=SELECTED_AGENT_TOOLS_PROMPT,
-                background=default_background,
-                response_preferences=default_response_preferences,
-                cal_preferences=default_cal_preferences,
-            ),
+            "content": agent_system_message(SELECTED_AGENT_TOOLS_PROMPT, default_response_preferences, default_cal_preferences),
         },
     ] + state["messages"]
 
@@ -66,12 +60,7 @@ async def llm_call_hitl_node(state: EmailAgentState, use_gmail_tools: bool, stor
     messages = [
         {
             "role": "system",
-            "content": agent_system_prompt.format(
-                tools_prompt=SELECTED_HITL_TOOLS_PROMPT,
-                background=default_background,
-                response_preferences=response_preferences,
-                cal_preferences=cal_preferences,
-            ),
+            "content": agent_system_message(SELECTED_HITL_TOOLS_PROMPT, response_preferences, cal_preferences),
         },
     ] + state["messages"]
 
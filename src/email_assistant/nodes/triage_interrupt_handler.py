@@ -9,6 +9,8 @@ from email_assistant.consts import RESPONSE_AGENT, TRIAGE_INTERRUPT_HANDLER_NODE
 from email_assistant.logger import logger
 from email_assistant.persistence.long_term_memory import update_memory
 from email_assistant.schemas import EmailAgentState
+from email_assistant.triage.corrections import record_triage_correction
+from email_assistant.triage.few_shot import TRIAGE_FEW_SHOT
 from email_assistant.utils import (  # noqa F401
     format_email_markdown,
     format_for_display,
@@ -46,7 +48,8 @@ async def triage_interrupt_handler_node(
             "allow_ignore": True,
             "allow_respond": True,
             "allow_edit": False,
-            "allow_accept": False,
+            # Accepting the notification confirms the notify classification
+            "allow_accept": True,
         },
         # Email to show in Agent Inbox
         "description": email_markdown,
@@ -64,6 +67,10 @@ async def triage_interrupt_handler_node(
             {"role": "user", "content": f"User wants to reply to the email. Use this feedback to respond: {user_input}"}
         )
         if store:
+            await record_triage_correction(
+                store, state["email_input"], "respond", predicted=state.get("classification_decision")
+            )
+        if store and not TRIAGE_FEW_SHOT:
             logger.info(f"***{TRIAGE_INTERRUPT_HANDLER_NODE} UPDATE LONG-TERM MEMORY for triage_preferences***")
             await update_memory(
                 store,
@@ -84,6 +91,10 @@ async def triage_interrupt_handler_node(
     # If user ignores email, go to END
     elif response["type"] == "ignore":
         if store:
+            await record_triage_correction(
+                store, state["email_input"], "ignore", predicted=state.get("classification_decision")
+            )
+        if store and not TRIAGE_FEW_SHOT:
             logger.info(f"***{TRIAGE_INTERRUPT_HANDLER_NODE} UPDATE LONG-TERM MEMORY for triage_preferences***")
             # Make note of the user's decision to ignore the email
             messages.append(
@@ -97,6 +108,14 @@ async def triage_interrupt_handler_node(
 
         goto = END
 
+    # If user accepts the notification, the classification was right: keep it as an example, go to END
+    elif response["type"] == "accept":
+        if store:
+            await record_triage_correction(
+                store, state["email_input"], "notify", predicted=state.get("classification_decision")
+            )
+        goto = END
+
     # Catch all other responses
     else:
         raise ValueError(f"Invalid response: {response}")
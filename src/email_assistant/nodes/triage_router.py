@@ -1,10 +1,10 @@
+import time
 from typing import Literal, Optional
 
 from langgraph.graph import END
 from langgraph.store.base import BaseStore
 from langgraph.types import Command
 
-from email_assistant.chains.triage_chain import llm_router
 from email_assistant.consts import (
     EMAIL_AGENT,
     RESPONSE_AGENT,
@@ -14,36 +14,117 @@ from email_assistant.consts import (
 )
 from email_assistant.logger import logger
 from email_assistant.persistence.long_term_memory import get_memory
+from email_assistant.persistence.triage_cache import (
+    get_triage_cache,
+    prompt_version,
+    triage_cache_key,
+)
+from email_assistant.prompt_assembly import triage_system_message
 from email_assistant.prompts import (
     default_background,
     default_triage_instructions,
+    triage_few_shot_prompt,
     triage_system_prompt,
     triage_user_prompt,
 )
-from email_assistant.schemas import EmailAgentState
-from email_assistant.utils import format_for_display  # noqa F401
+from email_assistant.schemas import EmailAgentState, RouterSchema
+from email_assistant.triage.batch import pretriaged_decision
+from email_assistant.triage.cascade import get_triage_router
+from email_assistant.triage.classifier import classify_locally
+from email_assistant.triage.few_shot import TRIAGE_FEW_SHOT, triage_few_shot_examples
+from email_assistant.triage.rules import match_triage_rules, triage_rule_stats
+from email_assistant.triage.streaming import (
+    TRIAGE_STREAMING,
+    get_streaming_router,
+    stream_triage,
+    triage_decision_stats,
+)
 from email_assistant.utils import (
     format_email_markdown,
+    format_few_shot_examples,
+    format_for_display,  # noqa F401
     format_gmail_markdown,
     parse_email,
     parse_gmail,
 )
 
+# Cached decisions are invalidated when the triage prompt templates change
+TRIAGE_PROMPT_VERSION = prompt_version(triage_system_prompt, triage_user_prompt, default_background)
+
+
+async def _llm_triage(email_input: dict, triage_instructions: str, system_prompt: str, user_prompt: str) -> RouterSchema:
+    """Classify an email with the LLM router, recording its latency for the triage rule statistics.
+
+    The decision is reused from the triage cache when the same email was classified with the same
+    prompt, instructions and model. With ``TRIAGE_CASCADE_MODELS``, cheap models are tried before the
+    model of the triage chain, see ``email_assistant.triage.cascade``. With ``TRIAGE_STREAMING``, the
+    decision is returned as soon as the classification has been streamed, see
+    ``email_assistant.triage.streaming``, or by the blocking router when the stream yields no
+    classification.
+    """
+    router, router_name = get_triage_router()
+    streaming_router = get_streaming_router()
+    # Streamed decisions carry a partial or no reasoning, they are cached apart from the blocking ones
+    if streaming_router is not None:
+        router_name = f"{router_name}:streaming-{TRIAGE_STREAMING}"
+    cache = await get_triage_cache()
+    key = triage_cache_key(email_input, triage_instructions, router_name, TRIAGE_PROMPT_VERSION) if cache is not None else None
+    if cache is not None:
+        try:
+            if cached := await cache.get(key):
+                logger.info(f"Triage cache hit: {cached.classification} - {cache.summary()}")
+                return RouterSchema(reasoning=cached.reasoning, classification=cached.classification)
+        except Exception as e:
+            logger.warning(f"Could not read the triage cache: {str(e)}")
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+    start = time.perf_counter()
+    result = None
+    if streaming_router is not None:
+        try:
+            result = await stream_triage(streaming_router, messages)
+        except Exception as e:
+            # Fall back to the blocking router, as the cascade escalates on invalid answers
+            logger.warning(f"Streaming triage failed, falling back to the blocking router: {str(e)}")
+    if result is None:
+        result = await router.ainvoke(messages)
+    elapsed = time.perf_counter() - start
+    triage_rule_stats.record_llm(elapsed)
+    triage_decision_stats.record(TRIAGE_STREAMING if streaming_router is not None else "off", elapsed)
+    logger.info(f"Triage time to decision: {triage_decision_stats.summary()}")
+
+    if cache is not None:
+        try:
+            await cache.put(key, result.classification, result.reasoning)
+        except Exception as e:
+            logger.warning(f"Could not write the triage cache: {str(e)}")
+    return result
+
 
 async def triage_router_node(state: EmailAgentState) -> Command[Literal["email_agent", "__end__"]]:
     """Analyze email content to decide if we should respond, notify, or ignore."""
     logger.info(f"***{TRIAGE_ROUTER_NODE}***")
     author, to, subject, email_thread = parse_email(state["email_input"])
-    system_prompt = triage_system_prompt.format(background=default_background, triage_instructions=default_triage_instructions)
 
-    user_prompt = triage_user_prompt.format(author=author, to=to, subject=subject, email_thread=email_thread)
+    # Sender and header rules classify obvious emails without an LLM call
+    if rule := match_triage_rules(state["email_input"]):
+        result = RouterSchema(reasoning=rule.reasoning, classification=rule.classification)
+    # Decision taken by batch triage at ingestion
+    elif pretriaged := pretriaged_decision(state["email_input"]):
+        result = pretriaged
+    # Confident predictions of the local classifier
+    elif local := classify_locally(state["email_input"]):
+        result = RouterSchema(reasoning=local.reasoning, classification=local.classification)
+    else:
+        triage_instructions = default_triage_instructions
+        system_prompt = triage_system_message(triage_instructions)
+
+        user_prompt = triage_user_prompt.format(author=author, to=to, subject=subject, email_thread=email_thread)
 
-    result = await llm_router.ainvoke(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
-    )
+        result = await _llm_triage(state["email_input"], triage_instructions, system_prompt, user_prompt)
 
     if result.classification == "respond":
         logger.info(f"{TRIAGE_ROUTER_NODE} Classification: RESPOND - This email requires a response")
@@ -93,26 +174,43 @@ async def triage_router_hitl_node(
         # Create email markdown for Agent Inbox in case of notification
         email_markdown = format_email_markdown(subject, author, to, email_thread)
 
-    if store:
-        # Search for existing triage_preferences memory
-        triage_instructions = await get_memory(
-            store=store, namespace=("email_assistant", "triage_preferences"), default_content=default_triage_instructions
-        )
-        logger.info(f"***{TRIAGE_ROUTER_HITL_NODE} fetch long-term memory for triage_instructions***")
+    # Sender and header rules classify obvious emails without an LLM call
+    if rule := match_triage_rules(state["email_input"]):
+        result = RouterSchema(reasoning=rule.reasoning, classification=rule.classification)
+    # Decision taken by batch triage at ingestion
+    elif pretriaged := pretriaged_decision(state["email_input"]):
+        result = pretriaged
+    # Confident predictions of the local classifier
+    elif local := classify_locally(state["email_input"]):
+        result = RouterSchema(reasoning=local.reasoning, classification=local.classification)
     else:
-        # No long-term memory - use default
-        triage_instructions = default_triage_instructions
-
-    system_prompt = triage_system_prompt.format(background=default_background, triage_instructions=triage_instructions)
-
-    user_prompt = triage_user_prompt.format(author=author, to=to, subject=subject, email_thread=email_thread)
-
-    result = await llm_router.ainvoke(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
-    )
+        few_shot_examples = []
+        if store and TRIAGE_FEW_SHOT:
+            # Similar past corrections instead of the triage preferences grown from them
+            triage_instructions = default_triage_instructions
+            few_shot_examples = await triage_few_shot_examples(store, state["email_input"])
+        elif store:
+            # Search for existing triage_preferences memory
+            triage_instructions = await get_memory(
+                store=store,
+                namespace=("email_assistant", "triage_preferences"),
+                default_content=default_triage_instructions,
+            )
+            logger.info(f"***{TRIAGE_ROUTER_HITL_NODE} fetch long-term memory for triage_instructions***")
+        else:
+            # No long-term memory - use default
+            triage_instructions = default_triage_instructions
+
+        system_prompt = triage_system_message(triage_instructions)
+
+        user_prompt = triage_user_prompt.format(author=author, to=to, subject=subject, email_thread=email_thread)
+        if few_shot_examples:
+            examples = format_few_shot_examples(few_shot_examples)
+            user_prompt = triage_few_shot_prompt.format(examples=examples) + user_prompt
+            # The examples are part of the prompt the cached decisions depend on
+            triage_instructions = f"{triage_instructions}\n{examples}"
+
+        result = await _llm_triage(state["email_input"], triage_instructions, system_prompt, user_prompt)
 
     if result.classification == "respond":
         logger.info(f"{TRIAGE_ROUTER_HITL_NODE} Classification: RESPOND - This email requires a response")
@@ -0,0 +1,224 @@
+"""Durable ledger of the Gmail messages already ingested into the LangGraph server.
+
+The ledger records, per mailbox, the message id, thread id, content hash and outcome of every
+ingested email so overlapping cron windows do not send the same email to triage twice.
+"""
+
+import hashlib
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Sequence
+
+from email_assistant import SRC_ROOT
+from email_assistant.logger import logger
+
+SQLITE_LEDGER_PATH = f"{SRC_ROOT}/config/ingest_ledger.sqlite"
+
+# Outcomes recorded in the ledger
+OUTCOME_INGESTED = "ingested"
+OUTCOME_FAILED = "failed"
+
+# Maximum number of message ids per bulk lookup query
+_LOOKUP_CHUNK_SIZE = 500
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS ingest_ledger (
+    mailbox TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    thread_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    run_id TEXT,
+    processed_at TEXT NOT NULL,
+    PRIMARY KEY (mailbox, message_id)
+)
+"""
+
+_UPSERT = """
+INSERT INTO ingest_ledger (mailbox, message_id, thread_id, content_hash, outcome, run_id, processed_at)
+VALUES ({placeholders})
+ON CONFLICT (mailbox, message_id) DO UPDATE SET
+    thread_id = excluded.thread_id,
+    content_hash = excluded.content_hash,
+    outcome = excluded.outcome,
+    run_id = excluded.run_id,
+    processed_at = excluded.processed_at
+"""
+
+
+def content_hash(email_data: Dict) -> str:
+    """Compute a stable hash of the content sent to the LangGraph server for an email."""
+    digest = hashlib.sha256()
+    for key in ("from_email", "to_email", "subject", "page_content"):
+        digest.update(str(email_data.get(key, "")).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+@dataclass
+class LedgerEntry:
+    """Ledger record of one ingested Gmail message."""
+
+    mailbox: str
+    message_id: str
+    thread_id: str
+    content_hash: str
+    outcome: str = OUTCOME_INGESTED
+    run_id: str | None = None
+    processed_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+    def _row(self) -> tuple:
+        return (
+            self.mailbox,
+            self.message_id,
+            self.thread_id,
+            self.content_hash,
+            self.outcome,
+            self.run_id,
+            self.processed_at,
+        )
+
+
+class IngestLedger(ABC):
+    """Base class of the processed-message ledger backends."""
+
+    @abstractmethod
+    async def setup(self):
+        """Create the ledger table if it does not exist."""
+
+    @abstractmethod
+    async def get_entries(self, mailbox: str, message_ids: Sequence[str]) -> Dict[str, LedgerEntry]:
+        """Return the ledger entries of the given messages, keyed by message id."""
+
+    @abstractmethod
+    async def record(self, entries: List[LedgerEntry]):
+        """Insert or update ledger entries."""
+
+    async def get_processed_ids(self, mailbox: str, message_ids: Sequence[str]) -> set:
+        """Return the subset of ``message_ids`` that were successfully ingested."""
+        entries = await self.get_entries(mailbox, message_ids)
+        return {message_id for message_id, entry in entries.items() if entry.outcome == OUTCOME_INGESTED}
+
+
+class SqliteIngestLedger(IngestLedger):
+    """SQLite ledger backend."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @classmethod
+    @asynccontextmanager
+    async def from_conn_string(cls, conn_string: str = SQLITE_LEDGER_PATH) -> AsyncIterator["SqliteIngestLedger"]:
+        """Open a SQLite ledger, creating the database file if needed."""
+        import aiosqlite
+
+        if conn_string != ":memory:":
+            Path(conn_string).parent.mkdir(parents=True, exist_ok=True)
+        async with aiosqlite.connect(conn_string) as conn:
+            ledger = cls(conn)
+            await ledger.setup()
+            yield ledger
+
+    async def setup(self):
+        """Create the ledger table if it does not exist."""
+        await self.conn.execute(_CREATE_TABLE)
+        await self.conn.commit()
+
+    async def get_entries(self, mailbox: str, message_ids: Sequence[str]) -> Dict[str, LedgerEntry]:
+        """Return the ledger entries of the given messages, keyed by message id."""
+        entries = {}
+        message_ids = list(message_ids)
+        for start in range(0, len(message_ids), _LOOKUP_CHUNK_SIZE):
+            chunk = message_ids[start : start + _LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            query = (
+                "SELECT mailbox, message_id, thread_id, content_hash, outcome, run_id, processed_at "
+                f"FROM ingest_ledger WHERE mailbox = ? AND message_id IN ({placeholders})"
+            )
+            async with self.conn.execute(query, [mailbox, *chunk]) as cursor:
+                async for row in cursor:
+                    entries[row[1]] = LedgerEntry(*row)
+        return entries
+
+    async def record(self, entries: List[LedgerEntry]):
+        """Insert or update ledger entries."""
+        if not entries:
+            return
+        await self.conn.executemany(_UPSERT.format(placeholders=", ".join("?" * 7)), [entry._row() for entry in entries])
+        await self.conn.commit()
+
+
+class PostgresIngestLedger(IngestLedger):
+    """Postgres ledger backend."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @classmethod
+    @asynccontextmanager
+    async def from_conn_string(cls, conn_string: str | None = None) -> AsyncIterator["PostgresIngestLedger"]:
+        """Open a Postgres ledger, defaulting to the POSTGRES_* environment configuration."""
+        from psycopg import AsyncConnection
+
+        from email_assistant.persistence.postgres_utils import get_db_uri
+
+        async with await AsyncConnection.connect(conn_string or get_db_uri(), autocommit=True) as conn:
+            ledger = cls(conn)
+            await ledger.setup()
+            yield ledger
+
+    async def setup(self):
+        """Create the ledger table if it does not exist."""
+        await self.conn.execute(_CREATE_TABLE)
+
+    async def get_entries(self, mailbox: str, message_ids: Sequence[str]) -> Dict[str, LedgerEntry]:
+        """Return the ledger entries of the given messages, keyed by message id."""
+        entries = {}
+        message_ids = list(message_ids)
+        for start in range(0, len(message_ids), _LOOKUP_CHUNK_SIZE):
+            chunk = message_ids[start : start + _LOOKUP_CHUNK_SIZE]
+            cursor = await self.conn.execute(
+                "SELECT mailbox, message_id, thread_id, content_hash, outcome, run_id, processed_at "
+                "FROM ingest_ledger WHERE mailbox = %s AND message_id = ANY(%s)",
+                (mailbox, chunk),
+            )
+            for row in await cursor.fetchall():
+                entries[row[1]] = LedgerEntry(*row)
+        return entries
+
+    async def record(self, entries: List[LedgerEntry]):
+        """Insert or update ledger entries."""
+        if not entries:
+            return
+        async with self.conn.cursor() as cursor:
+            await cursor.executemany(
+                _UPSERT.format(placeholders=", ".join(["%s"] * 7)), [entry._row() for entry in entries]
+            )
+
+
+@asynccontextmanager
+async def open_ingest_ledger(backend: str, conn_string: str | None = None) -> AsyncIterator[IngestLedger | None]:
+    """Open the ingest ledger for a backend.
+
+    Args:
+        backend: One of "sqlite", "postgres" or "none"
+        conn_string: Optional SQLite path or Postgres URI overriding the default location
+
+    Yields:
+        The ledger, or None when the ledger is disabled
+    """
+    if backend == "none":
+        yield None
+    elif backend == "sqlite":
+        async with SqliteIngestLedger.from_conn_string(conn_string or SQLITE_LEDGER_PATH) as ledger:
+            logger.info(f"Using SQLite ingest ledger at {conn_string or SQLITE_LEDGER_PATH}")
+            yield ledger
+    elif backend == "postgres":
+        async with PostgresIngestLedger.from_conn_string(conn_string) as ledger:
+            logger.info("Using Postgres ingest ledger")
+            yield ledger
+    else:
+        raise ValueError(f"Invalid ledger backend: {backend}. Choose from 'sqlite', 'postgres' or 'none'.")
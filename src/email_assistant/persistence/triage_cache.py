@@ -0,0 +1,350 @@
+"""Content-addressed cache of LLM triage decisions.
+
+Triage runs at temperature 0, so the same email classified with the same prompt, instructions and
+model gets the same decision. Reruns of a thread (``rollback`` multitask strategy), duplicate
+forwards and identical automated notifications reuse the cached decision instead of calling the
+LLM again.
+
+The key is a hash of the normalized email (sender address, recipients, subject without reply and
+forward prefixes, normalized body), the triage prompt version, the model name and the triage
+instructions. Instructions come from long-term memory, so updating the triage preferences
+invalidates the decisions taken with the old ones. Entries expire after a TTL and the least
+recently used ones are evicted above a maximum number of entries.
+
+The backend is selected with ``TRIAGE_CACHE_BACKEND``: ``memory`` (default), ``sqlite``,
+``postgres`` or ``none``. ``TRIAGE_CACHE_PATH`` overrides the SQLite path or the Postgres URI,
+``TRIAGE_CACHE_TTL_SECONDS`` and ``TRIAGE_CACHE_MAX_ENTRIES`` bound the cache.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.utils import getaddresses, parseaddr
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict
+
+from email_assistant import SRC_ROOT
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.normalize import normalize_email_body
+
+SQLITE_TRIAGE_CACHE_PATH = f"{SRC_ROOT}/config/triage_cache.sqlite"
+
+TRIAGE_CACHE_BACKEND = os.getenv("TRIAGE_CACHE_BACKEND", "memory")
+TRIAGE_CACHE_PATH = os.getenv("TRIAGE_CACHE_PATH")
+TRIAGE_CACHE_TTL_SECONDS = float(os.getenv("TRIAGE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+TRIAGE_CACHE_MAX_ENTRIES = int(os.getenv("TRIAGE_CACHE_MAX_ENTRIES", "10000"))
+
+_SUBJECT_PREFIX_RE = re.compile(r"^\s*((re|fwd?|tr|aw|wg)\s*:\s*)+", re.I)
+_SPACES_RE = re.compile(r"\s+")
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS triage_cache (
+    key TEXT PRIMARY KEY,
+    classification TEXT NOT NULL,
+    reasoning TEXT NOT NULL,
+    created_at DOUBLE PRECISION NOT NULL,
+    used_at DOUBLE PRECISION NOT NULL
+)
+"""
+
+_UPSERT = """
+INSERT INTO triage_cache (key, classification, reasoning, created_at, used_at)
+VALUES ({placeholders})
+ON CONFLICT (key) DO UPDATE SET
+    classification = excluded.classification,
+    reasoning = excluded.reasoning,
+    created_at = excluded.created_at,
+    used_at = excluded.used_at
+"""
+
+# Least recently used entries above the maximum size
+_EVICT = """
+DELETE FROM triage_cache WHERE key IN (
+    SELECT key FROM triage_cache ORDER BY used_at ASC
+    LIMIT {greatest}(0, (SELECT COUNT(*) FROM triage_cache) - {placeholder})
+)
+"""
+
+# Evict every this many insertions rather than on every one
+_EVICT_EVERY = 100
+
+
+def prompt_version(*templates: str) -> str:
+    """Return a short hash identifying a version of the triage prompt templates."""
+    digest = hashlib.sha256()
+    for template in templates:
+        digest.update(template.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+
+def triage_cache_key(email_input: Dict[str, Any], triage_instructions: str, model_name: str, version: str) -> str:
+    """Compute the cache key of the triage of an email.
+
+    Args:
+        email_input: Email input of the graph, in the Gmail or the evaluation schema
+        triage_instructions: Triage instructions of the prompt
+        model_name: Name of the triage model
+        version: Version of the triage prompt templates, see ``prompt_version``
+    """
+    _, sender = parseaddr(email_input.get("from") or email_input.get("author") or "")
+    recipients = sorted(address.lower() for _, address in getaddresses([email_input.get("to") or ""]) if address)
+    subject = _SUBJECT_PREFIX_RE.sub("", email_input.get("subject") or "")
+    body = normalize_email_body(email_input.get("body") or email_input.get("email_thread") or "").text
+
+    digest = hashlib.sha256()
+    for part in (
+        version,
+        model_name,
+        triage_instructions or "",
+        sender.lower(),
+        ",".join(recipients),
+        _SPACES_RE.sub(" ", subject).strip().lower(),
+        _SPACES_RE.sub(" ", body).strip(),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedTriage:
+    """Cached triage decision."""
+
+    classification: str
+    reasoning: str
+    created_at: float
+
+
+class TriageCache(ABC):
+    """Base class of the triage cache backends.
+
+    Args:
+        ttl: Seconds after which an entry expires
+        max_entries: Maximum number of entries, the least recently used ones are evicted
+    """
+
+    def __init__(self, ttl: float = TRIAGE_CACHE_TTL_SECONDS, max_entries: int = TRIAGE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+    async def get(self, key: str) -> CachedTriage | None:
+        """Return the cached decision of a key, or None if it is missing or expired."""
+        entry = await self._get(key, time.time())
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def put(self, key: str, classification: str, reasoning: str):
+        """Cache a decision, evicting expired and least recently used entries from time to time."""
+        now = time.time()
+        await self._put(key, CachedTriage(classification, reasoning, now))
+        self._puts += 1
+        if self._puts % _EVICT_EVERY == 0:
+            await self.evict(now)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the cache metrics as a dict."""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    @abstractmethod
+    async def _get(self, key: str, now: float) -> CachedTriage | None:
+        """Return the unexpired entry of a key and mark it as used."""
+
+    @abstractmethod
+    async def _put(self, key: str, entry: CachedTriage):
+        """Insert or replace an entry."""
+
+    @abstractmethod
+    async def evict(self, now: float | None = None):
+        """Remove the expired entries and the least recently used ones above ``max_entries``."""
+
+    async def close(self):
+        """Release the resources of the backend."""
+
+
+class MemoryTriageCache(TriageCache):
+    """In-process LRU backend, lost on restart."""
+
+    def __init__(self, ttl: float = TRIAGE_CACHE_TTL_SECONDS, max_entries: int = TRIAGE_CACHE_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self._entries: OrderedDict[str, CachedTriage] = OrderedDict()
+
+    async def _get(self, key: str, now: float) -> CachedTriage | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry.created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def _put(self, key: str, entry: CachedTriage):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def evict(self, now: float | None = None):
+        """Remove the expired entries and the least recently used ones above ``max_entries``."""
+        cutoff = (now or time.time()) - self.ttl
+        for key in [key for key, entry in self._entries.items() if entry.created_at < cutoff]:
+            del self._entries[key]
+
+
+class SqliteTriageCache(TriageCache):
+    """SQLite backend, shared by the processes of a host."""
+
+    def __init__(self, conn, ttl: float = TRIAGE_CACHE_TTL_SECONDS, max_entries: int = TRIAGE_CACHE_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self.conn = conn
+
+    @classmethod
+    async def connect(cls, conn_string: str = SQLITE_TRIAGE_CACHE_PATH, **kwargs) -> "SqliteTriageCache":
+        """Open a SQLite cache, creating the database file if needed."""
+        import aiosqlite
+
+        if conn_string != ":memory:":
+            Path(conn_string).parent.mkdir(parents=True, exist_ok=True)
+        cache = cls(await aiosqlite.connect(conn_string), **kwargs)
+        await cache.conn.execute(_CREATE_TABLE)
+        await cache.conn.commit()
+        return cache
+
+    async def _get(self, key: str, now: float) -> CachedTriage | None:
+        async with self.conn.execute(
+            "SELECT classification, reasoning, created_at FROM triage_cache WHERE key = ? AND created_at >= ?",
+            (key, now - self.ttl),
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        await self.conn.execute("UPDATE triage_cache SET used_at = ? WHERE key = ?", (now, key))
+        await self.conn.commit()
+        return CachedTriage(*row)
+
+    async def _put(self, key: str, entry: CachedTriage):
+        await self.conn.execute(
+            _UPSERT.format(placeholders=", ".join("?" * 5)),
+            (key, entry.classification, entry.reasoning, entry.created_at, entry.created_at),
+        )
+        await self.conn.commit()
+
+    async def evict(self, now: float | None = None):
+        """Remove the expired entries and the least recently used ones above ``max_entries``."""
+        await self.conn.execute("DELETE FROM triage_cache WHERE created_at < ?", ((now or time.time()) - self.ttl,))
+        await self.conn.execute(_EVICT.format(greatest="MAX", placeholder="?"), (self.max_entries,))
+        await self.conn.commit()
+
+    async def close(self):
+        """Close the database connection."""
+        await self.conn.close()
+
+
+class PostgresTriageCache(TriageCache):
+    """Postgres backend, shared by every replica of the LangGraph server."""
+
+    def __init__(self, conn, ttl: float = TRIAGE_CACHE_TTL_SECONDS, max_entries: int = TRIAGE_CACHE_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self.conn = conn
+
+    @classmethod
+    async def connect(cls, conn_string: str | None = None, **kwargs) -> "PostgresTriageCache":
+        """Open a Postgres cache, defaulting to the POSTGRES_* environment configuration."""
+        from psycopg import AsyncConnection
+
+        from email_assistant.persistence.postgres_utils import get_db_uri
+
+        cache = cls(await AsyncConnection.connect(conn_string or get_db_uri(), autocommit=True), **kwargs)
+        await cache.conn.execute(_CREATE_TABLE)
+        return cache
+
+    async def _get(self, key: str, now: float) -> CachedTriage | None:
+        cursor = await self.conn.execute(
+            "UPDATE triage_cache SET used_at = %s WHERE key = %s AND created_at >= %s "
+            "RETURNING classification, reasoning, created_at",
+            (now, key, now - self.ttl),
+        )
+        row = await cursor.fetchone()
+        return CachedTriage(*row) if row else None
+
+    async def _put(self, key: str, entry: CachedTriage):
+        await self.conn.execute(
+            _UPSERT.format(placeholders=", ".join(["%s"] * 5)),
+            (key, entry.classification, entry.reasoning, entry.created_at, entry.created_at),
+        )
+
+    async def evict(self, now: float | None = None):
+        """Remove the expired entries and the least recently used ones above ``max_entries``."""
+        await self.conn.execute("DELETE FROM triage_cache WHERE created_at < %s", ((now or time.time()) - self.ttl,))
+        await self.conn.execute(_EVICT.format(greatest="GREATEST", placeholder="%s"), (self.max_entries,))
+
+    async def close(self):
+        """Close the database connection."""
+        await self.conn.close()
+
+
+async def create_triage_cache(backend: str, conn_string: str | None = None, **kwargs) -> TriageCache | None:
+    """Create the triage cache of a backend.
+
+    Args:
+        backend: One of "memory", "sqlite", "postgres" or "none"
+        conn_string: Optional SQLite path or Postgres URI overriding the default location
+        **kwargs: ``ttl`` and ``max_entries`` of the cache
+
+    Returns:
+        The cache, or None when the cache is disabled
+    """
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryTriageCache(**kwargs)
+    if backend == "sqlite":
+        logger.info(f"Using SQLite triage cache at {conn_string or SQLITE_TRIAGE_CACHE_PATH}")
+        return await SqliteTriageCache.connect(conn_string or SQLITE_TRIAGE_CACHE_PATH, **kwargs)
+    if backend == "postgres":
+        logger.info("Using Postgres triage cache")
+        return await PostgresTriageCache.connect(conn_string, **kwargs)
+    raise ValueError(f"Invalid triage cache backend: {backend}. Choose from 'memory', 'sqlite', 'postgres' or 'none'.")
+
+
+@asynccontextmanager
+async def open_triage_cache(backend: str, conn_string: str | None = None, **kwargs) -> AsyncIterator[TriageCache | None]:
+    """Open a triage cache for the duration of the context, see ``create_triage_cache``."""
+    cache = await create_triage_cache(backend, conn_string, **kwargs)
+    try:
+        yield cache
+    finally:
+        if cache is not None:
+            await cache.close()
+
+
+_cache: TriageCache | None = None
+_cache_lock = asyncio.Lock()
+
+
+async def get_triage_cache() -> TriageCache | None:
+    """Return the process-wide triage cache configured by the environment, opened on first use."""
+    global _cache
+    if _cache is None and TRIAGE_CACHE_BACKEND != "none":
+        async with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = await create_triage_cache(TRIAGE_CACHE_BACKEND, TRIAGE_CACHE_PATH)
+                except Exception as e:
+                    # Triage goes on without the cache, opening it is retried on the next email
+                    logger.warning(f"Could not open the {TRIAGE_CACHE_BACKEND} triage cache: {str(e)}")
+    return _cache
@@ -0,0 +1,198 @@
+"""Assembly of the system prompts, memoized and laid out for provider prompt caching.
+
+OpenAI, Anthropic and most hosted providers cache the longest prompt prefix already seen and bill
+and serve it faster, provided the prefix is byte-identical. The system prompts therefore put their
+static blocks first (role, tools, instructions, background), then the preferences read from
+long-term memory, and the date of the agent prompts last, so that a memory update or a new day
+only invalidates the end of the prompt. The email always comes after, in the user message.
+
+Rendered system prompts are memoized by template and by a hash of the values filled in, i.e. per
+version of the preferences: nodes reuse the same string instead of formatting the large static
+blocks on every call.
+
+``track_prompt_cache`` attaches a callback to a chat model that reads the cached input tokens from
+the usage metadata of its responses (``input_token_details.cache_read``, or the OpenAI
+``prompt_tokens_details.cached_tokens``) and records them in ``prompt_cache_stats``. Providers that
+don't report cached tokens, such as ollama, count as misses.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from email_assistant.logger import logger
+from email_assistant.prompts import (
+    agent_system_prompt,
+    default_background,
+    default_cal_preferences,
+    default_response_preferences,
+    default_triage_instructions,
+    triage_system_prompt,
+)
+
+# Number of rendered system prompts kept in memory
+SYSTEM_PROMPT_CACHE_SIZE = int(os.getenv("SYSTEM_PROMPT_CACHE_SIZE", "64"))
+
+
+class SystemPromptCache:
+    """LRU cache of rendered system prompts keyed by template and a hash of the values filled in.
+
+    Args:
+        maxsize: Number of rendered prompts kept
+    """
+
+    def __init__(self, maxsize: int = SYSTEM_PROMPT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, name: str, template: str, **values: str) -> str:
+        """Return ``template`` formatted with ``values``, from the cache if possible."""
+        digest = hashlib.blake2b(digest_size=16)
+        for key in sorted(values):
+            digest.update(key.encode("utf-8"))
+            digest.update(b"\x00")
+            digest.update(str(values[key]).encode("utf-8", "surrogatepass"))
+            digest.update(b"\x00")
+        key = (name, digest.digest())
+
+        with self._lock:
+            prompt = self._entries.get(key)
+            if prompt is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prompt
+            self.misses += 1
+
+        prompt = template.format(**values)
+        with self._lock:
+            self._entries[key] = prompt
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return prompt
+
+    def info(self) -> Dict[str, Any]:
+        """Return the cache metrics as a dict."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+system_prompt_cache = SystemPromptCache()
+
+
+def triage_system_message(triage_instructions: str | None = None, background: str = default_background) -> str:
+    """Return the triage system prompt of a version of the triage instructions."""
+    return system_prompt_cache.render(
+        "triage",
+        triage_system_prompt,
+        background=background,
+        triage_instructions=triage_instructions or default_triage_instructions,
+    )
+
+
+def agent_system_message(
+    tools_prompt: str,
+    response_preferences: str | None = None,
+    cal_preferences: str | None = None,
+    background: str = default_background,
+) -> str:
+    """Return the agent system prompt of a tools prompt and a version of the preferences, dated today."""
+    return system_prompt_cache.render(
+        "agent",
+        agent_system_prompt,
+        tools_prompt=tools_prompt,
+        background=background,
+        response_preferences=response_preferences or default_response_preferences,
+        cal_preferences=cal_preferences or default_cal_preferences,
+        today=datetime.now().strftime("%Y-%m-%d"),
+    )
+
+
+@dataclass
+class PromptCacheStats:
+    """Input tokens served from the provider prompt cache, per chat model."""
+
+    calls: Dict[str, int] = field(default_factory=dict)
+    hit_calls: Dict[str, int] = field(default_factory=dict)
+    input_tokens: Dict[str, int] = field(default_factory=dict)
+    cached_tokens: Dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, name: str, input_tokens: int, cached_tokens: int):
+        """Record one call of a chat model and the number of its cached input tokens."""
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.hit_calls[name] = self.hit_calls.get(name, 0) + (cached_tokens > 0)
+            self.input_tokens[name] = self.input_tokens.get(name, 0) + input_tokens
+            self.cached_tokens[name] = self.cached_tokens.get(name, 0) + cached_tokens
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return the statistics of every chat model as a dict."""
+        with self._lock:
+            return {
+                name: {
+                    "calls": calls,
+                    "hit_calls": self.hit_calls[name],
+                    "input_tokens": self.input_tokens[name],
+                    "cached_tokens": self.cached_tokens[name],
+                    "cached_rate": self.cached_tokens[name] / self.input_tokens[name] if self.input_tokens[name] else 0.0,
+                }
+                for name, calls in self.calls.items()
+            }
+
+
+prompt_cache_stats = PromptCacheStats()
+
+
+def cached_input_tokens(message: Any, llm_output: Dict[str, Any] | None = None) -> Tuple[int, int]:
+    """Return the input and cached input tokens of a chat model response, 0 when not reported."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens", 0) or 0
+    cached = (usage.get("input_token_details") or {}).get("cache_read")
+    if cached is None:
+        token_usage = (llm_output or {}).get("token_usage") or {}
+        cached = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        input_tokens = input_tokens or token_usage.get("prompt_tokens", 0) or 0
+    return input_tokens, cached or 0
+
+
+class PromptCacheCallback(BaseCallbackHandler):
+    """Record the cached input tokens of the responses of a chat model in ``prompt_cache_stats``."""
+
+    def __init__(self, name: str, stats: PromptCacheStats = prompt_cache_stats):
+        self.name = name
+        self.stats = stats
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any):
+        """Record the token usage of every generation of a finished call."""
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is None:
+                    continue
+                input_tokens, cached = cached_input_tokens(message, response.llm_output)
+                self.stats.record(self.name, input_tokens, cached)
+                summary = self.stats.summary()[self.name]
+                logger.info(
+                    f"Prompt cache [{self.name}]: {cached}/{input_tokens} input tokens cached - "
+                    f"{summary['hit_calls']}/{summary['calls']} calls hit, "
+                    f"{100 * summary['cached_rate']:.0f}% of input tokens cached"
+                )
+
+
+def track_prompt_cache(llm, name: str):
+    """Record the prompt cache hits of the responses of a chat model under ``name``, and return it.
+
+    The callback is set on the model itself rather than with ``with_config``: the runnables built
+    from it by ``bind_tools`` and ``with_structured_output`` wrap the model, not the binding.
+    """
+    llm.callbacks = list(llm.callbacks or []) + [PromptCacheCallback(name)]
+    return llm
@@ -34,7 +34,28 @@ To: {to}
 Subject: {subject}
 {email_thread}"""
 
-# Email assistant prompt
+# Similar emails whose classification the user corrected, before triage_user_prompt, see triage/few_shot.py
+triage_few_shot_prompt = """
+Here are previous emails similar to the one below, with the classification the user chose for them:
+
+{examples}
+"""
+
+# Email assistant batch triage user prompt, one batch_triage_email_prompt per email
+batch_triage_user_prompt = """
+Please determine how to handle each of the below {count} email threads independently.
+Return exactly one classification per email, with the email_id given in its <email> tag.
+
+{emails}"""
+
+batch_triage_email_prompt = """<email email_id="{email_id}">
+From: {author}
+To: {to}
+Subject: {subject}
+{email_thread}
+</email>"""
+
+# Email assistant prompt, static blocks first and the date last for provider prompt caching, see prompt_assembly.py
 agent_system_prompt = (
     """
 < Role >
@@ -53,9 +74,7 @@ When handling emails, follow these steps:
 3. For responding to the email, draft a response email with the write_email tool
 4. For meeting requests, use the check_calendar_availability tool to find open time slots
 5. To schedule a meeting, use the schedule_meeting tool with a datetime object for the preferred_day parameter
-   - Today's date is """
-    + datetime.now().strftime("%Y-%m-%d")
-    + """ - use this for scheduling meetings accurately
+   - Use today's date, given at the end of this prompt, to schedule meetings accurately
 6. If you scheduled a meeting, then draft a short response email using the write_email tool
 7. After using the write_email tool, the task is complete
 8. If you have sent the email, then use the Done tool to indicate that the task is complete
@@ -72,6 +91,10 @@ When handling emails, follow these steps:
 < Calendar Preferences >
 {cal_preferences}
 </ Calendar Preferences >
+
+< Today >
+Today's date is {today}
+</ Today >
 """
 )
 
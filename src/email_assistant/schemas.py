@@ -1,3 +1,5 @@
+from typing import List
+
 from langgraph.graph import MessagesState
 from pydantic import BaseModel, Field
 from typing_extensions import Literal, TypedDict
@@ -14,6 +16,46 @@ class RouterSchema(BaseModel):
     )
 
 
+class ScoredRouterSchema(RouterSchema):
+    """Route the unread email according to its content and rate the confidence in the classification."""
+
+    confidence: float = Field(
+        ge=0.0,
+        le=1.0,
+        description="Confidence in the classification, from 0 (guess) to 1 (certain). "
+        "Use a low confidence when the email is ambiguous or the triage instructions don't cover it.",
+    )
+
+
+class StreamingRouterSchema(BaseModel):
+    """Route the unread email according to its content, giving the classification before the reasoning."""
+
+    classification: Literal["ignore", "respond", "notify"] = Field(
+        description="The classification of an email: 'ignore' for irrelevant emails, "
+        "'notify' for important information that doesn't need a response, "
+        "'respond' for emails that need a reply",
+    )
+    reasoning: str = Field(default="", description="Brief reasoning behind the classification.")
+
+
+class EmailClassification(BaseModel):
+    """Route one email of a batch according to its content."""
+
+    email_id: str = Field(description="The email_id of the email, as given in its <email> tag.")
+    reasoning: str = Field(description="Brief reasoning behind the classification.")
+    classification: Literal["ignore", "respond", "notify"] = Field(
+        description="The classification of the email: 'ignore' for irrelevant emails, "
+        "'notify' for important information that doesn't need a response, "
+        "'respond' for emails that need a reply",
+    )
+
+
+class BatchRouterSchema(BaseModel):
+    """Analyze a batch of unread emails and route each of them according to its content."""
+
+    classifications: List[EmailClassification] = Field(description="One classification per email of the batch.")
+
+
 class StateInput(TypedDict):
     # This is the input to the state
     email_input: dict
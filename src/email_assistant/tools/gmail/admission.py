@@ -0,0 +1,181 @@
+"""Admission control of ingestion runs based on the LangGraph server's run backlog.
+
+Ingestion submits one run per email. Without a limit, a morning inbox burst puts hundreds of runs
+in the server's queue at once, and the human-in-the-loop runs of every user wait behind them. The
+controller probes how many threads of the target graph are busy (running or with a pending run)
+and slows down, then pauses, submission above configurable watermarks.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict
+
+from langgraph_sdk.client import LangGraphClient
+
+from email_assistant.logger import logger
+
+DEFAULT_MAX_ADMISSION_DELAY = 1.0
+DEFAULT_BACKLOG_PROBE_INTERVAL = 1.0
+
+
+class RunBacklogProbe:
+    """Count the threads of a graph with a running or pending run.
+
+    The LangGraph server tags threads with the ``graph_id`` of their runs and reports them as
+    ``busy`` while a run is pending or running, so a thread search gives the backlog without
+    listing the runs of every thread.
+
+    Args:
+        client: LangGraph SDK client
+        graph_name: Graph the ingestion runs are submitted to
+        limit: Largest backlog worth counting, larger backlogs are reported as ``limit``
+    """
+
+    def __init__(self, client: LangGraphClient, graph_name: str, limit: int):
+        self.client = client
+        self.graph_name = graph_name
+        self.limit = limit
+
+    async def depth(self) -> int:
+        """Return the number of busy threads of the graph, capped at ``limit``."""
+        threads = await self.client.threads.search(
+            metadata={"graph_id": self.graph_name}, status="busy", limit=self.limit
+        )
+        return len(threads)
+
+
+class AdmissionController:
+    """Gate run submissions on the server backlog of the target graph.
+
+    Below ``low_watermark`` busy threads runs are admitted right away. Between the watermarks every
+    admission is delayed in proportion to the backlog, up to ``max_delay`` seconds, and admissions
+    are serialized so the submission rate drops as the backlog grows. At ``high_watermark``
+    submission pauses until the backlog drains back to ``low_watermark``.
+
+    The backlog is probed at most every ``probe_interval`` seconds. Runs admitted since the last
+    probe are added to it, so concurrent workers can't overshoot a watermark between two probes.
+    When a probe fails the last known backlog is used.
+
+    Args:
+        probe: Backlog probe of the target graph
+        high_watermark: Backlog at which submission pauses
+        low_watermark: Backlog below which runs are admitted without delay, and at which a paused
+            submission resumes (defaults to half of ``high_watermark``)
+        max_delay: Delay in seconds of an admission just below ``high_watermark``
+        probe_interval: Minimum seconds between two backlog probes
+    """
+
+    def __init__(
+        self,
+        probe: RunBacklogProbe,
+        high_watermark: int,
+        low_watermark: int | None = None,
+        max_delay: float = DEFAULT_MAX_ADMISSION_DELAY,
+        probe_interval: float = DEFAULT_BACKLOG_PROBE_INTERVAL,
+    ):
+        self.probe = probe
+        self.high_watermark = max(1, high_watermark)
+        low_watermark = self.high_watermark // 2 if low_watermark is None else low_watermark
+        self.low_watermark = min(max(0, low_watermark), self.high_watermark - 1)
+        self.max_delay = max_delay
+        self.probe_interval = probe_interval
+        self.paused = False
+
+        # Metrics
+        self.probes = 0
+        self.probe_errors = 0
+        self.max_depth = 0
+        self.admitted = 0
+        self.delayed = 0
+        self.pauses = 0
+        self.throttled_seconds = 0.0
+        self.paused_seconds = 0.0
+
+        self._depth = 0
+        self._probed_at: float | None = None
+        self._admitted_since_probe = 0
+        self._lock = asyncio.Lock()
+
+    async def _current_depth(self) -> int:
+        now = time.monotonic()
+        if self._probed_at is None or now - self._probed_at >= self.probe_interval:
+            try:
+                self._depth = await self.probe.depth()
+                self._admitted_since_probe = 0
+                self.probes += 1
+            except Exception as e:
+                self.probe_errors += 1
+                logger.warning(f"Could not probe the LangGraph run backlog: {str(e)}")
+            self._probed_at = now
+        depth = self._depth + self._admitted_since_probe
+        self.max_depth = max(self.max_depth, depth)
+        return depth
+
+    async def acquire(self) -> float:
+        """Wait until one more run may be submitted.
+
+        Returns:
+            Seconds the caller waited for admission
+        """
+        start = time.perf_counter()
+        async with self._lock:
+            while True:
+                depth = await self._current_depth()
+                if self.paused and depth <= self.low_watermark:
+                    self.paused = False
+                    logger.info(f"Run backlog down to {depth}, resuming ingestion")
+                elif not self.paused and depth >= self.high_watermark:
+                    self.paused = True
+                    self.pauses += 1
+                    logger.info(f"Run backlog at {depth}, pausing ingestion until it drains to {self.low_watermark}")
+                if not self.paused:
+                    break
+                await self._throttle(self.probe_interval, paused=True)
+
+            if depth > self.low_watermark:
+                self.delayed += 1
+                fraction = (depth - self.low_watermark) / (self.high_watermark - self.low_watermark)
+                await self._throttle(self.max_delay * fraction)
+
+            self._admitted_since_probe += 1
+            self.admitted += 1
+        return time.perf_counter() - start
+
+    async def _throttle(self, seconds: float, paused: bool = False):
+        # Admissions are serialized, so these sleeps add up to the wall-clock time spent throttled
+        start = time.perf_counter()
+        await asyncio.sleep(seconds)
+        elapsed = time.perf_counter() - start
+        self.throttled_seconds += elapsed
+        if paused:
+            self.paused_seconds += elapsed
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the admission metrics as a dict."""
+        return {
+            "high_watermark": self.high_watermark,
+            "low_watermark": self.low_watermark,
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "pauses": self.pauses,
+            "throttled_s": self.throttled_seconds,
+            "paused_s": self.paused_seconds,
+            "max_depth": self.max_depth,
+            "probes": self.probes,
+            "probe_errors": self.probe_errors,
+        }
+
+
+def create_admission_controller(client: LangGraphClient, args) -> AdmissionController | None:
+    """Return the admission controller configured by the ingestion options, or None if disabled."""
+    high_watermark = getattr(args, "max_pending_runs", 0) or 0
+    if high_watermark <= 0:
+        return None
+    probe = RunBacklogProbe(client, args.graph_name, limit=high_watermark + 1)
+    return AdmissionController(
+        probe,
+        high_watermark=high_watermark,
+        low_watermark=getattr(args, "resume_pending_runs", None),
+        max_delay=getattr(args, "max_admission_delay", DEFAULT_MAX_ADMISSION_DELAY),
+        probe_interval=getattr(args, "backlog_probe_interval", DEFAULT_BACKLOG_PROBE_INTERVAL),
+    )
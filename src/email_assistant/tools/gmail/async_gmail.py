@@ -0,0 +1,105 @@
+"""Bounded executor running the blocking Gmail and Calendar API calls off the event loop.
+
+``googleapiclient`` and ``httplib2`` are synchronous. The graph nodes and tools await these
+helpers instead, so a slow Gmail call only occupies one of the executor's worker threads and never
+stalls the other graphs sharing the server's event loop. The executor is dedicated to Google API
+calls, so a burst of tool calls cannot exhaust the loop's default executor either.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, TypeVar
+
+from email_assistant.logger import logger
+
+T = TypeVar("T")
+
+# Maximum number of Google API calls running at the same time in one process
+GMAIL_EXECUTOR_MAX_WORKERS = int(os.getenv("GMAIL_EXECUTOR_MAX_WORKERS", "8"))
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_gmail_executor() -> ThreadPoolExecutor:
+    """Return the process-wide executor of Google API calls, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=GMAIL_EXECUTOR_MAX_WORKERS, thread_name_prefix="gmail-io")
+        return _executor
+
+
+def configure_gmail_executor(max_workers: int):
+    """Replace the executor with one of ``max_workers`` threads, letting running calls finish."""
+    global _executor
+    with _executor_lock:
+        previous, _executor = _executor, ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gmail-io")
+    if previous is not None:
+        previous.shutdown(wait=False)
+    logger.info(f"Gmail executor configured with {max_workers} workers")
+
+
+async def run_in_gmail_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking Google API call in the Gmail executor and await its result.
+
+    The caller's context variables are propagated to the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_gmail_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+async def aiterate_in_gmail_executor(iterable: Iterable[T]) -> AsyncIterator[T]:
+    """Consume a blocking iterable (e.g. a Gmail fetch generator) in the Gmail executor.
+
+    The whole iteration runs on a single worker thread, so thread-bound resources such as the
+    per-thread cached Gmail service stay on one thread. Items are handed to the event loop as soon
+    as they are produced. Leaving the ``async for`` early stops the iteration after the item in
+    progress.
+    """
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def _put(item: Any, error: BaseException | None = None):
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, (item, error))
+        except RuntimeError:
+            # The event loop was closed while the iteration was still running
+            stop.set()
+
+    def _drain():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                _put(item)
+        except Exception as e:
+            _put(done, e)
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        _put(done)
+
+    future = loop.run_in_executor(get_gmail_executor(), functools.partial(contextvars.copy_context().run, _drain))
+    try:
+        while True:
+            item, error = await items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        stop.set()
+        if future.done():
+            future.result()
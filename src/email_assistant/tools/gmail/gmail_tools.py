@@ -6,15 +6,29 @@ This module formats the Gmail API functions into LangChain tools.
 import base64
 import json
 import os
+import queue
+import threading
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 from zoneinfo import ZoneInfo
 
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
 from email_assistant.logger import logger
+from email_assistant.tools.gmail.async_gmail import (
+    aiterate_in_gmail_executor,
+    run_in_gmail_executor,
+)
+from email_assistant.tools.gmail.history_sync import (
+    HistoryWatermarkStore,
+    IncrementalSync,
+)
+from email_assistant.tools.gmail.mime import extract_message_part
+from email_assistant.tools.gmail.normalize import normalize_email_body
+from email_assistant.triage.rules import select_triage_headers
 
 # Define paths for credentials and tokens
 _ROOT = Path(__file__).parent.absolute()
@@ -27,35 +41,23 @@ try:
     from datetime import timedelta
     from email.mime.text import MIMEText
 
+    import httplib2
     from dateutil.parser import parse as parse_time
     from google.auth.transport.requests import Request  # noqa F401
     from google.oauth2.credentials import Credentials  # noqa F401
+    from google_auth_httplib2 import AuthorizedHttp
     from google_auth_oauthlib.flow import InstalledAppFlow  # noqa F401
-    from googleapiclient.discovery import build
+    from googleapiclient.discovery import build  # noqa F401
+
+    from email_assistant.tools.gmail.http_metrics import (
+        CountingHttp,
+        counting_authorized_http,
+    )
+    from email_assistant.tools.gmail.service_factory import get_service_factory
 
     # Setup logging
     # logging.basicConfig(level=logging.INFO)
     # logger = logging.getLogger(__name__)
-    # Email content extraction function
-    def extract_message_part(payload):
-        """Extract content from a message part."""
-        if payload.get("body", {}).get("data"):
-            # Handle base64 encoded content
-            data = payload["body"]["data"]
-            decoded = base64.urlsafe_b64decode(data).decode("utf-8")
-            return decoded
-
-        # Handle multipart messages
-        if payload.get("parts"):
-            text_parts = []
-            for part in payload["parts"]:
-                # Recursively process parts
-                content = extract_message_part(part)
-                if content:
-                    text_parts.append(content)
-            return "\n".join(text_parts)
-
-        return ""
 
     # Function to get credentials from token.json or environment variables
     def get_credentials(gmail_token=None, gmail_secret=None):
@@ -146,6 +148,574 @@ tz_str = "America/Toronto"
 tz = ZoneInfo(tz_str)
 
 
+# Gmail accepts at most 100 calls in a single batch HTTP request
+GMAIL_BATCH_MAX_REQUESTS = 100
+
+# Partial responses: the thread analysis only needs the senders and dates of the thread messages,
+# message bodies are downloaded only for the messages that are processed
+THREAD_METADATA_HEADERS = ["From", "Date"]
+THREAD_METADATA_FIELDS = "id,messages(id,threadId,internalDate,payload/headers)"
+MESSAGE_FULL_FIELDS = "id,threadId,labelIds,internalDate,payload"
+MESSAGE_LIST_FIELDS = "messages(id,threadId),nextPageToken"
+
+
+def _execute_batch(service, requests: List[tuple], batch_size: int = GMAIL_BATCH_MAX_REQUESTS) -> Dict[str, Any]:
+    """
+    Execute Gmail API calls through batch HTTP requests.
+
+    Args:
+        service: Gmail API service object
+        requests: List of (request_id, request) tuples, request IDs must be unique
+        batch_size: Maximum number of sub-requests sent in one batch HTTP request
+
+    Returns:
+        Dict mapping each request ID to its response. Failed sub-requests are logged and omitted.
+    """
+    batch_size = max(1, min(batch_size, GMAIL_BATCH_MAX_REQUESTS))
+    responses = {}
+
+    def _callback(request_id, response, exception):
+        if exception is not None:
+            logger.warning(f"Batch sub-request {request_id} failed: {str(exception)}")
+        else:
+            responses[request_id] = response
+
+    for start in range(0, len(requests), batch_size):
+        batch = service.new_batch_http_request(callback=_callback)
+        for request_id, request in requests[start : start + batch_size]:
+            batch.add(request, request_id=request_id)
+        batch.execute()
+
+    return responses
+
+
+def _get_header(headers: List[Dict[str, str]], name: str, default: str | None = None) -> str | None:
+    """Return the value of the first header called ``name``."""
+    return next((header["value"] for header in headers if header["name"] == name), default)
+
+
+@dataclass
+class ThreadAnalysis:
+    """Chronologically sorted Gmail thread and the decisions derived from its latest message."""
+
+    thread_id: str
+    messages: List[Dict[str, Any]]
+    last_message: Dict[str, Any]
+    last_from: str
+    user_responded: bool
+
+
+class ThreadCache:
+    """
+    Per-run cache of analysed Gmail threads keyed by threadId.
+
+    Each thread is fetched, sorted and analysed once per fetch run, every matched message of the
+    thread then reuses the same analysis. ``hits`` and ``misses`` count the thread lookups.
+    """
+
+    def __init__(self, email_address: str):
+        self.email_address = email_address
+        self.hits = 0
+        self.misses = 0
+        self._threads: Dict[str, ThreadAnalysis] = {}
+
+    def __contains__(self, thread_id: str) -> bool:
+        """Return whether the thread was analysed."""
+        return thread_id in self._threads
+
+    def __len__(self) -> int:
+        """Return the number of analysed threads."""
+        return len(self._threads)
+
+    def get(self, thread_id: str) -> ThreadAnalysis | None:
+        """Return the cached analysis of a thread without recording a lookup."""
+        return self._threads.get(thread_id)
+
+    def lookup(self, thread_id: str) -> ThreadAnalysis | None:
+        """Return the cached analysis of a thread, recording a hit or a miss."""
+        analysis = self._threads.get(thread_id)
+        if analysis is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return analysis
+
+    def missing(self, thread_ids: List[str]) -> List[str]:
+        """Record lookups for ``thread_ids`` and return the distinct IDs that still have to be fetched."""
+        to_fetch = []
+        for thread_id in thread_ids:
+            if thread_id in self._threads or thread_id in to_fetch:
+                self.hits += 1
+            else:
+                self.misses += 1
+                to_fetch.append(thread_id)
+        return to_fetch
+
+    def add(self, thread: Dict[str, Any]) -> ThreadAnalysis:
+        """Sort and analyse a thread returned by threads().get and store the result."""
+        thread_id = thread["id"]
+        messages_in_thread = thread["messages"]
+        logger.info(f"Retrieved thread {thread_id} with {len(messages_in_thread)} messages")
+
+        # Sort messages by internalDate to ensure proper chronological ordering
+        # This ensures we correctly identify the latest message
+        if all("internalDate" in m for m in messages_in_thread):
+            messages_in_thread.sort(key=lambda m: int(m.get("internalDate", 0)))
+            logger.info(f"Sorted {len(messages_in_thread)} messages by internalDate")
+        else:
+            # Fallback to ID-based sorting if internalDate is missing
+            messages_in_thread.sort(key=lambda m: m["id"])
+            logger.info(f"Sorted {len(messages_in_thread)} messages by ID (internalDate missing)")
+
+        # Log details about the messages in the thread for debugging
+        for idx, thread_message in enumerate(messages_in_thread):
+            thread_headers = thread_message["payload"]["headers"]
+            from_email = _get_header(thread_headers, "From", "Unknown")
+            date = _get_header(thread_headers, "Date", "Unknown")
+            logger.info(f"  Message {idx + 1}/{len(messages_in_thread)}: ID={thread_message['id']}, Date={date}, From={from_email}")
+
+        # Analyze the last message in the thread to determine if we need to process it
+        last_message = messages_in_thread[-1]
+        last_from = next(header["value"] for header in last_message["payload"].get("headers") if header["name"] == "From")
+
+        analysis = ThreadAnalysis(
+            thread_id=thread_id,
+            messages=messages_in_thread,
+            last_message=last_message,
+            last_from=last_from,
+            # If the last message was sent by the user, the assistant doesn't need to respond
+            user_responded=self.email_address in last_from,
+        )
+        self._threads[thread_id] = analysis
+        return analysis
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters."""
+        return {"hits": self.hits, "misses": self.misses, "threads": len(self._threads)}
+
+
+def _user_respond_marker(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the marker yielded for a matched message of a thread the user answered last."""
+    return {
+        "id": message["id"],
+        "thread_id": message["threadId"],
+        "user_respond": True,
+    }
+
+
+def _select_message_to_process(
+    message: Dict[str, Any],
+    analysis: ThreadAnalysis,
+    skip_filters: bool = False,
+) -> str | None:
+    """
+    Decide from the thread metadata whether a matched message should be processed.
+
+    Args:
+        message: Message reference returned by messages().list (id and threadId)
+        analysis: Cached analysis of the message's thread
+        skip_filters: Process the latest message of the thread regardless of sender and position
+
+    Returns:
+        The ID of the message whose full payload has to be processed, or None when the message
+        should be skipped.
+    """
+    thread_id = analysis.thread_id
+    last_message = analysis.last_message
+
+    # Check if this is a message we should process
+    is_from_user = analysis.user_responded
+    is_latest_in_thread = message["id"] == last_message["id"]
+
+    # Modified logic for skip_filters:
+    # 1. When skip_filters is True, process all messages regardless of position in thread
+    # 2. When skip_filters is False, only process if it's not from user AND is latest in thread
+    should_process = skip_filters or (not is_from_user and is_latest_in_thread)
+
+    if not should_process:
+        if is_from_user:
+            logger.debug(f"Skipping message {message['id']}: sent by the user")
+        elif not is_latest_in_thread:
+            logger.debug(f"Skipping message {message['id']}: not the latest in thread")
+        return None
+
+    # Log detailed information about this message
+    logger.info(f"Processing message {message['id']} from thread {thread_id}")
+    logger.info(f"  Is latest in thread: {is_latest_in_thread}")
+    logger.info(f"  Skip filters enabled: {skip_filters}")
+
+    # If the user wants to process the latest message in the thread,
+    # use the last_message from the thread API call instead of the original message
+    # that matched the search query
+    if not skip_filters:
+        # Use original message if skip_filters is False
+        return message["id"]
+
+    # Use the latest message in the thread if skip_filters is True
+    logger.info(f"Using latest message in thread: {last_message['id']}")
+    return last_message["id"]
+
+
+def _email_from_message(process_message: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the email data of a message fetched with its full payload."""
+    process_payload = process_message["payload"]
+    process_headers = process_payload.get("headers", [])
+
+    # Extract email metadata from headers
+    subject = next(header["value"] for header in process_headers if header["name"] == "Subject")
+    from_email = _get_header(process_headers, "From", "").strip()
+    _to_email = _get_header(process_headers, "To", "").strip()
+
+    # Use Reply-To header if present
+    if reply_to := _get_header(process_headers, "Reply-To", "").strip():
+        from_email = reply_to
+
+    # Extract and parse email timestamp
+    send_time = next(header["value"] for header in process_headers if header["name"] == "Date")
+    parsed_time = parse_time(send_time)
+
+    # Extract email body content, without quoted replies, signatures and footers
+    normalized = normalize_email_body(extract_message_part(process_payload))
+    body = normalized.text
+    if normalized.chars_saved:
+        logger.debug(f"Normalized body of {process_message['id']}: ~{normalized.tokens_saved} tokens saved")
+
+    return {
+        "from_email": from_email,
+        "to_email": _to_email,
+        "subject": subject,
+        "page_content": body,
+        "id": process_message["id"],
+        "thread_id": process_message["threadId"],
+        "send_time": parsed_time.isoformat(),
+        "headers": select_triage_headers(process_headers),
+    }
+
+
+def _get_thread_metadata(service, thread_id: str):
+    """Return the threads().get request retrieving only what the thread analysis needs."""
+    return (
+        service.users()
+        .threads()
+        .get(
+            userId="me",
+            id=thread_id,
+            format="metadata",
+            metadataHeaders=THREAD_METADATA_HEADERS,
+            fields=THREAD_METADATA_FIELDS,
+        )
+    )
+
+
+def _get_full_message(service, message_id: str):
+    """Return the messages().get request retrieving the full payload of a message to process."""
+    return service.users().messages().get(userId="me", id=message_id, format="full", fields=MESSAGE_FULL_FIELDS)
+
+
+def _iter_messages_serial(
+    service,
+    messages: List[Dict[str, Any]],
+    thread_cache: ThreadCache,
+    skip_filters: bool,
+    failed: List[str] | None = None,
+):
+    """Fetch thread metadata and the full payload of the messages to process one call at a time.
+
+    The ids of the messages that could not be processed are appended to ``failed``.
+    """
+    full_messages: Dict[str, Dict[str, Any]] = {}
+    for message in messages:
+        try:
+            # Get the thread metadata (senders and dates) to determine conversation context
+            analysis = thread_cache.lookup(message["threadId"])
+            if analysis is None:
+                analysis = thread_cache.add(_get_thread_metadata(service, message["threadId"]).execute())
+
+            # If the last message was sent by the user, mark this as a user response
+            # and don't process it further (assistant doesn't need to respond to user's own emails)
+            if analysis.user_responded:
+                yield _user_respond_marker(message)
+                continue
+
+            process_id = _select_message_to_process(message, analysis, skip_filters)
+            if process_id is None:
+                continue
+
+            # Only the messages that are processed are downloaded with their body
+            if process_id not in full_messages:
+                full_messages[process_id] = _get_full_message(service, process_id).execute()
+            yield _email_from_message(full_messages[process_id])
+        except Exception as e:
+            logger.warning(f"Failed to process message {message['id']}: {str(e)}")
+            if failed is not None:
+                failed.append(message["id"])
+
+
+def _iter_messages_batched(
+    service,
+    messages: List[Dict[str, Any]],
+    thread_cache: ThreadCache,
+    skip_filters: bool,
+    batch_size: int = GMAIL_BATCH_MAX_REQUESTS,
+    failed: List[str] | None = None,
+):
+    """Fetch thread metadata and message payloads through Gmail batch HTTP requests.
+
+    Messages are handled in chunks of ``batch_size``: one batch retrieves the metadata of the
+    threads missing from the thread cache and a second batch retrieves the full payload of the
+    messages selected for processing. The ids of the messages that could not be processed, failed
+    sub-requests included, are appended to ``failed``.
+    """
+    batch_size = max(1, min(batch_size, GMAIL_BATCH_MAX_REQUESTS))
+    for start in range(0, len(messages), batch_size):
+        chunk = messages[start : start + batch_size]
+        thread_ids = thread_cache.missing([message["threadId"] for message in chunk])
+        threads = _execute_batch(
+            service,
+            [(thread_id, _get_thread_metadata(service, thread_id)) for thread_id in thread_ids],
+            batch_size,
+        )
+        for thread in threads.values():
+            thread_cache.add(thread)
+
+        selected: Dict[str, Any] = {}
+        for message in chunk:
+            analysis = thread_cache.get(message["threadId"])
+            if analysis is None:
+                selected[message["id"]] = ValueError(f"thread {message['threadId']} could not be retrieved")
+            elif analysis.user_responded:
+                selected[message["id"]] = _user_respond_marker(message)
+            else:
+                selected[message["id"]] = _select_message_to_process(message, analysis, skip_filters)
+
+        process_ids = list(dict.fromkeys(value for value in selected.values() if isinstance(value, str)))
+        full_messages = _execute_batch(
+            service,
+            [(message_id, _get_full_message(service, message_id)) for message_id in process_ids],
+            batch_size,
+        )
+        logger.info(f"Batch fetched {len(threads)} thread metadata and {len(full_messages)} full messages")
+
+        for message in chunk:
+            try:
+                selection = selected[message["id"]]
+                if isinstance(selection, Exception):
+                    raise selection
+                if isinstance(selection, dict):
+                    yield selection
+                elif selection is not None:
+                    if selection not in full_messages:
+                        raise ValueError(f"message {selection} could not be retrieved")
+                    yield _email_from_message(full_messages[selection])
+            except Exception as e:
+                logger.warning(f"Failed to process message {message['id']}: {str(e)}")
+                if failed is not None:
+                    failed.append(message["id"])
+
+
+def _window_query(email_address: str, minutes_since: int, include_read: bool) -> str:
+    """Build the ``after:<timestamp>`` Gmail search query of the fetch window."""
+    # Calculate timestamp for filtering
+    after = int((datetime.now() - timedelta(minutes=minutes_since)).timestamp())
+
+    # Construct Gmail search query
+    # This query searches for:
+    # - Emails sent to or from the specified address
+    # - Emails after the specified timestamp
+    # - Including emails from all categories (inbox, updates, promotions, etc.)
+
+    # Base query with time filter
+    query = f"(to:{email_address} OR from:{email_address}) after:{after}"
+
+    # Only include unread emails unless include_read is True
+    if not include_read:
+        query += " is:unread"
+    else:
+        logger.info("Including read emails in search")
+
+    # Log the final query for debugging
+    logger.info(f"Gmail search query: {query}")
+
+    # Additional filter options (commented out by default)
+    # If you want to include emails from specific categories, use:
+    # query += " category:(primary OR updates OR promotions)"
+    return query
+
+
+def _iter_window_pages(service, query: str, http=None) -> Iterator[List[Dict[str, Any]]]:
+    """List the messages matching a search query, yielding one result page at a time.
+
+    Args:
+        service: Gmail API service object
+        query: Gmail search query
+        http: Optional HTTP object used to execute the list calls, required when listing runs on
+            another thread than the rest of the service calls
+    """
+    total = 0
+    nextPageToken = None
+
+    while True:
+        results = (
+            service.users()
+            .messages()
+            .list(userId="me", q=query, pageToken=nextPageToken, fields=MESSAGE_LIST_FIELDS)
+            .execute(http=http)
+        )
+        page = results.get("messages", [])
+        total += len(page)
+        if page:
+            logger.info(f"Found {len(page)} messages in this page")
+        else:
+            logger.info("No messages found in this page")
+
+        nextPageToken = results.get("nextPageToken")
+        if page:
+            yield page
+        if not nextPageToken:
+            logger.info(f"Total messages found: {total}")
+            break
+
+
+def _isolated_http(service):
+    """Return a new authorized HTTP object for calls made from another thread.
+
+    httplib2 connections are not thread-safe, so a background thread must not share the HTTP
+    object of the service. Returns None for services without credentials (e.g. test stubs).
+    """
+    service_http = getattr(service, "_http", None)
+    credentials = getattr(service_http, "credentials", None)
+    if credentials is None:
+        return None
+    # Keep recording downloads in the same counter as the service
+    if isinstance(service_http.http, CountingHttp):
+        return counting_authorized_http(credentials, service_http.http.counter)
+    return AuthorizedHttp(credentials, http=httplib2.Http())
+
+
+def _prefetch(pages: Iterator[List[Dict[str, Any]]], depth: int) -> Iterator[List[Dict[str, Any]]]:
+    """Produce ``pages`` on a background thread, keeping up to ``depth`` pages ready ahead of the consumer.
+
+    Errors raised while listing are re-raised in the consumer. Closing the returned generator
+    stops the background thread after its current call.
+    """
+    if depth <= 0:
+        yield from pages
+        return
+
+    ready: queue.Queue[tuple] = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def _put(item: tuple) -> bool:
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce():
+        try:
+            for page in pages:
+                if not _put(("page", page)):
+                    return
+            _put(("done", None))
+        except Exception as e:
+            _put(("error", e))
+
+    producer = threading.Thread(target=_produce, name="gmail-list-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = ready.get()
+            if kind == "done":
+                break
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+
+def iter_group_emails(
+    service,
+    email_address: str,
+    minutes_since: int = 30,
+    include_read: bool = False,
+    skip_filters: bool = False,
+    use_batch: bool = False,
+    batch_size: int = GMAIL_BATCH_MAX_REQUESTS,
+    thread_cache: ThreadCache | None = None,
+    incremental: bool = False,
+    watermark_store: HistoryWatermarkStore | None = None,
+    prefetch_pages: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Fetch recent emails involving the specified email address with an existing Gmail service.
+
+    Args:
+        service: Gmail API service object
+        email_address: Email address to fetch messages for
+        minutes_since: Only retrieve emails newer than this many minutes
+        include_read: Whether to include already read emails (default: False)
+        skip_filters: Skip thread and sender filtering (return all messages, default: False)
+        use_batch: Retrieve messages and threads through batch HTTP requests (default: False)
+        batch_size: Maximum number of sub-requests per batch HTTP request (max 100)
+        thread_cache: Optional thread cache, a new one is created for the run if not provided.
+            Pass one in to read its hit and miss counters afterwards.
+        incremental: Only fetch messages added since the stored historyId watermark, falling back
+            to the windowed search when there is no watermark or the history has expired
+        watermark_store: Optional store of historyId watermarks used in incremental mode
+        prefetch_pages: Number of search result pages listed ahead on a background thread while
+            the current page is processed (default: 0, pages are listed on demand)
+
+    Yields:
+        Dict objects containing processed email information
+    """
+    if thread_cache is None:
+        thread_cache = ThreadCache(email_address)
+
+    sync = IncrementalSync(service, email_address, watermark_store) if incremental else None
+    messages = sync.list_new_messages(include_read=include_read) if sync else None
+    if messages is not None:
+        pages = [messages] if messages else []
+    else:
+        logger.info(f"Fetching emails for {email_address} from last {minutes_since} minutes")
+        query = _window_query(email_address, minutes_since, include_read)
+        if prefetch_pages > 0:
+            pages = _prefetch(_iter_window_pages(service, query, http=_isolated_http(service)), prefetch_pages)
+        else:
+            pages = _iter_window_pages(service, query)
+
+    # Process each result page as soon as it is listed, so the first emails are yielded while the
+    # next pages are still being listed
+    count = 0
+    total = 0
+    failed: List[str] = []
+    for page in pages:
+        total += len(page)
+        if use_batch:
+            emails = _iter_messages_batched(service, page, thread_cache, skip_filters, batch_size, failed)
+        else:
+            emails = _iter_messages_serial(service, page, thread_cache, skip_filters, failed)
+
+        for email in emails:
+            yield email
+            if not email.get("user_respond", False):
+                count += 1
+
+    logger.info(f"Found {count} emails to process out of {total} total messages.")
+    logger.info(f"Thread cache: {thread_cache.hits} hits, {thread_cache.misses} misses")
+
+    # An incremental sync never lists the failed messages again: keep the watermark so that the
+    # next fetch retries them
+    if sync:
+        if failed:
+            logger.warning(f"Not moving the history watermark of {email_address}, {len(failed)} messages failed")
+        else:
+            sync.commit()
+
+
 # Helper function that is used by the tool and can be imported elsewhere
 def fetch_group_emails(
     email_address: str,
@@ -154,6 +724,11 @@ def fetch_group_emails(
     gmail_secret: Optional[str] = None,
     include_read: bool = False,
     skip_filters: bool = False,
+    use_batch: bool = False,
+    batch_size: int = GMAIL_BATCH_MAX_REQUESTS,
+    thread_cache: ThreadCache | None = None,
+    incremental: bool = False,
+    prefetch_pages: int = 0,
 ) -> Iterator[Dict[str, Any]]:
     """
     Fetch recent emails from Gmail that involve the specified email address.
@@ -169,6 +744,11 @@ def fetch_group_emails(
         gmail_secret: Optional credentials for Gmail API authentication
         include_read: Whether to include already read emails (default: False)
         skip_filters: Skip thread and sender filtering (return all messages, default: False)
+        use_batch: Retrieve messages and threads through batch HTTP requests (default: False)
+        batch_size: Maximum number of sub-requests per batch HTTP request (max 100)
+        thread_cache: Optional per-run thread cache exposing hit and miss counters
+        incremental: Only fetch messages added since the last run using Gmail historyId watermarks
+        prefetch_pages: Number of search result pages listed ahead while the current page is processed
 
     Yields:
         Dict objects containing processed email information
@@ -207,8 +787,10 @@ def fetch_group_emails(
         return
 
     try:
-        # Get Gmail API credentials from parameters, environment variables, or local files
-        creds = get_credentials(gmail_token, gmail_secret)
+        # Get Gmail API credentials from parameters, environment variables, or local files,
+        # cached with the service by the process-wide factory
+        factory = get_service_factory()
+        creds = factory.get_credentials(gmail_token, gmail_secret)
 
         # Check if credentials are valid
         if not creds or not hasattr(creds, "authorize"):
@@ -226,188 +808,25 @@ def fetch_group_emails(
             yield mock_email
             return
 
-        service = build("gmail", "v1", credentials=creds)
-
-        # Calculate timestamp for filtering
-        after = int((datetime.now() - timedelta(minutes=minutes_since)).timestamp())
-
-        # Construct Gmail search query
-        # This query searches for:
-        # - Emails sent to or from the specified address
-        # - Emails after the specified timestamp
-        # - Including emails from all categories (inbox, updates, promotions, etc.)
-
-        # Base query with time filter
-        query = f"(to:{email_address} OR from:{email_address}) after:{after}"
-
-        # Only include unread emails unless include_read is True
-        if not include_read:
-            query += " is:unread"
-        else:
-            logger.info("Including read emails in search")
-
-        # Log the final query for debugging
-        logger.info(f"Gmail search query: {query}")
-
-        # Additional filter options (commented out by default)
-        # If you want to include emails from specific categories, use:
-        # query += " category:(primary OR updates OR promotions)"
-
-        # Retrieve all matching messages (handling pagination)
-        messages = []
-        nextPageToken = None
-        logger.info(f"Fetching emails for {email_address} from last {minutes_since} minutes")
-
-        while True:
-            results = service.users().messages().list(userId="me", q=query, pageToken=nextPageToken).execute()
-            if "messages" in results:
-                new_messages = results["messages"]
-                messages.extend(new_messages)
-                logger.info(f"Found {len(new_messages)} messages in this page")
-            else:
-                logger.info("No messages found in this page")
-
-            nextPageToken = results.get("nextPageToken")
-            if not nextPageToken:
-                logger.info(f"Total messages found: {len(messages)}")
-                break
-
-        # Process each message
-        count = 0
-        for message in messages:
-            try:
-                # Get full message details
-                msg = service.users().messages().get(userId="me", id=message["id"]).execute()
-                thread_id = msg["threadId"]
-                payload = msg["payload"]
-                headers = payload.get("headers", [])
-
-                # Get thread details to determine conversation context
-                # Directly fetch the complete thread without any format restriction
-                # This matches the exact approach in the test code that successfully gets all messages
-                thread = service.users().threads().get(userId="me", id=thread_id).execute()
-                messages_in_thread = thread["messages"]
-                logger.info(f"Retrieved thread {thread_id} with {len(messages_in_thread)} messages")
-
-                # Sort messages by internalDate to ensure proper chronological ordering
-                # This ensures we correctly identify the latest message
-                if all("internalDate" in msg for msg in messages_in_thread):
-                    messages_in_thread.sort(key=lambda m: int(m.get("internalDate", 0)))
-                    logger.info(f"Sorted {len(messages_in_thread)} messages by internalDate")
-                else:
-                    # Fallback to ID-based sorting if internalDate is missing
-                    messages_in_thread.sort(key=lambda m: m["id"])
-                    logger.info(f"Sorted {len(messages_in_thread)} messages by ID (internalDate missing)")
-
-                # Log details about the messages in the thread for debugging
-                for idx, msg in enumerate(messages_in_thread):
-                    headers = msg["payload"]["headers"]
-                    subject = next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject")
-                    from_email = next((h["value"] for h in headers if h["name"] == "From"), "Unknown")
-                    date = next((h["value"] for h in headers if h["name"] == "Date"), "Unknown")
-                    logger.info(f"  Message {idx + 1}/{len(messages_in_thread)}: ID={msg['id']}, Date={date}, From={from_email}")
-
-                # Log thread information for debugging
-                logger.info(f"Thread {thread_id} has {len(messages_in_thread)} messages")
-
-                # Analyze the last message in the thread to determine if we need to process it
-                last_message = messages_in_thread[-1]
-                last_headers = last_message["payload"]["headers"]
-
-                # Get sender of last message
-                from_header = next(header["value"] for header in last_headers if header["name"] == "From")
-                last_from_header = next(
-                    header["value"] for header in last_message["payload"].get("headers") if header["name"] == "From"
-                )
-
-                # If the last message was sent by the user, mark this as a user response
-                # and don't process it further (assistant doesn't need to respond to user's own emails)
-                if email_address in last_from_header:
-                    yield {
-                        "id": message["id"],
-                        "thread_id": message["threadId"],
-                        "user_respond": True,
-                    }
-                    continue
-
-                # Check if this is a message we should process
-                is_from_user = email_address in from_header
-                is_latest_in_thread = message["id"] == last_message["id"]
-
-                # Modified logic for skip_filters:
-                # 1. When skip_filters is True, process all messages regardless of position in thread
-                # 2. When skip_filters is False, only process if it's not from user AND is latest in thread
-                should_process = skip_filters or (not is_from_user and is_latest_in_thread)
-
-                if not should_process:
-                    if is_from_user:
-                        logger.debug(f"Skipping message {message['id']}: sent by the user")
-                    elif not is_latest_in_thread:
-                        logger.debug(f"Skipping message {message['id']}: not the latest in thread")
-
-                # Process the message if it passes our filters (or if filters are skipped)
-                if should_process:
-                    # Log detailed information about this message
-                    logger.info(f"Processing message {message['id']} from thread {thread_id}")
-                    logger.info(f"  Is latest in thread: {is_latest_in_thread}")
-                    logger.info(f"  Skip filters enabled: {skip_filters}")
-
-                    # If the user wants to process the latest message in the thread,
-                    # use the last_message from the thread API call instead of the original message
-                    # that matched the search query
-                    if not skip_filters:
-                        # Use original message if skip_filters is False
-                        process_message = message
-                        process_payload = payload
-                        process_headers = headers
-                    else:
-                        # Use the latest message in the thread if skip_filters is True
-                        process_message = last_message
-                        process_payload = last_message["payload"]
-                        process_headers = process_payload.get("headers", [])
-                        logger.info(f"Using latest message in thread: {process_message['id']}")
-
-                    # Extract email metadata from headers
-                    subject = next(header["value"] for header in process_headers if header["name"] == "Subject")
-                    from_email = next(
-                        (header["value"] for header in process_headers if header["name"] == "From"),
-                        "",
-                    ).strip()
-                    _to_email = next(
-                        (header["value"] for header in process_headers if header["name"] == "To"),
-                        "",
-                    ).strip()
-
-                    # Use Reply-To header if present
-                    if reply_to := next(
-                        (header["value"] for header in process_headers if header["name"] == "Reply-To"),
-                        "",
-                    ).strip():
-                        from_email = reply_to
-
-                    # Extract and parse email timestamp
-                    send_time = next(header["value"] for header in process_headers if header["name"] == "Date")
-                    parsed_time = parse_time(send_time)
-
-                    # Extract email body content
-                    body = extract_message_part(process_payload)
-
-                    # Yield the processed email data
-                    yield {
-                        "from_email": from_email,
-                        "to_email": _to_email,
-                        "subject": subject,
-                        "page_content": body,
-                        "id": process_message["id"],
-                        "thread_id": process_message["threadId"],
-                        "send_time": parsed_time.isoformat(),
-                    }
-                    count += 1
-
-            except Exception as e:
-                logger.warning(f"Failed to process message {message['id']}: {str(e)}")
-
-        logger.info(f"Found {count} emails to process out of {len(messages)} total messages.")
+        service = factory.get_service("gmail", "v1", gmail_token, gmail_secret)
+        downloaded_before = factory.transfer.summary()
+
+        yield from iter_group_emails(
+            service,
+            email_address,
+            minutes_since=minutes_since,
+            include_read=include_read,
+            skip_filters=skip_filters,
+            use_batch=use_batch,
+            batch_size=batch_size,
+            thread_cache=thread_cache,
+            incremental=incremental,
+            prefetch_pages=prefetch_pages,
+        )
+        downloaded = {key: value - downloaded_before[key] for key, value in factory.transfer.summary().items()}
+        logger.info(
+            f"Downloaded {downloaded['bytes_downloaded']} bytes in {downloaded['responses']} Gmail API responses"
+        )
 
     except Exception as e:
         logger.error(f"Error accessing Gmail API: {str(e)}")
@@ -425,6 +844,17 @@ def fetch_group_emails(
         yield mock_email
 
 
+async def afetch_group_emails(*args, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async version of ``fetch_group_emails``, taking the same arguments.
+
+    The Gmail calls run on a worker thread of the Gmail executor and emails are yielded to the
+    event loop as they are fetched.
+    """
+    async for email in aiterate_in_gmail_executor(fetch_group_emails(*args, **kwargs)):
+        yield email
+
+
 class FetchEmailsInput(BaseModel):
     """
     Input schema for the fetch_emails_tool.
@@ -435,7 +865,7 @@ class FetchEmailsInput(BaseModel):
 
 
 @tool(args_schema=FetchEmailsInput)
-def fetch_emails_tool(email_address: str, minutes_since: int = 30) -> str:
+async def fetch_emails_tool(email_address: str, minutes_since: int = 30) -> str:
     """
     Fetches recent emails from Gmail for the specified email address.
 
@@ -446,7 +876,9 @@ def fetch_emails_tool(email_address: str, minutes_since: int = 30) -> str:
     Returns:
         String summary of fetched emails
     """
-    emails = list(fetch_group_emails(email_address, minutes_since))
+    emails = [
+        email async for email in afetch_group_emails(email_address, minutes_since, use_batch=True, prefetch_pages=1)
+    ]
 
     if not emails:
         return "No new emails found."
@@ -503,9 +935,10 @@ def send_email(email_id: str, response_text: str, email_address: str, addn_recip
         return True
 
     try:
-        # Get Gmail API credentials from environment variables or local files
-        creds = get_credentials(gmail_token=os.getenv("GMAIL_TOKEN"), gmail_secret=os.getenv("GMAIL_SECRET"))
-        service = build("gmail", "v1", credentials=creds)
+        # Get the cached Gmail service for the credentials from environment variables or local files
+        service = get_service_factory().get_service(
+            "gmail", "v1", gmail_token=os.getenv("GMAIL_TOKEN"), gmail_secret=os.getenv("GMAIL_SECRET")
+        )
 
         try:
             # Try to get the original message to extract headers
@@ -568,8 +1001,15 @@ def send_email(email_id: str, response_text: str, email_address: str, addn_recip
         return False
 
 
+async def asend_email(
+    email_id: str, response_text: str, email_address: str, addn_recipients: List[str] | None = None
+) -> bool:
+    """Async version of ``send_email`` running the Gmail calls in the Gmail executor."""
+    return await run_in_gmail_executor(send_email, email_id, response_text, email_address, addn_recipients)
+
+
 @tool(args_schema=SendEmailInput)
-def send_email_tool(
+async def send_email_tool(
     email_id: str, response_text: str, email_address: str, additional_recipients: Optional[List[str]] = None
 ) -> str:
     """
@@ -587,7 +1027,7 @@ def send_email_tool(
     """
     try:
         logger.info(f"[TOOL] GMAIL Sending send_email_tool ID : [{email_id}] from [{email_address}] content [{response_text}]")
-        success = send_email(email_id, response_text, email_address, addn_recipients=additional_recipients)
+        success = await asend_email(email_id, response_text, email_address, addn_recipients=additional_recipients)
         if success:
             return f"Email reply sent successfully to message ID: {email_id}"
         else:
@@ -605,8 +1045,7 @@ class CheckCalendarInput(BaseModel):
 
 
 def get_calendar_events(dates: List[str]) -> str:
-    """
-    Check Google Calendar for events on specified dates.
+    """Check Google Calendar for events on specified dates.
 
     Args:
         dates: List of dates to check in DD-MM-YYYY format
@@ -627,9 +1066,10 @@ def get_calendar_events(dates: List[str]) -> str:
         return result
 
     try:
-        # Get Gmail API credentials from environment variables or local files
-        creds = get_credentials(gmail_token=os.getenv("GMAIL_TOKEN"), gmail_secret=os.getenv("GMAIL_SECRET"))
-        service = build("calendar", "v3", credentials=creds)
+        # Get the cached Calendar service for the credentials from environment variables or local files
+        service = get_service_factory().get_service(
+            "calendar", "v3", gmail_token=os.getenv("GMAIL_TOKEN"), gmail_secret=os.getenv("GMAIL_SECRET")
+        )
 
         result = "Calendar events:\n\n"
 
@@ -741,10 +1181,14 @@ def get_calendar_events(dates: List[str]) -> str:
         return result
 
 
+async def aget_calendar_events(dates: List[str]) -> str:
+    """Async version of ``get_calendar_events`` running the Calendar calls in the Gmail executor."""
+    return await run_in_gmail_executor(get_calendar_events, dates)
+
+
 @tool(args_schema=CheckCalendarInput)
-def check_calendar_tool(dates: List[str]) -> str:
-    """
-    Check Google Calendar for events on specified dates.
+async def check_calendar_tool(dates: List[str]) -> str:
+    """Check Google Calendar for events on specified dates.
 
     Args:
         dates: List of dates to check in DD-MM-YYYY format
@@ -753,16 +1197,14 @@ def check_calendar_tool(dates: List[str]) -> str:
         Formatted calendar events for the specified dates
     """
     try:
-        events = get_calendar_events(dates)
+        events = await aget_calendar_events(dates)
         return events
     except Exception as e:
         return f"Failed to check calendar: {str(e)}"
 
 
 class ScheduleMeetingInput(BaseModel):
-    """
-    Input schema for the schedule_meeting_tool.
-    """
+    """Input schema for the schedule_meeting_tool."""
 
     attendees: List[str] = Field(description="Email addresses of meeting attendees")
     title: str = Field(description="Meeting title/subject")
@@ -775,8 +1217,7 @@ class ScheduleMeetingInput(BaseModel):
 def send_calendar_invite(
     attendees: List[str], title: str, start_time: str, end_time: str, organizer_email: str, timezone: str = "America/Toronto"
 ) -> bool:
-    """
-    Schedule a meeting with Google Calendar and send invites.
+    """Schedule a meeting with Google Calendar and send invites.
 
     Args:
         attendees: Email addresses of meeting attendees
@@ -796,9 +1237,10 @@ def send_calendar_invite(
         return True
 
     try:
-        # Get Gmail API credentials from environment variables or local files
-        creds = get_credentials(gmail_token=os.getenv("GMAIL_TOKEN"), gmail_secret=os.getenv("GMAIL_SECRET"))
-        service = build("calendar", "v3", credentials=creds)
+        # Get the cached Calendar service for the credentials from environment variables or local files
+        service = get_service_factory().get_service(
+            "calendar", "v3", gmail_token=os.getenv("GMAIL_TOKEN"), gmail_secret=os.getenv("GMAIL_SECRET")
+        )
 
         # Create event details
         event = {
@@ -833,12 +1275,20 @@ def send_calendar_invite(
         return False
 
 
+async def asend_calendar_invite(
+    attendees: List[str], title: str, start_time: str, end_time: str, organizer_email: str, timezone: str = "America/Toronto"
+) -> bool:
+    """Async version of ``send_calendar_invite`` running the Calendar calls in the Gmail executor."""
+    return await run_in_gmail_executor(
+        send_calendar_invite, attendees, title, start_time, end_time, organizer_email, timezone
+    )
+
+
 @tool(args_schema=ScheduleMeetingInput)
-def schedule_meeting_tool(
+async def schedule_meeting_tool(
     attendees: List[str], title: str, start_time: str, end_time: str, organizer_email: str, timezone: str = tz_str
 ) -> str:
-    """
-    Schedule a meeting with Google Calendar and send invites.
+    """Schedule a meeting with Google Calendar and send invites.
 
     Args:
         attendees: Email addresses of meeting attendees
@@ -852,7 +1302,7 @@ def schedule_meeting_tool(
         Success or failure message
     """
     try:
-        success = send_calendar_invite(attendees, title, start_time, end_time, organizer_email, timezone)
+        success = await asend_calendar_invite(attendees, title, start_time, end_time, organizer_email, timezone)
 
         if success:
             return f"Meeting '{title}' scheduled successfully from {start_time} to {end_time} with {len(attendees)} attendees"
@@ -867,13 +1317,21 @@ def mark_as_read(
     gmail_token: str | None = None,
     gmail_secret: str | None = None,
 ):
-    creds = get_credentials(gmail_token, gmail_secret)
-
-    service = build("gmail", "v1", credentials=creds)
+    service = get_service_factory().get_service("gmail", "v1", gmail_token, gmail_secret)
     service.users().messages().modify(userId="me", id=message_id, body={"removeLabelIds": ["UNREAD"]}).execute()
 
 
+async def amark_as_read(
+    message_id,
+    gmail_token: str | None = None,
+    gmail_secret: str | None = None,
+):
+    """Async version of ``mark_as_read`` running the Gmail call in the Gmail executor."""
+    await run_in_gmail_executor(mark_as_read, message_id, gmail_token, gmail_secret)
+
+
 if __name__ == "__main__":
+    import asyncio
     import logging
 
     logging.basicConfig(level=logging.DEBUG, handlers=logger.handlers, force=True)
@@ -890,5 +1348,5 @@ if __name__ == "__main__":
         "timezone": tz_str,
     }
 
-    observation = schedule_meeting_tool.invoke(input=schedule_meeting_args)
+    observation = asyncio.run(schedule_meeting_tool.ainvoke(input=schedule_meeting_args))
     print(observation)
@@ -0,0 +1,257 @@
+"""Incremental Gmail mailbox sync based on historyId watermarks.
+
+Instead of re-listing every message of an ``after:<timestamp>`` search window on each run, the
+last seen ``historyId`` of a mailbox is stored and ``users.history.list`` returns only the
+messages added since then. When no watermark exists yet, or Gmail no longer holds the history
+for the stored watermark (HTTP 404), callers fall back to the full windowed search.
+
+The windowed search only matches the messages sent to or from the mailbox address
+(``to:<address> OR from:<address>``). History records carry no headers, so the added messages are
+filtered on their ``From``, ``To``, ``Cc`` and ``Bcc`` headers, fetched in batches of metadata
+requests, and both modes select the same emails.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from email.utils import getaddresses
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows, the store is then only safe within one process
+    fcntl = None
+
+from email_assistant import SRC_ROOT
+from email_assistant.logger import logger
+
+WATERMARKS_PATH = Path(SRC_ROOT) / "config" / "gmail_history_watermarks.json"
+
+# Headers matched by the ``to:`` and ``from:`` operators of the windowed search
+ADDRESS_HEADERS = ["From", "To", "Cc", "Bcc"]
+# Maximum number of sub-requests of a Gmail batch HTTP request
+HISTORY_BATCH_SIZE = 100
+
+
+class HistoryExpiredError(Exception):
+    """Raised when Gmail no longer holds the history records for a start historyId."""
+
+
+def _http_status(error: Exception) -> int | None:
+    """Return the HTTP status of a googleapiclient HttpError, if any."""
+    resp = getattr(error, "resp", None)
+    status = getattr(resp, "status", None)
+    return int(status) if status is not None else None
+
+
+class HistoryWatermarkStore:
+    """JSON file store of the last synced historyId per mailbox.
+
+    The file is shared by the shard processes of ``multi_ingest.py``: updates hold an exclusive lock
+    of a ``.lock`` file next to it and replace the file with a uniquely named temporary file, so
+    concurrent updates of different mailboxes are neither lost nor read half-written.
+    """
+
+    def __init__(self, path: Path = WATERMARKS_PATH):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self) -> Dict[str, str]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load history watermarks from {self.path}: {str(e)}")
+            return {}
+
+    def get(self, email_address: str) -> str | None:
+        """Return the stored historyId for a mailbox."""
+        with self._lock:
+            return self._load().get(email_address)
+
+    def set(self, email_address: str, history_id: str):
+        """Store the historyId for a mailbox."""
+        with self._locked():
+            watermarks = self._load()
+            watermarks[email_address] = str(history_id)
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.path.parent, prefix=f"{self.path.name}.", suffix=".tmp", delete=False
+            ) as f:
+                json.dump(watermarks, f, indent=2)
+            try:
+                os.replace(f.name, self.path)
+            except BaseException:
+                os.unlink(f.name)
+                raise
+
+
+def involves_address(headers: List[Dict[str, str]], email_address: str) -> bool:
+    """Return True if ``email_address`` is a sender or a recipient in a list of Gmail API headers."""
+    names = {name.lower() for name in ADDRESS_HEADERS}
+    values = [header.get("value", "") for header in headers if header.get("name", "").lower() in names]
+    return email_address.lower() in {address.lower() for _, address in getaddresses(values)}
+
+
+def filter_by_address(service, messages: List[Dict[str, Any]], email_address: str) -> List[Dict[str, Any]]:
+    """Keep the messages sent to or from an address, as the ``to:``/``from:`` search operators do.
+
+    Messages whose headers could not be retrieved are kept, so that a failed lookup never drops an email.
+    """
+    headers: Dict[str, List[Dict[str, str]]] = {}
+
+    def _callback(request_id, response, exception):
+        if exception is not None:
+            logger.warning(f"Could not get the headers of message {request_id}: {str(exception)}")
+        else:
+            headers[request_id] = response.get("payload", {}).get("headers", [])
+
+    for start in range(0, len(messages), HISTORY_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=_callback)
+        for message in messages[start : start + HISTORY_BATCH_SIZE]:
+            request = (
+                service.users()
+                .messages()
+                .get(
+                    userId="me",
+                    id=message["id"],
+                    format="metadata",
+                    metadataHeaders=ADDRESS_HEADERS,
+                    fields="payload/headers",
+                )
+            )
+            batch.add(request, request_id=message["id"])
+        batch.execute()
+
+    return [m for m in messages if m["id"] not in headers or involves_address(headers[m["id"]], email_address)]
+
+
+def get_current_history_id(service) -> str:
+    """Return the current historyId of the authenticated mailbox."""
+    return str(service.users().getProfile(userId="me").execute()["historyId"])
+
+
+def list_history_messages(service, start_history_id: str) -> Tuple[List[Dict[str, Any]], str]:
+    """List the messages added to the mailbox since a historyId.
+
+    Args:
+        service: Gmail API service object
+        start_history_id: historyId to start listing from (exclusive)
+
+    Returns:
+        Tuple of the added message references (id, threadId, labelIds) in history order and the
+        latest historyId of the mailbox.
+
+    Raises:
+        HistoryExpiredError: If the start historyId is too old or invalid
+    """
+    added: Dict[str, Dict[str, Any]] = {}
+    latest_history_id = str(start_history_id)
+    page_token = None
+
+    while True:
+        try:
+            response = (
+                service.users()
+                .history()
+                .list(userId="me", startHistoryId=start_history_id, historyTypes=["messageAdded"], pageToken=page_token)
+                .execute()
+            )
+        except Exception as e:
+            if _http_status(e) == 404:
+                raise HistoryExpiredError(f"History for historyId {start_history_id} is no longer available") from e
+            raise
+
+        for record in response.get("history", []):
+            for message_added in record.get("messagesAdded", []):
+                message = message_added["message"]
+                added.setdefault(message["id"], message)
+
+        latest_history_id = str(response.get("historyId", latest_history_id))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    return list(added.values()), latest_history_id
+
+
+class IncrementalSync:
+    """Incremental sync session for one mailbox.
+
+    ``list_new_messages`` returns the references of the messages sent to or from the mailbox address
+    added since the stored watermark, or None when the caller has to fall back to a windowed search.
+    ``commit`` stores the new watermark and should be called once the returned messages have been
+    handled.
+    """
+
+    def __init__(self, service, email_address: str, store: HistoryWatermarkStore | None = None):
+        self.service = service
+        self.email_address = email_address
+        self.store = store or HistoryWatermarkStore()
+        self._pending_history_id: str | None = None
+
+    def list_new_messages(self, include_read: bool = False) -> List[Dict[str, Any]] | None:
+        """List the messages added since the last sync.
+
+        Args:
+            include_read: Whether to keep messages that are already read
+
+        Returns:
+            Message references (id, threadId) or None if a full windowed search is required
+        """
+        start_history_id = self.store.get(self.email_address)
+        if start_history_id is None:
+            logger.info(f"No history watermark for {self.email_address}, falling back to windowed search")
+            self._pending_history_id = get_current_history_id(self.service)
+            return None
+
+        try:
+            messages, latest_history_id = list_history_messages(self.service, start_history_id)
+        except HistoryExpiredError as e:
+            logger.warning(f"{str(e)}, falling back to windowed search")
+            self._pending_history_id = get_current_history_id(self.service)
+            return None
+
+        self._pending_history_id = latest_history_id
+        refs = []
+        for message in messages:
+            labels = message.get("labelIds", [])
+            if "DRAFT" in labels:
+                continue
+            if not include_read and "UNREAD" not in labels:
+                continue
+            refs.append({"id": message["id"], "threadId": message["threadId"]})
+        if refs:
+            refs = filter_by_address(self.service, refs, self.email_address)
+
+        logger.info(
+            f"History sync for {self.email_address}: {len(refs)} new messages "
+            f"(historyId {start_history_id} -> {latest_history_id})"
+        )
+        return refs
+
+    def commit(self):
+        """Persist the historyId reached by the last listing."""
+        if self._pending_history_id is not None:
+            self.store.set(self.email_address, self._pending_history_id)
+            logger.info(f"Stored history watermark {self._pending_history_id} for {self.email_address}")
+            self._pending_history_id = None
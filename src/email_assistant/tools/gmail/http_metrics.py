@@ -0,0 +1,78 @@
+"""Download accounting for the Gmail API HTTP traffic of fetch and ingest runs."""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+
+
+class TransferCounter:
+    """Thread-safe counter of HTTP responses and downloaded bytes."""
+
+    def __init__(self):
+        self.bytes_downloaded = 0
+        self.responses = 0
+        self._lock = threading.Lock()
+
+    def add(self, size: int):
+        """Record one response of ``size`` bytes."""
+        with self._lock:
+            self.bytes_downloaded += size
+            self.responses += 1
+
+    def summary(self) -> Dict[str, int]:
+        """Return the counters as a dict."""
+        with self._lock:
+            return {"bytes_downloaded": self.bytes_downloaded, "responses": self.responses}
+
+
+# Counter of the run in progress, see ``track_transfer``
+_scoped_counter: ContextVar[TransferCounter | None] = ContextVar("gmail_transfer_counter", default=None)
+
+
+@contextmanager
+def track_transfer(counter: TransferCounter) -> Iterator[TransferCounter]:
+    """Also record in ``counter`` the downloads made by any CountingHttp within this context.
+
+    The context follows asyncio tasks and ``asyncio.to_thread`` calls, so a run can count its own
+    downloads while using shared, cached service objects.
+    """
+    token = _scoped_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _scoped_counter.reset(token)
+
+
+class CountingHttp(httplib2.Http):
+    """httplib2 transport recording the size of every response body in a TransferCounter.
+
+    Sizes are counted after httplib2 decompressed the body, i.e. the JSON payload size. A batch
+    HTTP request is counted as a single response holding all of its sub-responses. Responses are
+    also recorded in the counter of the enclosing ``track_transfer`` context, if any.
+    """
+
+    def __init__(self, counter: TransferCounter, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.counter = counter
+
+    def request(self, *args, **kwargs):
+        """Send a request and record the size of its response body."""
+        response, content = super().request(*args, **kwargs)
+        self.counter.add(len(content or b""))
+        scoped = _scoped_counter.get()
+        if scoped is not None and scoped is not self.counter:
+            scoped.add(len(content or b""))
+        return response, content
+
+
+def counting_authorized_http(credentials, counter: TransferCounter) -> AuthorizedHttp:
+    """Return an authorized HTTP object for ``credentials`` whose downloads are recorded in ``counter``.
+
+    Pass it to ``build(..., http=...)`` or to ``request.execute(http=...)``. httplib2 objects are
+    not thread-safe, create one per thread sharing the same counter.
+    """
+    return AuthorizedHttp(credentials, http=CountingHttp(counter))
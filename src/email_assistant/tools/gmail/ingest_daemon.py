@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+"""Long-running Gmail ingestion daemon with an adaptive poll interval.
+
+The ``cron`` graph runs one ``fetch_and_process_emails`` per tick and sets up everything again
+every time. The daemon instead keeps one pooled LangGraph client, one ingest ledger and the cached
+Gmail credentials and service open for its whole lifetime, and polls the mailbox incrementally
+(historyId watermark). The poll interval drops to ``--min-interval`` as soon as a poll finds new
+emails and grows by ``--backoff`` after every idle poll, up to ``--max-interval``.
+
+SIGINT/SIGTERM stop the daemon after the poll in progress, then the client and ledger are closed.
+Poll and ingest statistics are printed after every poll and, with ``--stats-path``, written as
+JSON for monitoring.
+
+Usage:
+    python -m email_assistant.tools.gmail.ingest_daemon --email me@example.com --min-interval 15 --max-interval 300
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict
+
+from email_assistant.persistence.ingest_ledger import open_ingest_ledger
+from email_assistant.tools.gmail.admission import create_admission_controller
+from email_assistant.tools.gmail.ingest_stats import IngestStats, percentile
+from email_assistant.tools.gmail.langgraph_client import pooled_langgraph_client
+from email_assistant.tools.gmail.run_ingest import (
+    build_parser,
+    fetch_and_process_emails,
+)
+
+DEFAULT_MIN_INTERVAL = 15.0
+DEFAULT_MAX_INTERVAL = 300.0
+DEFAULT_BACKOFF = 2.0
+
+# Number of recent polls kept for the latency percentiles
+POLL_HISTORY = 1000
+
+
+class AdaptivePollInterval:
+    """Poll interval following the recent mail volume.
+
+    After a poll that found new emails the next poll comes after ``min_interval`` seconds; every
+    idle poll multiplies the interval by ``backoff``, up to ``max_interval``.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        backoff: float = DEFAULT_BACKOFF,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = max(backoff, 1.0)
+        self.current = min_interval
+
+    def update(self, new_emails: int) -> float:
+        """Return the delay before the next poll given the number of emails found by the last one."""
+        if new_emails > 0:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.max_interval, self.current * self.backoff)
+        return self.current
+
+
+class DaemonStats:
+    """Counters of the polls and ingested emails since the daemon started."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.polls = 0
+        self.idle_polls = 0
+        self.failed_polls = 0
+        self.emails_found = 0
+        self.ingested = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes_downloaded = 0
+        self.throttled_seconds = 0.0
+        self.last_poll_at: float | None = None
+        self.next_interval: float | None = None
+        self.poll_seconds: deque = deque(maxlen=POLL_HISTORY)
+
+    def record_poll(self, run_stats: IngestStats, result: int, seconds: float, next_interval: float):
+        """Add the outcome of one poll."""
+        found = run_stats.ingested + run_stats.failed + run_stats.skipped
+        self.polls += 1
+        self.idle_polls += 1 if found == 0 else 0
+        self.failed_polls += 1 if result else 0
+        self.emails_found += found
+        self.ingested += run_stats.ingested
+        self.failed += run_stats.failed
+        self.skipped += run_stats.skipped
+        self.bytes_downloaded += run_stats.transfer.bytes_downloaded
+        self.throttled_seconds += run_stats.throttled_seconds
+        self.last_poll_at = time.time()
+        self.next_interval = next_interval
+        self.poll_seconds.append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the statistics as a dict."""
+        uptime = time.time() - self.started_at
+        return {
+            "uptime_s": uptime,
+            "polls": self.polls,
+            "idle_polls": self.idle_polls,
+            "failed_polls": self.failed_polls,
+            "emails_found": self.emails_found,
+            "ingested": self.ingested,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "emails_per_hour": 3600 * self.ingested / uptime if uptime > 0 else 0.0,
+            "bytes_downloaded": self.bytes_downloaded,
+            "throttled_s": self.throttled_seconds,
+            "poll_p50_ms": 1000 * percentile(list(self.poll_seconds), 50),
+            "poll_p95_ms": 1000 * percentile(list(self.poll_seconds), 95),
+            "last_poll_at": self.last_poll_at,
+            "next_interval_s": self.next_interval,
+        }
+
+    def write(self, path: Path):
+        """Atomically write the summary as JSON."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+class IngestDaemon:
+    """Poll one mailbox until stopped.
+
+    The same LangGraph client, ledger and admission controller are reused for every poll.
+
+    Args:
+        args: Ingestion options, as parsed by ``run_ingest.build_parser``
+        interval: Poll interval policy
+        stats_path: Optional JSON file updated with the statistics after every poll
+    """
+
+    def __init__(self, args, interval: AdaptivePollInterval | None = None, stats_path: str | None = None):
+        self.args = args
+        self.interval = interval or AdaptivePollInterval()
+        self.stats_path = Path(stats_path) if stats_path else None
+        self.stats = DaemonStats()
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        """Stop after the poll in progress."""
+        if not self._stop.is_set():
+            print("Stopping ingestion daemon after the current poll")
+            self._stop.set()
+
+    async def poll_once(self, client, ledger, admission=None) -> IngestStats:
+        """Run one incremental fetch and ingest, and schedule the next poll."""
+        run_stats = IngestStats()
+        start = time.perf_counter()
+        result = await fetch_and_process_emails(
+            self.args, client=client, ledger=ledger, stats=run_stats, admission=admission
+        )
+        seconds = time.perf_counter() - start
+
+        found = run_stats.ingested + run_stats.failed + run_stats.skipped
+        next_interval = self.interval.update(found)
+        self.stats.record_poll(run_stats, result, seconds, next_interval)
+
+        summary = self.stats.summary()
+        print(
+            f"Poll {summary['polls']}: {found} emails in {seconds:.2f}s, next poll in {next_interval:.1f}s "
+            f"(total {summary['ingested']} ingested, {summary['failed']} failed, {summary['idle_polls']} idle polls)"
+        )
+        if self.stats_path is not None:
+            self.stats.write(self.stats_path)
+        return run_stats
+
+    async def run(self, max_polls: int | None = None) -> int:
+        """Poll until ``stop`` is called or ``max_polls`` polls were made."""
+        args = self.args
+        async with (
+            open_ingest_ledger(args.ledger, args.ledger_path) as ledger,
+            pooled_langgraph_client(
+                args.url,
+                max_connections=args.max_connections,
+                max_keepalive_connections=args.max_keepalive_connections,
+            ) as client,
+        ):
+            # A paused submission stays paused across polls until the backlog drains
+            admission = create_admission_controller(client, args)
+            while not self._stop.is_set():
+                await self.poll_once(client, ledger, admission)
+                if max_polls is not None and self.stats.polls >= max_polls:
+                    break
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.stats.next_interval)
+                except TimeoutError:
+                    pass
+
+        print(f"Ingestion daemon stopped: {json.dumps(self.stats.summary())}")
+        # Only report a failure when no poll succeeded
+        return 1 if self.stats.polls and self.stats.failed_polls == self.stats.polls else 0
+
+
+async def run_daemon(args) -> int:
+    """Run the daemon until SIGINT or SIGTERM."""
+    daemon = IngestDaemon(
+        args,
+        interval=AdaptivePollInterval(args.min_interval, args.max_interval, args.backoff),
+        stats_path=args.stats_path,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, daemon.stop)
+
+    print(f"Ingestion daemon polling {args.email} every {args.min_interval:.0f}-{args.max_interval:.0f}s")
+    return await daemon.run(max_polls=args.max_polls)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = build_parser("Long-running Gmail ingestion daemon for LangGraph")
+    parser.add_argument(
+        "--min-interval", type=float, default=DEFAULT_MIN_INTERVAL, help="Poll interval in seconds while mail arrives"
+    )
+    parser.add_argument(
+        "--max-interval", type=float, default=DEFAULT_MAX_INTERVAL, help="Longest poll interval in seconds when idle"
+    )
+    parser.add_argument(
+        "--backoff", type=float, default=DEFAULT_BACKOFF, help="Interval growth factor after an idle poll"
+    )
+    parser.add_argument("--stats-path", type=str, default=None, help="JSON file updated with the daemon statistics")
+    parser.add_argument("--max-polls", type=int, default=None, help="Stop after this many polls")
+    parser.add_argument(
+        "--windowed", action="store_true", help="Search the --minutes-since window on every poll instead of syncing history"
+    )
+    args = parser.parse_args()
+    args.incremental = not args.windowed
+    # Only meaningful for one-shot runs
+    args.early = False
+    return args
+
+
+if __name__ == "__main__":
+    exit(asyncio.run(run_daemon(parse_args())))
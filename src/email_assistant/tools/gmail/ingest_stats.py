@@ -0,0 +1,121 @@
+"""Throughput and per-stage latency statistics for Gmail ingestion runs."""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+from email_assistant.tools.gmail.http_metrics import TransferCounter
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the ``pct`` percentile (0-100) of ``values`` using nearest-rank interpolation."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class IngestStats:
+    """Collect ingestion counters and per-stage latencies.
+
+    Stages are timed with the ``stage`` context manager, which can wrap awaited calls and can be
+    used concurrently from several coroutines or worker threads. ``transfer`` counts the bytes
+    downloaded from the Gmail API when the service is built with ``counting_authorized_http``.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.ingested = 0
+        self.failed = 0
+        self.skipped = 0
+        # Seconds ingestion waited for the LangGraph run backlog to drain, see admission.py
+        self.throttled_seconds = 0.0
+        # Estimated body tokens before normalization and tokens removed by it, see normalize.py
+        self.body_tokens = 0
+        self.tokens_saved = 0
+        self.stage_latencies: Dict[str, List[float]] = {}
+        self.transfer = TransferCounter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the wrapped block as one occurrence of stage ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Record one latency sample for a stage."""
+        with self._lock:
+            self.stage_latencies.setdefault(name, []).append(seconds)
+
+    def record_normalization(self, original_tokens: int, tokens_saved: int, **_):
+        """Record the estimated tokens of one email body and the tokens its normalization saved."""
+        with self._lock:
+            self.body_tokens += original_tokens
+            self.tokens_saved += tokens_saved
+
+    def finish(self):
+        """Mark the end of the run."""
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        """Wall-clock duration of the run in seconds."""
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Ingested emails per second."""
+        return self.ingested / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> Dict:
+        """Return the statistics as a dict."""
+        stages = {}
+        with self._lock:
+            for name, latencies in self.stage_latencies.items():
+                stages[name] = {
+                    "count": len(latencies),
+                    "mean_ms": 1000 * sum(latencies) / len(latencies),
+                    "p50_ms": 1000 * percentile(latencies, 50),
+                    "p95_ms": 1000 * percentile(latencies, 95),
+                    "max_ms": 1000 * max(latencies),
+                }
+        return {
+            "ingested": self.ingested,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_s": self.elapsed,
+            "throughput_per_s": self.throughput,
+            "throttled_s": self.throttled_seconds,
+            "body_tokens": self.body_tokens,
+            "tokens_saved": self.tokens_saved,
+            **self.transfer.summary(),
+            "stages": stages,
+        }
+
+    def format_report(self) -> str:
+        """Format the statistics as a human readable table."""
+        summary = self.summary()
+        lines = [
+            f"Ingested {summary['ingested']} emails ({summary['failed']} failed, {summary['skipped']} skipped) "
+            f"in {summary['elapsed_s']:.2f}s - {summary['throughput_per_s']:.2f} emails/s",
+            f"Downloaded {summary['bytes_downloaded']} bytes from Gmail in {summary['responses']} responses",
+            f"Throttled by the LangGraph run backlog for {summary['throttled_s']:.2f}s",
+            f"Body normalization saved ~{summary['tokens_saved']} of {summary['body_tokens']} tokens "
+            f"({100 * summary['tokens_saved'] / max(1, summary['body_tokens']):.1f}%)",
+            f"{'stage':<24}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}",
+        ]
+        for name, stage in summary["stages"].items():
+            lines.append(
+                f"{name:<24}{stage['count']:>7}{stage['mean_ms']:>10.1f}{stage['p50_ms']:>10.1f}"
+                f"{stage['p95_ms']:>10.1f}{stage['max_ms']:>10.1f}"
+            )
+        return "\n".join(lines)
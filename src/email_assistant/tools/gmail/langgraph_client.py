@@ -0,0 +1,99 @@
+"""Long-lived, pooled LangGraph SDK client shared by the ingestion paths."""
+
+import importlib.util
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+import httpx
+import langgraph_sdk
+from langgraph_sdk.client import LangGraphClient
+
+from email_assistant.logger import logger
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+
+def http2_available() -> bool:
+    """Return True if the optional ``h2`` package needed by httpx for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def langgraph_headers(api_key: str | None = None) -> Dict[str, str]:
+    """Return the headers of the LangGraph API requests, as set by ``get_client``.
+
+    The API key defaults to ``LANGGRAPH_API_KEY``, ``LANGSMITH_API_KEY`` then ``LANGCHAIN_API_KEY``.
+    """
+    headers = {"User-Agent": f"langgraph-sdk-py/{langgraph_sdk.__version__}"}
+    if not api_key:
+        for prefix in ("LANGGRAPH", "LANGSMITH", "LANGCHAIN"):
+            if api_key := os.getenv(f"{prefix}_API_KEY"):
+                api_key = api_key.strip().strip('"').strip("'")
+                break
+    if api_key:
+        headers["x-api-key"] = api_key
+    return headers
+
+
+def create_langgraph_client(
+    url: str,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+    http2: bool | None = None,
+    api_key: str | None = None,
+) -> LangGraphClient:
+    """Create a LangGraph SDK client backed by a pooled keep-alive httpx client.
+
+    Unlike ``langgraph_sdk.get_client``, which is called once per email, the returned client is
+    meant to be created once and reused for a whole ingestion run so connections are reused.
+
+    Args:
+        url: URL of the LangGraph deployment
+        max_connections: Maximum number of concurrent connections in the pool
+        max_keepalive_connections: Maximum number of idle connections kept alive
+        keepalive_expiry: Seconds an idle connection is kept alive
+        http2: Enable HTTP/2, defaults to True when the ``h2`` package is installed. HTTP/2 is
+            negotiated over TLS, plain ``http://`` deployments keep using HTTP/1.1 keep-alive.
+        api_key: Optional API key, defaults to the environment as in ``get_client``
+
+    Returns:
+        LangGraphClient that must be closed with ``close_langgraph_client``
+    """
+    if http2 is None:
+        http2 = http2_available()
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    transport = httpx.AsyncHTTPTransport(retries=5, http2=http2, limits=limits)
+    client = httpx.AsyncClient(
+        base_url=url,
+        transport=transport,
+        timeout=httpx.Timeout(connect=5, read=300, write=300, pool=5),
+        headers=langgraph_headers(api_key),
+    )
+    logger.info(
+        f"Created pooled LangGraph client for {url} (max_connections={max_connections}, "
+        f"max_keepalive={max_keepalive_connections}, http2={http2})"
+    )
+    return LangGraphClient(client)
+
+
+async def close_langgraph_client(client: LangGraphClient):
+    """Close the connection pool of a client created by ``create_langgraph_client``."""
+    await client.http.client.aclose()
+
+
+@asynccontextmanager
+async def pooled_langgraph_client(url: str, **kwargs) -> AsyncIterator[LangGraphClient]:
+    """Context manager creating a pooled LangGraph client and closing it on exit."""
+    client = create_langgraph_client(url, **kwargs)
+    try:
+        yield client
+    finally:
+        await close_langgraph_client(client)
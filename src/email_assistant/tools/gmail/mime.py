@@ -0,0 +1,143 @@
+"""Text body extraction from Gmail API message payloads.
+
+Gmail returns the MIME tree of a message as nested ``payload``/``parts`` dicts with base64url
+encoded bodies. ``extract_message_part`` walks that tree iteratively and returns the text that
+should reach the LLM:
+
+- of the alternatives of a ``multipart/alternative`` only one is kept, text/plain by default,
+  instead of both the plain and the HTML rendering of the same content;
+- attachments and inline files (parts with a filename, an attachmentId or a
+  ``Content-Disposition: attachment``) and non-text parts are skipped;
+- the decoded text is capped at ``max_bytes``, and only the base64 needed for the cap is decoded;
+- bodies are decoded with the charset of their Content-Type, invalid bytes are replaced.
+"""
+
+import base64
+import binascii
+import os
+from typing import Any, Dict, List, Tuple
+
+# Maximum number of bytes of text extracted from one message
+EMAIL_BODY_MAX_BYTES = int(os.getenv("EMAIL_BODY_MAX_BYTES", str(64 * 1024)))
+
+TRUNCATION_MARKER = "\n[... truncated]"
+
+_TEXT_TYPES = ("text/plain", "text/html")
+
+
+def _header(part: Dict[str, Any], name: str) -> str:
+    name = name.lower()
+    for header in part.get("headers") or []:
+        if header.get("name", "").lower() == name:
+            return header.get("value", "")
+    return ""
+
+
+def _charset(part: Dict[str, Any]) -> str:
+    for param in _header(part, "Content-Type").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip().strip('"')
+    return "utf-8"
+
+
+def _mime_type(part: Dict[str, Any]) -> str:
+    mime_type = (part.get("mimeType") or "").lower()
+    if not mime_type and not part.get("parts") and (part.get("body") or {}).get("data"):
+        # Stubs and some API responses omit the type of a single body
+        return "text/plain"
+    return mime_type
+
+
+def is_attachment(part: Dict[str, Any]) -> bool:
+    """Return True if a part is an attached or inline file rather than message text."""
+    if part.get("filename") or (part.get("body") or {}).get("attachmentId"):
+        return True
+    return _header(part, "Content-Disposition").lower().startswith("attachment")
+
+
+def _text_rank(part: Dict[str, Any], prefer_html: bool) -> int:
+    """Rank an alternative by the best text it contains: 0 preferred type, 1 other type, 2 none."""
+    preferred = "text/html" if prefer_html else "text/plain"
+    best = 2
+    stack = [part]
+    while stack and best:
+        node = stack.pop()
+        if is_attachment(node):
+            continue
+        mime_type = _mime_type(node)
+        if mime_type in _TEXT_TYPES and (node.get("body") or {}).get("data"):
+            best = min(best, 0 if mime_type == preferred else 1)
+        stack.extend(node.get("parts") or [])
+    return best
+
+
+def _select_alternative(parts: List[Dict[str, Any]], prefer_html: bool) -> Dict[str, Any] | None:
+    """Pick the alternative to extract, the first one holding the preferred text type."""
+    ranked = [(rank, idx) for idx, part in enumerate(parts) if (rank := _text_rank(part, prefer_html)) < 2]
+    if not ranked:
+        return None
+    return parts[min(ranked)[1]]
+
+
+def _decode(data: str, charset: str, max_bytes: int) -> Tuple[str, bool]:
+    """Decode at most ``max_bytes`` of a base64url body, returning the text and whether it was cut."""
+    # 4 base64 characters hold 3 bytes, only decode what the cap needs
+    limit = -(-max_bytes // 3) * 4
+    truncated = len(data) > limit
+    chunk = data[:limit] if truncated else data
+    try:
+        raw = base64.urlsafe_b64decode(chunk + "=" * (-len(chunk) % 4))
+    except (binascii.Error, ValueError):
+        return "", False
+    if len(raw) > max_bytes:
+        raw, truncated = raw[:max_bytes], True
+    try:
+        return raw.decode(charset, errors="replace"), truncated
+    except LookupError:
+        return raw.decode("utf-8", errors="replace"), truncated
+
+
+def extract_message_part(payload: Dict[str, Any], max_bytes: int = EMAIL_BODY_MAX_BYTES, prefer_html: bool = False) -> str:
+    """Extract the text body of a Gmail message payload.
+
+    Args:
+        payload: ``payload`` of a message fetched with ``format="full"``, or any part of it
+        max_bytes: Maximum number of decoded bytes returned, longer bodies are truncated
+        prefer_html: Keep the text/html alternative rather than text/plain
+
+    Returns:
+        The text of the message parts in document order, joined by newlines
+    """
+    texts: List[str] = []
+    budget = max_bytes
+    truncated = False
+    stack = [payload]
+
+    while stack and budget > 0:
+        part = stack.pop()
+        if part is not payload and is_attachment(part):
+            continue
+
+        mime_type = _mime_type(part)
+        children = part.get("parts") or []
+        if mime_type == "multipart/alternative" and children:
+            choice = _select_alternative(children, prefer_html)
+            if choice is not None:
+                stack.append(choice)
+        elif children:
+            # multipart/mixed, related, report, message/rfc822...: keep every part, in order
+            stack.extend(reversed(children))
+        elif mime_type in _TEXT_TYPES:
+            data = (part.get("body") or {}).get("data")
+            if not data:
+                continue
+            text, cut = _decode(data, _charset(part), budget)
+            if text:
+                texts.append(text)
+                budget -= len(text.encode("utf-8"))
+            truncated = truncated or cut
+
+    if stack or truncated:
+        texts.append(TRUNCATION_MARKER)
+    return "\n".join(texts)
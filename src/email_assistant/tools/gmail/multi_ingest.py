@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+"""Multi-mailbox Gmail ingestion service.
+
+One deployment polls a whole roster of mailboxes instead of running one cron job per mailbox.
+Mailboxes are spread over shards (processes) and, within a shard, over a pool of async workers
+with consistent hashing, so adding a worker or a shard only moves the mailboxes of its slice of
+the ring. Every worker of a process shares the same pooled LangGraph client, ingest ledger,
+admission controller and Google service factory (credentials and discovery documents are
+cached per mailbox account).
+
+Each mailbox keeps its own adaptive poll interval (see ``ingest_daemon.py``). The service reports
+per-mailbox lag: the time since the last successful poll and how late the last poll started
+compared to its schedule.
+
+The roster is a JSON file holding a list of mailboxes, or ``{"mailboxes": [...]}``:
+
+    [
+        {"email": "alice@example.com", "token_path": "tokens/alice.json"},
+        {"email": "bob@example.com", "gmail_token": {"token": "...", "refresh_token": "..."},
+         "graph_name": "email_assistant_hitl_memory_gmail"}
+    ]
+
+``token_path`` and ``secret_path`` are resolved relative to the roster file. A mailbox without
+credentials uses the default ones (GMAIL_TOKEN or the local token file).
+
+Usage:
+    python -m email_assistant.tools.gmail.multi_ingest --roster config/mailboxes.json --workers 16
+    python -m email_assistant.tools.gmail.multi_ingest --roster config/mailboxes.json --processes 4
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Generic, Hashable, List, Sequence, TypeVar
+
+from email_assistant.persistence.ingest_ledger import open_ingest_ledger
+from email_assistant.tools.gmail.admission import (
+    AdmissionController,
+    create_admission_controller,
+)
+from email_assistant.tools.gmail.async_gmail import configure_gmail_executor
+from email_assistant.tools.gmail.history_sync import HistoryWatermarkStore
+from email_assistant.tools.gmail.ingest_daemon import (
+    DEFAULT_BACKOFF,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    AdaptivePollInterval,
+)
+from email_assistant.tools.gmail.ingest_stats import IngestStats, percentile
+from email_assistant.tools.gmail.langgraph_client import pooled_langgraph_client
+from email_assistant.tools.gmail.run_ingest import (
+    build_parser,
+    fetch_and_process_emails,
+)
+
+N = TypeVar("N", bound=Hashable)
+
+# Virtual nodes per worker or shard on the hash ring
+DEFAULT_RING_REPLICAS = 64
+
+
+@dataclass
+class MailboxConfig:
+    """One mailbox of the roster and the credentials to access it."""
+
+    email: str
+    gmail_token: Any | None = None
+    gmail_secret: str | None = None
+    graph_name: str | None = None
+
+
+def load_roster(path: str) -> List[MailboxConfig]:
+    """Load the roster of mailboxes from a JSON file.
+
+    Raises:
+        ValueError: If an entry has no email or an email appears twice
+    """
+    roster_path = Path(path)
+    with open(roster_path) as f:
+        data = json.load(f)
+    entries = data["mailboxes"] if isinstance(data, dict) else data
+
+    def _read(relative: str) -> str:
+        with open(roster_path.parent / relative) as f:
+            return f.read()
+
+    roster, seen = [], set()
+    for entry in entries:
+        email = (entry.get("email") or "").strip().lower()
+        if not email:
+            raise ValueError(f"Roster entry without email in {path}: {entry}")
+        if email in seen:
+            raise ValueError(f"Mailbox {email} appears twice in {path}")
+        seen.add(email)
+
+        gmail_token = entry.get("gmail_token")
+        if gmail_token is None and entry.get("token_path"):
+            gmail_token = _read(entry["token_path"])
+        gmail_secret = entry.get("gmail_secret")
+        if gmail_secret is None and entry.get("secret_path"):
+            gmail_secret = _read(entry["secret_path"])
+        if isinstance(gmail_secret, dict):
+            gmail_secret = json.dumps(gmail_secret)
+
+        roster.append(
+            MailboxConfig(email=email, gmail_token=gmail_token, gmail_secret=gmail_secret, graph_name=entry.get("graph_name"))
+        )
+    return roster
+
+
+class ConsistentHashRing(Generic[N]):
+    """Consistent hash ring mapping keys (mailboxes) to nodes (workers or shards).
+
+    Each node is placed ``replicas`` times on the ring; a key belongs to the first node after its
+    hash. Adding or removing a node only moves the keys of the ring segments it owns.
+    """
+
+    def __init__(self, nodes: Sequence[N], replicas: int = DEFAULT_RING_REPLICAS):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        points = sorted((self._hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas))
+        self._positions = [position for position, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def node_for(self, key: str) -> N:
+        """Return the node owning ``key``."""
+        idx = bisect.bisect(self._positions, self._hash(key)) % len(self._positions)
+        return self._nodes[idx]
+
+
+@dataclass
+class MailboxStatus:
+    """Poll schedule and lag of one mailbox."""
+
+    config: MailboxConfig
+    worker: int
+    interval: AdaptivePollInterval
+    next_poll_at: float = 0.0
+    polls: int = 0
+    failed_polls: int = 0
+    ingested: int = 0
+    failed: int = 0
+    last_found: int = 0
+    last_poll_at: float | None = None
+    last_success_at: float | None = None
+    # Seconds between the scheduled and the actual start of the last poll
+    schedule_delay: float = 0.0
+    poll_seconds: List[float] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+
+    def lag(self, now: float) -> float:
+        """Seconds since the start of the last successful poll (or since startup)."""
+        return now - (self.last_success_at or self.started_at)
+
+    def summary(self, now: float) -> Dict[str, Any]:
+        """Return the mailbox statistics as a dict."""
+        return {
+            "worker": self.worker,
+            "polls": self.polls,
+            "failed_polls": self.failed_polls,
+            "ingested": self.ingested,
+            "failed": self.failed,
+            "last_found": self.last_found,
+            "lag_s": self.lag(now),
+            "schedule_delay_s": self.schedule_delay,
+            "next_interval_s": self.interval.current,
+            "poll_p95_ms": 1000 * percentile(self.poll_seconds, 95),
+        }
+
+
+class MultiMailboxIngest:
+    """Poll the mailboxes of one shard with a pool of async workers until stopped.
+
+    Args:
+        args: Ingestion options, as parsed by ``parse_args``
+        roster: Every mailbox of the deployment
+        workers: Number of async workers of this shard
+        shard_index: Index of this shard (process)
+        shard_count: Total number of shards
+    """
+
+    def __init__(
+        self,
+        args,
+        roster: List[MailboxConfig],
+        workers: int = 8,
+        shard_index: int = 0,
+        shard_count: int = 1,
+    ):
+        self.args = args
+        self.workers = max(1, workers)
+        self.shard_index = shard_index
+        self.started_at = time.time()
+        self._stop = asyncio.Event()
+        self._admission: Dict[str, AdmissionController | None] = {}
+        # Shared by the workers of this shard and, through its file lock, with the other shards
+        self.watermarks = HistoryWatermarkStore()
+
+        shard_ring = ConsistentHashRing(list(range(shard_count)))
+        worker_ring = ConsistentHashRing(list(range(self.workers)))
+        self.mailboxes: Dict[str, MailboxStatus] = {}
+        for config in roster:
+            if shard_ring.node_for(config.email) != shard_index:
+                continue
+            self.mailboxes[config.email] = MailboxStatus(
+                config=config,
+                worker=worker_ring.node_for(config.email),
+                interval=AdaptivePollInterval(args.min_interval, args.max_interval, args.backoff),
+            )
+
+    def stop(self):
+        """Stop every worker after its poll in progress."""
+        if not self._stop.is_set():
+            print(f"Stopping shard {self.shard_index} after the polls in progress")
+            self._stop.set()
+
+    def _run_args(self, config: MailboxConfig) -> argparse.Namespace:
+        return argparse.Namespace(
+            **{
+                **vars(self.args),
+                "email": config.email,
+                "gmail_token": config.gmail_token,
+                "gmail_secret": config.gmail_secret,
+                "graph_name": config.graph_name or self.args.graph_name,
+                "watermark_store": self.watermarks,
+            }
+        )
+
+    def _admission_for(self, client, run_args) -> AdmissionController | None:
+        # One controller per target graph, shared by every mailbox ingesting into it
+        if run_args.graph_name not in self._admission:
+            self._admission[run_args.graph_name] = create_admission_controller(client, run_args)
+        return self._admission[run_args.graph_name]
+
+    async def _poll(self, status: MailboxStatus, client, ledger):
+        run_args = self._run_args(status.config)
+        run_stats = IngestStats()
+        started = time.time()
+        status.schedule_delay = max(0.0, time.monotonic() - status.next_poll_at)
+
+        start = time.perf_counter()
+        try:
+            result = await fetch_and_process_emails(
+                run_args,
+                client=client,
+                ledger=ledger,
+                stats=run_stats,
+                admission=self._admission_for(client, run_args),
+            )
+        except Exception as e:
+            print(f"Poll of {status.config.email} failed: {str(e)}")
+            result = 1
+        status.poll_seconds = (status.poll_seconds + [time.perf_counter() - start])[-100:]
+
+        found = run_stats.ingested + run_stats.failed + run_stats.skipped
+        status.polls += 1
+        status.last_poll_at = started
+        status.last_found = found
+        status.ingested += run_stats.ingested
+        status.failed += run_stats.failed
+        if result:
+            status.failed_polls += 1
+        else:
+            status.last_success_at = started
+        status.next_poll_at = time.monotonic() + status.interval.update(found)
+
+    async def _worker(self, worker: int, client, ledger, max_polls: int | None):
+        mailboxes = [status for status in self.mailboxes.values() if status.worker == worker]
+        while mailboxes and not self._stop.is_set():
+            # Poll the mailbox that is due first, or wait for it
+            status = min(mailboxes, key=lambda s: s.next_poll_at)
+            delay = status.next_poll_at - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=delay)
+                    break
+                except TimeoutError:
+                    pass
+
+            await self._poll(status, client, ledger)
+            if max_polls is not None and status.polls >= max_polls:
+                mailboxes.remove(status)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the shard statistics with the lag of every mailbox."""
+        now = time.time()
+        mailboxes = {email: status.summary(now) for email, status in self.mailboxes.items()}
+        lags = [status["lag_s"] for status in mailboxes.values()]
+        return {
+            "shard": self.shard_index,
+            "uptime_s": now - self.started_at,
+            "mailboxes": len(mailboxes),
+            "workers": self.workers,
+            "polls": sum(status["polls"] for status in mailboxes.values()),
+            "ingested": sum(status["ingested"] for status in mailboxes.values()),
+            "failed": sum(status["failed"] for status in mailboxes.values()),
+            "lag_p50_s": percentile(lags, 50),
+            "lag_p95_s": percentile(lags, 95),
+            "lag_max_s": max(lags, default=0.0),
+            "admission": {graph: c.summary() for graph, c in self._admission.items() if c is not None},
+            "per_mailbox": mailboxes,
+        }
+
+    def format_report(self, top: int = 10) -> str:
+        """Format the shard statistics and the most lagging mailboxes as a table."""
+        summary = self.summary()
+        lines = [
+            f"Shard {summary['shard']}: {summary['mailboxes']} mailboxes on {summary['workers']} workers, "
+            f"{summary['polls']} polls, {summary['ingested']} ingested ({summary['failed']} failed), "
+            f"lag p50 {summary['lag_p50_s']:.0f}s / p95 {summary['lag_p95_s']:.0f}s / max {summary['lag_max_s']:.0f}s",
+            f"{'mailbox':<36}{'worker':>7}{'polls':>7}{'ingested':>10}{'lag s':>8}{'late s':>8}{'next s':>8}",
+        ]
+        laggards = sorted(summary["per_mailbox"].items(), key=lambda item: item[1]["lag_s"], reverse=True)
+        for email, status in laggards[:top]:
+            lines.append(
+                f"{email:<36}{status['worker']:>7}{status['polls']:>7}{status['ingested']:>10}"
+                f"{status['lag_s']:>8.0f}{status['schedule_delay_s']:>8.1f}{status['next_interval_s']:>8.0f}"
+            )
+        return "\n".join(lines)
+
+    def write_stats(self, path: str):
+        """Atomically write the shard statistics as JSON."""
+        stats_path = Path(path)
+        stats_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = stats_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp_path, stats_path)
+
+    async def _report(self, interval: float, stats_path: str | None):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=interval)
+            except TimeoutError:
+                pass
+            print(self.format_report())
+            if stats_path:
+                self.write_stats(stats_path)
+
+    async def run(self, max_polls: int | None = None, report_interval: float = 60.0, stats_path: str | None = None):
+        """Poll every mailbox of the shard until ``stop`` is called or each was polled ``max_polls`` times."""
+        args = self.args
+        print(f"Shard {self.shard_index}: {len(self.mailboxes)} mailboxes on {self.workers} workers")
+        async with (
+            open_ingest_ledger(args.ledger, args.ledger_path) as ledger,
+            pooled_langgraph_client(
+                args.url,
+                max_connections=args.max_connections,
+                max_keepalive_connections=args.max_keepalive_connections,
+            ) as client,
+        ):
+            reporter = asyncio.create_task(self._report(report_interval, stats_path))
+            await asyncio.gather(*(self._worker(worker, client, ledger, max_polls) for worker in range(self.workers)))
+            self.stop()
+            await reporter
+        # Only report a failure when some mailbox could not be polled at all
+        never_polled = [s for s in self.mailboxes.values() if s.polls and s.failed_polls == s.polls]
+        return 1 if never_polled else 0
+
+
+async def run_shard(args, shard_index: int) -> int:
+    """Run one shard until SIGINT or SIGTERM."""
+    configure_gmail_executor(args.gmail_threads)
+    service = MultiMailboxIngest(
+        args, load_roster(args.roster), workers=args.workers, shard_index=shard_index, shard_count=args.shard_count
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, service.stop)
+
+    stats_path = args.stats_path
+    if stats_path and args.shard_count > 1:
+        stats_path = str(Path(stats_path).with_suffix(f".shard{shard_index}.json"))
+    return await service.run(max_polls=args.max_polls, report_interval=args.report_interval, stats_path=stats_path)
+
+
+def _shard_process(args, shard_index: int):
+    exit(asyncio.run(run_shard(args, shard_index)))
+
+
+def run_processes(args) -> int:
+    """Run ``args.processes`` local shard processes and wait for them."""
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_shard_process, args=(args, idx), name=f"ingest-shard-{idx}") for idx in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # The shards received the SIGINT too and finish their polls in progress
+        for process in processes:
+            process.join()
+    return 1 if any(process.exitcode for process in processes) else 0
+
+
+def parse_args():
+    """Parse command line arguments."""
+    # The mailboxes come from the roster
+    parser = build_parser("Multi-mailbox Gmail ingestion for LangGraph", with_email=False)
+
+    parser.add_argument("--roster", type=str, required=True, help="JSON roster of mailboxes and their credentials")
+    parser.add_argument("--workers", type=int, default=8, help="Async workers per shard")
+    parser.add_argument("--processes", type=int, default=1, help="Shard processes started locally")
+    parser.add_argument(
+        "--shard-index", type=int, default=None, help="Run only this shard (for one replica per shard deployments)"
+    )
+    parser.add_argument("--shard-count", type=int, default=None, help="Total number of shards, requires --shard-index unless equal to --processes")
+    parser.add_argument("--gmail-threads", type=int, default=16, help="Gmail executor threads per shard")
+    parser.add_argument("--min-interval", type=float, default=DEFAULT_MIN_INTERVAL, help="Poll interval while mail arrives")
+    parser.add_argument("--max-interval", type=float, default=DEFAULT_MAX_INTERVAL, help="Longest poll interval when idle")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="Interval growth factor after an idle poll")
+    parser.add_argument("--report-interval", type=float, default=60.0, help="Seconds between two lag reports")
+    parser.add_argument("--stats-path", type=str, default=None, help="JSON file updated with the shard statistics")
+    parser.add_argument("--max-polls", type=int, default=None, help="Stop after polling every mailbox this many times")
+    parser.add_argument(
+        "--windowed", action="store_true", help="Search the --minutes-since window on every poll instead of syncing history"
+    )
+    args = parser.parse_args()
+    args.incremental = not args.windowed
+    args.early = False
+    args.shard_count = args.shard_count or args.processes
+    # Local processes run shards 0 to --processes - 1, any other shard would never be polled
+    if args.shard_index is None and args.shard_count != args.processes:
+        parser.error("--shard-count must equal --processes unless --shard-index is given")
+    if args.shard_index is not None and not 0 <= args.shard_index < args.shard_count:
+        parser.error(f"--shard-index must be between 0 and {args.shard_count - 1}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.shard_index is not None:
+        exit(asyncio.run(run_shard(args, args.shard_index)))
+    elif args.processes > 1:
+        exit(run_processes(args))
+    else:
+        exit(asyncio.run(run_shard(args, 0)))
@@ -0,0 +1,272 @@
+"""Normalization of email bodies before triage and drafting.
+
+Replies carry the whole quoted history of their thread, forwards their forwarding headers, and most
+business emails a signature and a legal footer. All of it is sent to the triage and response
+prompts although it repeats content the model has already seen or carries no information.
+``normalize_email_body`` removes these blocks according to a ``NormalizationPolicy``:
+
+- ``forwarded``: the ``Forwarded message`` banner and header lines, the forwarded text is kept;
+- ``quotes``: quoted replies, from the attribution line (``On ... wrote:``, ``-----Original
+  Message-----``, an Outlook ``From:``/``Sent:`` header block) to the end, and ``>`` quoted lines;
+- ``footer``: trailing paragraphs with confidentiality notices, disclaimers and unsubscribe links,
+  when they follow a signature, come after a separator line or carry several such notices, and
+  the body keeps some content besides a greeting;
+- ``signature``: everything after a ``-- `` delimiter, mobile client taglines, and the lines that
+  follow a closing such as ``Best regards,`` at the end of the body, provided they all look like a
+  signature: a few short name, title, company or phone lines without sentences.
+
+The policy is read from ``EMAIL_NORMALIZE_POLICY``, a comma separated list of these stages, or
+``all`` (default) and ``none``. HTML bodies are left as they are. A body is never reduced to
+nothing: when every line would be removed, for example in a forward without comment, the original
+body is kept.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from email_assistant.html_text import is_html
+
+# Forwarding headers are removed before they can be taken for a quoted Outlook header block, and
+# footers before signatures, whose closing is looked for at the end of the body
+STAGES = ("forwarded", "quotes", "footer", "signature")
+
+EMAIL_NORMALIZE_POLICY = os.getenv("EMAIL_NORMALIZE_POLICY", "all")
+
+# Lines of a signature after a closing, longer tails are kept as they are likely content
+MAX_SIGNATURE_LINES = 6
+# Longest line, in characters and words, taken for a name, title, company or phone line
+MAX_SIGNATURE_LINE_CHARS = 60
+MAX_SIGNATURE_LINE_WORDS = 6
+
+_ATTRIBUTION_RE = re.compile(
+    r"^\s*(On\s.{0,200}\swrote:|Le\s.{0,200}\sa écrit\s?:|Am\s.{0,200}\sschrieb\s.{0,100}:|El\s.{0,200}\sescribió:)\s*$",
+    re.I,
+)
+_ORIGINAL_MESSAGE_RE = re.compile(r"^\s*-{2,}\s*Original Message\s*-{2,}\s*$", re.I)
+_OUTLOOK_HEADER_RE = re.compile(r"^\s*\*?(From|De|Von)\s*:\*?\s+\S")
+_OUTLOOK_NEXT_RE = re.compile(r"^\s*\*?(Sent|Date|Envoyé|Gesendet|To|Subject)\s*:", re.I)
+_FORWARDED_RE = re.compile(r"^\s*-{2,}\s*(Forwarded message|Begin forwarded message|Message transféré)\s*:?\s*-*\s*$", re.I)
+_FORWARDED_HEADER_RE = re.compile(r"^\s*(From|Date|Subject|To|Cc|Sent|Reply-To)\s*:", re.I)
+_SIGNATURE_DELIMITER_RE = re.compile(r"^--\s?$")
+_MOBILE_TAGLINE_RE = re.compile(r"^\s*(Sent from my \w+|Sent from (Mail|Outlook) for \w+|Get Outlook for \w+)", re.I)
+_CLOSING_RE = re.compile(
+    r"^\s*(best|best regards|kind regards|warm regards|regards|thanks|thank you|many thanks|cheers|sincerely|"
+    r"all the best|talk soon|br)\s*[,.!]?\s*$",
+    re.I,
+)
+# Words ending with a period that don't end a sentence in a signature
+_ABBREVIATION_RE = re.compile(r"^(Inc|Ltd|LLC|Corp|Co|Jr|Sr|Dr|Mr|Mrs|Ms|St|Ave|Ph\.D|[A-Z])$", re.I)
+_PERIOD_RE = re.compile(r"(\S+)\.(?=\s|$)")
+_FOOTER_RE = re.compile(
+    r"confidential|privileged|intended (solely |only )?for the (use of the )?(named )?(addressee|recipient)|"
+    r"disclaimer|unsubscribe|opt[- ]out|manage (your )?(email )?preferences|you (are )?receiv(ed|ing) this (email|message)",
+    re.I,
+)
+_SEPARATOR_RE = re.compile(r"^\s*([-_=*~])\1{2,}\s*$")
+_GREETING_RE = re.compile(r"^\s*(hi|hello|hey|dear|good (morning|afternoon|evening))\b[^.?!]{0,40}[,:!]?\s*$", re.I)
+
+
+@dataclass(frozen=True)
+class NormalizationPolicy:
+    """Stages of ``normalize_email_body`` to apply."""
+
+    forwarded: bool = True
+    quotes: bool = True
+    footer: bool = True
+    signature: bool = True
+
+    @classmethod
+    def parse(cls, spec: str) -> "NormalizationPolicy":
+        """Build a policy from ``all``, ``none`` or a comma separated list of stages."""
+        spec = (spec or "").strip().lower()
+        if spec == "all":
+            return cls()
+        names = {name.strip() for name in spec.split(",") if name.strip() and name.strip() != "none"}
+        unknown = names - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown email normalization stages {sorted(unknown)}, expected some of {STAGES}")
+        return cls(**{stage: stage in names for stage in STAGES})
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any stage is applied."""
+        return self.forwarded or self.quotes or self.footer or self.signature
+
+
+@dataclass
+class NormalizedBody:
+    """Result of ``normalize_email_body``."""
+
+    text: str
+    original_chars: int
+    removed_chars: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def chars_saved(self) -> int:
+        """Return the number of characters removed from the body."""
+        return self.original_chars - len(self.text)
+
+    @property
+    def tokens_saved(self) -> int:
+        """Estimated prompt tokens saved, at about 4 characters per token."""
+        return estimate_tokens(self.chars_saved)
+
+
+def estimate_tokens(chars: int) -> int:
+    """Estimate the number of tokens of a text of ``chars`` characters."""
+    return (chars + 3) // 4
+
+
+def default_policy() -> NormalizationPolicy:
+    """Return the policy configured by ``EMAIL_NORMALIZE_POLICY``."""
+    return NormalizationPolicy.parse(EMAIL_NORMALIZE_POLICY)
+
+
+def _chars(lines: List[str]) -> int:
+    return sum(len(line) + 1 for line in lines)
+
+
+def _strip_quotes(lines: List[str]) -> List[str]:
+    previous = ""
+    for idx, line in enumerate(lines):
+        if _ATTRIBUTION_RE.match(line) or _ORIGINAL_MESSAGE_RE.match(line):
+            lines = lines[:idx]
+            break
+        # Outlook quotes the previous message under a From:/Sent: header block, unlike a forward
+        if (
+            previous
+            and not _FORWARDED_RE.match(previous)
+            and _OUTLOOK_HEADER_RE.match(line)
+            and idx + 1 < len(lines)
+            and _OUTLOOK_NEXT_RE.match(lines[idx + 1])
+        ):
+            lines = lines[:idx]
+            break
+        if line.strip():
+            previous = line
+    return [line for line in lines if not line.lstrip().startswith(">")]
+
+
+def _strip_forwarded(lines: List[str]) -> List[str]:
+    kept = []
+    in_headers = False
+    for line in lines:
+        if _FORWARDED_RE.match(line):
+            in_headers = True
+            continue
+        if in_headers:
+            if _FORWARDED_HEADER_RE.match(line):
+                continue
+            in_headers = False
+            if not line.strip():
+                continue
+        kept.append(line)
+    return kept
+
+
+def _is_signature_line(line: str) -> bool:
+    """Whether a line after a closing looks like a name, title, company or phone line rather than a sentence."""
+    text = line.strip()
+    if len(text) > MAX_SIGNATURE_LINE_CHARS or len(text.split()) > MAX_SIGNATURE_LINE_WORDS:
+        return False
+    if "?" in text or "!" in text:
+        return False
+    return all(_ABBREVIATION_RE.match(word) for word in _PERIOD_RE.findall(text))
+
+
+def _strip_signature(lines: List[str]) -> List[str]:
+    for idx, line in enumerate(lines):
+        if _SIGNATURE_DELIMITER_RE.match(line):
+            lines = lines[:idx]
+            break
+    lines = [line for line in lines if not _MOBILE_TAGLINE_RE.match(line)]
+
+    # Name, title and phone numbers after a closing at the end of the body. Lines are checked from
+    # the end: a closing is only a signature start when every line after it looks like a signature
+    content = [idx for idx, line in enumerate(lines) if line.strip()]
+    for idx in reversed(content[-(MAX_SIGNATURE_LINES + 1) :]):
+        if _CLOSING_RE.match(lines[idx]):
+            return lines[: idx + 1]
+        if not _is_signature_line(lines[idx]):
+            break
+    return lines
+
+
+def _ends_with_signature(lines: List[str]) -> bool:
+    """Whether the body has a signature delimiter or ends with a closing followed by signature lines."""
+    if any(_SIGNATURE_DELIMITER_RE.match(line) for line in lines):
+        return True
+    content = [idx for idx, line in enumerate(lines) if line.strip()]
+    for idx in reversed(content[-(MAX_SIGNATURE_LINES + 1) :]):
+        if _CLOSING_RE.match(lines[idx]) or _MOBILE_TAGLINE_RE.match(lines[idx]):
+            return True
+        if not _is_signature_line(lines[idx]):
+            return False
+    return False
+
+
+def _strip_footer(lines: List[str]) -> List[str]:
+    while lines:
+        # Last paragraph of the body
+        end = len(lines)
+        while end and not lines[end - 1].strip():
+            end -= 1
+        start = end
+        while start and lines[start - 1].strip():
+            start -= 1
+        if start == end:
+            return lines
+
+        # A single notice without a signature or separator before it is likely content, e.g. a
+        # confidential request or an unsubscribe request
+        cues = sum(1 for _ in _FOOTER_RE.finditer(" ".join(lines[start:end])))
+        kept = lines[:start]
+        while kept and (not kept[-1].strip() or _SEPARATOR_RE.match(kept[-1])):
+            kept = kept[:-1]
+        separated = any(_SEPARATOR_RE.match(line) for line in lines[len(kept) : start + 1])
+        if not cues or not (separated or cues > 1 or _ends_with_signature(kept)):
+            return lines
+        if not any(line.strip() and not _GREETING_RE.match(line) for line in kept):
+            return lines
+        lines = kept
+    return lines
+
+
+_STAGE_FUNCTIONS = {
+    "quotes": _strip_quotes,
+    "forwarded": _strip_forwarded,
+    "signature": _strip_signature,
+    "footer": _strip_footer,
+}
+
+
+def normalize_email_body(text: str, policy: NormalizationPolicy | None = None) -> NormalizedBody:
+    """Remove quoted replies, forwarding headers, signatures and footers from an email body.
+
+    Args:
+        text: Plain text body of the email
+        policy: Stages to apply, defaults to the ``EMAIL_NORMALIZE_POLICY`` policy
+
+    Returns:
+        The normalized body with the number of characters removed by every stage
+    """
+    policy = policy or default_policy()
+    result = NormalizedBody(text=text or "", original_chars=len(text or ""))
+    if not text or not policy.enabled or is_html(text):
+        return result
+
+    lines = text.replace("\r\n", "\n").split("\n")
+    for stage in STAGES:
+        if getattr(policy, stage):
+            before = _chars(lines)
+            lines = _STAGE_FUNCTIONS[stage](lines)
+            result.removed_chars[stage] = before - _chars(lines)
+
+    normalized = re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+    if normalized:
+        result.text = normalized
+    else:
+        result.removed_chars = {}
+    return result
@@ -0,0 +1,514 @@
+#!/usr/bin/env python
+"""Push-based Gmail ingestion driven by ``users.watch`` notifications.
+
+Gmail publishes a Pub/Sub message whenever the watched mailbox changes. A Pub/Sub push
+subscription delivers it as an HTTP POST to the receiver below, which acknowledges it right away
+and hands it to a per-mailbox debouncer. Bursts of notifications (one email usually produces
+several) are coalesced into a single incremental fetch, and a mailbox never has two fetches in
+flight: notifications arriving during a fetch schedule exactly one follow-up fetch.
+
+``--email`` ingests one mailbox with the default Gmail credentials. ``--roster`` ingests every
+mailbox of a roster (see ``multi_ingest.py``) with its own credentials, and starts and renews one
+watch per mailbox.
+
+Usage:
+    python -m email_assistant.tools.gmail.push_ingest --email me@example.com \
+        --topic projects/my-project/topics/gmail-push --port 8085
+    python -m email_assistant.tools.gmail.push_ingest --roster config/mailboxes.json \
+        --topic projects/my-project/topics/gmail-push --port 8085
+
+    # Receiver only, printing the fetches it would trigger (see eval/fake_gmail_push.py)
+    python -m email_assistant.tools.gmail.push_ingest --email me@example.com --dry-run
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Set
+from urllib.parse import parse_qs, urlsplit
+
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.async_gmail import run_in_gmail_executor
+from email_assistant.tools.gmail.ingest_stats import percentile
+from email_assistant.tools.gmail.langgraph_client import (
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+)
+from email_assistant.tools.gmail.multi_ingest import MailboxConfig, load_roster
+from email_assistant.tools.gmail.run_ingest import fetch_and_process_emails
+from email_assistant.tools.gmail.service_factory import get_service_factory
+
+# Seconds without a new notification before a mailbox is fetched
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+# Upper bound of the delay between the first notification of a burst and its fetch
+DEFAULT_MAX_DELAY_SECONDS = 15.0
+# Gmail stops a watch after 7 days, Google recommends renewing it daily
+DEFAULT_WATCH_RENEW_SECONDS = 24 * 3600
+
+PUSH_PATH = "/gmail/push"
+STATS_PATH = "/stats"
+MAX_BODY_BYTES = 64 * 1024
+
+_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 413: "Payload Too Large"}
+
+
+@dataclass
+class GmailNotification:
+    """Change notification of a watched mailbox, decoded from a Pub/Sub push message."""
+
+    email_address: str
+    history_id: str
+    message_id: str | None = None
+    publish_time: str | None = None
+
+
+def parse_push_notification(body: bytes) -> GmailNotification:
+    """Decode the Pub/Sub push request body of a Gmail watch notification.
+
+    The body has the form ``{"message": {"data": <base64 JSON>, "messageId": ..., "publishTime": ...},
+    "subscription": ...}`` where the data holds ``{"emailAddress": ..., "historyId": ...}``.
+
+    Raises:
+        ValueError: If the body is not a Gmail notification
+    """
+    try:
+        envelope = json.loads(body)
+        message = envelope["message"]
+        data = message["data"]
+        # Pub/Sub uses standard base64, accept the URL-safe alphabet and missing padding too
+        data = data.replace("+", "-").replace("/", "_")
+        decoded = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+        payload = json.loads(decoded)
+        email_address = payload["emailAddress"]
+        history_id = payload["historyId"]
+    except (KeyError, TypeError, binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Not a Gmail push notification: {str(e)}") from e
+
+    return GmailNotification(
+        email_address=email_address.lower(),
+        history_id=str(history_id),
+        message_id=message.get("messageId") or message.get("message_id"),
+        publish_time=message.get("publishTime") or message.get("publish_time"),
+    )
+
+
+def start_watch(service, topic_name: str, label_ids: List[str] | None = None) -> Dict[str, Any]:
+    """Ask Gmail to publish changes of the authenticated mailbox to a Pub/Sub topic.
+
+    Calling it again renews the watch.
+
+    Args:
+        service: Gmail API service object
+        topic_name: Full topic name, e.g. ``projects/my-project/topics/gmail-push``
+        label_ids: Only notify changes of messages with these labels (defaults to INBOX)
+
+    Returns:
+        Watch response holding the current ``historyId`` and the ``expiration`` in epoch ms
+    """
+    body = {"topicName": topic_name, "labelIds": label_ids or ["INBOX"], "labelFilterBehavior": "include"}
+    return service.users().watch(userId="me", body=body).execute()
+
+
+@dataclass
+class _MailboxState:
+    timer: asyncio.TimerHandle | None = None
+    first_pending_at: float | None = None
+    running: bool = False
+    dirty: bool = False
+
+
+@dataclass
+class PushStats:
+    """Counters of the push receiver and debouncer."""
+
+    notifications: int = 0
+    coalesced: int = 0
+    ignored: int = 0
+    rejected: int = 0
+    fetches: int = 0
+    failed_fetches: int = 0
+    # Seconds from the first notification of a burst to the start of its fetch
+    trigger_delays: List[float] = field(default_factory=list)
+    fetch_seconds: List[float] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the statistics as a dict."""
+        return {
+            "notifications": self.notifications,
+            "coalesced": self.coalesced,
+            "ignored": self.ignored,
+            "rejected": self.rejected,
+            "fetches": self.fetches,
+            "failed_fetches": self.failed_fetches,
+            "trigger_delay_p50_ms": 1000 * percentile(self.trigger_delays, 50),
+            "trigger_delay_p95_ms": 1000 * percentile(self.trigger_delays, 95),
+            "fetch_p50_ms": 1000 * percentile(self.fetch_seconds, 50),
+            "fetch_p95_ms": 1000 * percentile(self.fetch_seconds, 95),
+        }
+
+
+class MailboxDebouncer:
+    """Coalesce mailbox notifications into incremental fetches, one mailbox at a time.
+
+    A fetch starts ``debounce`` seconds after the last notification of a burst, and at most
+    ``max_delay`` seconds after its first one. Notifications arriving while the mailbox is being
+    fetched trigger a single follow-up fetch once it finishes.
+
+    Args:
+        trigger: Coroutine function fetching one mailbox; a non-zero return value counts as a failure
+        debounce: Quiet period in seconds before a mailbox is fetched
+        max_delay: Longest delay in seconds between a notification and the fetch covering it
+        stats: Optional statistics shared with the receiver
+    """
+
+    def __init__(
+        self,
+        trigger: Callable[[str], Awaitable[Any]],
+        debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+        max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+        stats: PushStats | None = None,
+    ):
+        self.trigger = trigger
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self.stats = stats or PushStats()
+        self._mailboxes: Dict[str, _MailboxState] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def notify(self, email_address: str):
+        """Schedule a fetch of ``email_address``, merging it with any pending one."""
+        loop = asyncio.get_running_loop()
+        state = self._mailboxes.setdefault(email_address, _MailboxState())
+
+        if state.running:
+            # The fetch in progress may have listed the history before this change
+            if state.dirty:
+                self.stats.coalesced += 1
+            state.dirty = True
+            return
+
+        now = loop.time()
+        if state.first_pending_at is None:
+            state.first_pending_at = now
+        else:
+            self.stats.coalesced += 1
+        if state.timer is not None:
+            state.timer.cancel()
+        delay = min(self.debounce, max(0.0, state.first_pending_at + self.max_delay - now))
+        state.timer = loop.call_later(delay, self._start_fetch, email_address)
+
+    def _start_fetch(self, email_address: str):
+        state = self._mailboxes[email_address]
+        state.timer = None
+        self.stats.trigger_delays.append(asyncio.get_running_loop().time() - state.first_pending_at)
+        state.first_pending_at = None
+        state.running = True
+        task = asyncio.create_task(self._fetch(email_address, state))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, email_address: str, state: _MailboxState):
+        try:
+            while True:
+                state.dirty = False
+                start = time.perf_counter()
+                try:
+                    result = await self.trigger(email_address)
+                    if result not in (0, None):
+                        self.stats.failed_fetches += 1
+                except Exception as e:
+                    self.stats.failed_fetches += 1
+                    logger.error(f"Push-triggered fetch of {email_address} failed: {str(e)}")
+                self.stats.fetches += 1
+                self.stats.fetch_seconds.append(time.perf_counter() - start)
+
+                if not state.dirty:
+                    break
+                # Changes arrived during the fetch, give the rest of the burst time to settle
+                await asyncio.sleep(self.debounce)
+        finally:
+            state.running = False
+
+    def pending(self) -> int:
+        """Return the number of mailboxes with a scheduled or running fetch."""
+        return sum(1 for state in self._mailboxes.values() if state.timer is not None or state.running)
+
+    async def drain(self):
+        """Start the scheduled fetches now and wait for every fetch to finish."""
+        for email_address, state in self._mailboxes.items():
+            if state.timer is not None:
+                state.timer.cancel()
+                self._start_fetch(email_address)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+class PushReceiver:
+    """Minimal asyncio HTTP/1.1 endpoint for Pub/Sub push deliveries of Gmail notifications.
+
+    ``POST /gmail/push`` answers 204 as soon as the notification is queued, so Pub/Sub never
+    retries because of a slow fetch. Notifications of mailboxes outside ``mailboxes`` are
+    acknowledged and ignored, malformed bodies are rejected with 400. ``GET /stats`` returns the
+    receiver statistics as JSON.
+
+    Args:
+        debouncer: Debouncer receiving the notifications
+        mailboxes: Email addresses to ingest, or None to accept any mailbox
+        host: Interface to listen on
+        port: Port to listen on, 0 picks a free port
+        verification_token: Optional secret expected in the ``token`` query parameter of the
+            push endpoint URL configured on the subscription
+    """
+
+    def __init__(
+        self,
+        debouncer: MailboxDebouncer,
+        mailboxes: List[str] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 8085,
+        verification_token: str | None = None,
+    ):
+        self.debouncer = debouncer
+        self.mailboxes = {mailbox.lower() for mailbox in mailboxes} if mailboxes else None
+        self.host = host
+        self.port = port
+        self.verification_token = verification_token
+        self.stats = debouncer.stats
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def url(self) -> str:
+        """Return the URL of the push endpoint."""
+        return f"http://{self.host}:{self.port}{PUSH_PATH}"
+
+    async def start(self):
+        """Start listening; the actual port is available in ``port`` afterwards."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Gmail push receiver listening on {self.url}")
+
+    async def close(self):
+        """Stop accepting connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def handle(self, method: str, target: str, body: bytes):
+        """Route one request, returning the status code and the optional JSON response body."""
+        parts = urlsplit(target)
+        if method == "GET" and parts.path == STATS_PATH:
+            return 200, {**self.stats.summary(), "pending_mailboxes": self.debouncer.pending()}
+        if method != "POST" or parts.path != PUSH_PATH:
+            return 404, None
+
+        if self.verification_token is not None:
+            if parse_qs(parts.query).get("token", [None])[0] != self.verification_token:
+                self.stats.rejected += 1
+                return 403, None
+
+        try:
+            notification = parse_push_notification(body)
+        except ValueError as e:
+            self.stats.rejected += 1
+            logger.warning(str(e))
+            return 400, None
+
+        self.stats.notifications += 1
+        if self.mailboxes is not None and notification.email_address not in self.mailboxes:
+            self.stats.ignored += 1
+            logger.info(f"Ignoring notification for unconfigured mailbox {notification.email_address}")
+            return 204, None
+
+        logger.debug(f"Notification for {notification.email_address} at historyId {notification.history_id}")
+        self.debouncer.notify(notification.email_address)
+        return 204, None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    self._write_response(writer, 413, None, keep_alive=False)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = self.handle(method, target, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: dict | None, keep_alive: bool):
+        content = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+        if status != 204:
+            head += ["Content-Type: application/json", f"Content-Length: {len(content)}"]
+        if not keep_alive:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + content)
+
+
+def ingest_trigger(args) -> Callable[[str], Awaitable[int]]:
+    """Return a trigger running an incremental ``fetch_and_process_emails`` for a mailbox, with its credentials."""
+    configs = {config.email.lower(): config for config in args.mailboxes}
+
+    async def trigger(email_address: str) -> int:
+        config = configs[email_address.lower()]
+        run_args = argparse.Namespace(
+            **{
+                **vars(args),
+                "email": config.email,
+                "incremental": True,
+                "gmail_token": config.gmail_token,
+                "gmail_secret": config.gmail_secret,
+                "graph_name": config.graph_name or args.graph_name,
+            }
+        )
+        return await fetch_and_process_emails(run_args)
+
+    return trigger
+
+
+def dry_run_trigger(latency: float) -> Callable[[str], Awaitable[int]]:
+    """Return a trigger that only prints the fetch it would run, for local testing."""
+
+    async def trigger(email_address: str) -> int:
+        print(f"[dry-run] incremental fetch of {email_address}")
+        await asyncio.sleep(latency)
+        return 0
+
+    return trigger
+
+
+async def _renew_watch(mailboxes: List[MailboxConfig], topic: str, label_ids: List[str], interval: float):
+    """Renew the Gmail watch of every mailbox, with its credentials, every ``interval`` seconds."""
+    factory = get_service_factory()
+    while True:
+        for config in mailboxes:
+            try:
+                service = await run_in_gmail_executor(
+                    factory.get_service, "gmail", "v1", gmail_token=config.gmail_token, gmail_secret=config.gmail_secret
+                )
+                response = await run_in_gmail_executor(start_watch, service, topic, label_ids)
+                print(
+                    f"Watching {label_ids} of {config.email} on {topic}: historyId {response.get('historyId')}, "
+                    f"expires {response.get('expiration')}"
+                )
+            except Exception as e:
+                print(f"Failed to start Gmail watch of {config.email} on {topic}: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+async def serve(args):
+    """Run the push receiver until cancelled, then finish the pending fetches."""
+    trigger = dry_run_trigger(args.dry_run_latency) if args.dry_run else ingest_trigger(args)
+    debouncer = MailboxDebouncer(trigger, debounce=args.debounce, max_delay=args.max_delay)
+    receiver = PushReceiver(
+        debouncer,
+        mailboxes=[config.email for config in args.mailboxes],
+        host=args.host,
+        port=args.port,
+        verification_token=args.verification_token,
+    )
+    await receiver.start()
+    mailboxes = ", ".join(config.email for config in args.mailboxes)
+    print(f"Receiving Gmail push notifications on {receiver.url} for {mailboxes}")
+
+    renewal = None
+    if args.topic:
+        renewal = asyncio.create_task(_renew_watch(args.mailboxes, args.topic, args.label, args.watch_renew))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if renewal is not None:
+            renewal.cancel()
+        await receiver.close()
+        await debouncer.drain()
+        print(f"Push ingestion stats: {json.dumps(receiver.stats.summary())}")
+    return 0
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Ingest Gmail emails to LangGraph on Gmail push notifications")
+
+    mailboxes = parser.add_mutually_exclusive_group(required=True)
+    mailboxes.add_argument("--email", type=str, default=None, help="Mailbox ingested with the default credentials")
+    mailboxes.add_argument(
+        "--roster", type=str, default=None, help="JSON roster of mailboxes and their credentials, see multi_ingest.py"
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface of the push receiver")
+    parser.add_argument("--port", type=int, default=8085, help="Port of the push receiver")
+    parser.add_argument(
+        "--verification-token", type=str, default=None, help="Secret expected in the token query parameter"
+    )
+    parser.add_argument("--topic", type=str, default=None, help="Pub/Sub topic to start (and renew) a Gmail watch on")
+    parser.add_argument("--label", type=str, action="append", default=None, help="Label to watch (default INBOX)")
+    parser.add_argument(
+        "--watch-renew", type=float, default=DEFAULT_WATCH_RENEW_SECONDS, help="Seconds between watch renewals"
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=DEFAULT_DEBOUNCE_SECONDS, help="Quiet period before fetching a mailbox"
+    )
+    parser.add_argument(
+        "--max-delay",
+        type=float,
+        default=DEFAULT_MAX_DELAY_SECONDS,
+        help="Longest delay between a notification and its fetch",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Print the fetches instead of running them")
+    parser.add_argument("--dry-run-latency", type=float, default=0.5, help="Simulated fetch duration of --dry-run")
+
+    # Options of the triggered incremental fetch, see run_ingest.py
+    parser.add_argument("--minutes-since", type=int, default=120, help="Window of the fallback search in minutes")
+    parser.add_argument("--graph-name", type=str, default="email_assistant_hitl", help="Name of the LangGraph to use")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:2024", help="URL of the LangGraph deployment")
+    parser.add_argument("--include-read", action="store_true", help="Include emails that have already been read")
+    parser.add_argument(
+        "--ledger", type=str, choices=["sqlite", "postgres", "none"], default="sqlite", help="Backend of the ledger"
+    )
+    parser.add_argument("--ledger-path", type=str, default=None, help="SQLite ledger path or Postgres URI")
+    parser.add_argument("--skip-filters", action="store_true", help="Skip filtering of emails")
+    parser.add_argument("--concurrency", type=int, default=1, help="Maximum number of emails ingested concurrently")
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS)
+    parser.add_argument("--max-keepalive-connections", type=int, default=DEFAULT_MAX_KEEPALIVE_CONNECTIONS)
+
+    args = parser.parse_args()
+    args.label = args.label or ["INBOX"]
+    args.mailboxes = load_roster(args.roster) if args.roster else [MailboxConfig(email=args.email)]
+    # Options of run_ingest that don't apply to push-triggered fetches
+    args.early = False
+    args.rerun = False
+    return args
+
+
+if __name__ == "__main__":
+    try:
+        exit(asyncio.run(serve(parse_args())))
+    except KeyboardInterrupt:
+        pass
@@ -8,17 +8,57 @@ with reliable LangSmith tracing.
 
 import argparse
 import asyncio
-import base64
 import hashlib
-import json
-import os
 import uuid
+from collections import defaultdict
+from contextlib import AsyncExitStack
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from langgraph_sdk import get_client
+from langgraph_sdk.client import LangGraphClient
+
+from email_assistant.persistence.ingest_ledger import (
+    OUTCOME_FAILED,
+    IngestLedger,
+    LedgerEntry,
+    content_hash,
+    open_ingest_ledger,
+)
+from email_assistant.tools.gmail.admission import (
+    DEFAULT_BACKLOG_PROBE_INTERVAL,
+    DEFAULT_MAX_ADMISSION_DELAY,
+    AdmissionController,
+    create_admission_controller,
+)
+from email_assistant.tools.gmail.async_gmail import run_in_gmail_executor
+from email_assistant.tools.gmail.gmail_tools import (
+    MESSAGE_FULL_FIELDS,
+    MESSAGE_LIST_FIELDS,
+)
+from email_assistant.tools.gmail.history_sync import IncrementalSync
+from email_assistant.tools.gmail.http_metrics import track_transfer
+from email_assistant.tools.gmail.ingest_stats import IngestStats
+from email_assistant.tools.gmail.langgraph_client import (
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    pooled_langgraph_client,
+)
+from email_assistant.tools.gmail.mime import extract_message_part
+from email_assistant.tools.gmail.normalize import (
+    EMAIL_NORMALIZE_POLICY,
+    NormalizationPolicy,
+    estimate_tokens,
+    normalize_email_body,
+)
+from email_assistant.tools.gmail.service_factory import get_service_factory
+from email_assistant.triage.batch import (
+    TRIAGE_BATCH_MAX_WAIT,
+    BatchTriager,
+    create_batch_triager,
+)
+from email_assistant.triage.rules import select_triage_headers
 
 # Setup paths
 _ROOT = Path(__file__).parent.absolute()
@@ -26,95 +66,17 @@ _SECRETS_DIR = _ROOT / ".secrets"
 TOKEN_PATH = _SECRETS_DIR / "token.json"
 
 
-def extract_message_part(payload):
-    """Extract content from a message part."""
-    # If this is multipart, process with preference for text/plain
-    if payload.get("parts"):
-        # First try to find text/plain part
-        for part in payload["parts"]:
-            mime_type = part.get("mimeType", "")
-            if mime_type == "text/plain" and part.get("body", {}).get("data"):
-                data = part["body"]["data"]
-                return base64.urlsafe_b64decode(data).decode("utf-8")
+def normalization_policy(args) -> NormalizationPolicy:
+    """Return the body normalization policy of the ingestion options."""
+    return NormalizationPolicy.parse(getattr(args, "normalize", None) or EMAIL_NORMALIZE_POLICY)
 
-        # If no text/plain found, try text/html
-        for part in payload["parts"]:
-            mime_type = part.get("mimeType", "")
-            if mime_type == "text/html" and part.get("body", {}).get("data"):
-                data = part["body"]["data"]
-                return base64.urlsafe_b64decode(data).decode("utf-8")
 
-        # If we still haven't found content, recursively check for nested parts
-        for part in payload["parts"]:
-            content = extract_message_part(part)
-            if content:
-                return content
+def extract_email_data(message, policy: NormalizationPolicy | None = None):
+    """Extract key information from a Gmail message.
 
-    # Not multipart, try to get content directly
-    if payload.get("body", {}).get("data"):
-        data = payload["body"]["data"]
-        return base64.urlsafe_b64decode(data).decode("utf-8")
-
-    return ""
-
-
-def load_gmail_credentials():
+    The body is normalized with ``policy`` (see ``normalize.py``), ``normalization`` holds the
+    characters removed by every stage and the estimated tokens saved.
     """
-    Load Gmail credentials from token.json or environment variables.
-
-    This function attempts to load credentials from multiple sources in this order:
-    1. Environment variables GMAIL_TOKEN
-    2. Local file at token_path (.secrets/token.json)
-
-    Returns:
-        Google OAuth2 Credentials object or None if credentials can't be loaded
-    """
-    token_data = None
-
-    # 1. Try environment variable
-    env_token = os.getenv("GMAIL_TOKEN")
-    if env_token:
-        try:
-            token_data = json.loads(env_token)
-            print("Using GMAIL_TOKEN environment variable")
-        except Exception as e:
-            print(f"Could not parse GMAIL_TOKEN environment variable: {str(e)}")
-
-    # 2. Try local file as fallback
-    if token_data is None:
-        if TOKEN_PATH.exists():
-            try:
-                with open(TOKEN_PATH, "r") as f:
-                    token_data = json.load(f)
-                print(f"Using token from {TOKEN_PATH}")
-            except Exception as e:
-                print(f"Could not load token from {TOKEN_PATH}: {str(e)}")
-        else:
-            print(f"Token file not found at {TOKEN_PATH}")
-
-    # If we couldn't get token data from any source, return None
-    if token_data is None:
-        print("Could not find valid token data in any location")
-        return None
-
-    try:
-        # Create credentials object
-        credentials = Credentials(
-            token=token_data.get("token"),
-            refresh_token=token_data.get("refresh_token"),
-            token_uri=token_data.get("token_uri", "https://oauth2.googleapis.com/token"),
-            client_id=token_data.get("client_id"),
-            client_secret=token_data.get("client_secret"),
-            scopes=token_data.get("scopes", ["https://www.googleapis.com/auth/gmail.modify"]),
-        )
-        return credentials
-    except Exception as e:
-        print(f"Error creating credentials object: {str(e)}")
-        return None
-
-
-def extract_email_data(message):
-    """Extract key information from a Gmail message."""
     headers = message["payload"]["headers"]
 
     # Extract key headers
@@ -123,27 +85,68 @@ def extract_email_data(message):
     to_email = next((h["value"] for h in headers if h["name"] == "To"), "Unknown Recipient")
     date = next((h["value"] for h in headers if h["name"] == "Date"), "Unknown Date")
 
-    # Extract message content
-    content = extract_message_part(message["payload"])
+    # Extract message content, without quoted replies, signatures and footers
+    normalized = normalize_email_body(extract_message_part(message["payload"]), policy)
 
     # Create email data object
     email_data = {
         "from_email": from_email,
         "to_email": to_email,
         "subject": subject,
-        "page_content": content,
+        "page_content": normalized.text,
         "id": message["id"],
         "thread_id": message["threadId"],
         "send_time": date,
+        # Kept for the triage rules, see triage/rules.py
+        "headers": select_triage_headers(headers),
+        "normalization": {
+            "original_tokens": estimate_tokens(normalized.original_chars),
+            "tokens_saved": normalized.tokens_saved,
+            "removed_chars": normalized.removed_chars,
+        },
     }
 
     return email_data
 
 
-async def ingest_email_to_langgraph(email_data, graph_name, url="http://127.0.0.1:2024"):
-    """Ingest an email to LangGraph."""
+def graph_email_input(email_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the ``email_input`` of the graph run of an email."""
+    email_input = {
+        "from": email_data["from_email"],
+        "to": email_data["to_email"],
+        "subject": email_data["subject"],
+        "body": email_data["page_content"],
+        "id": email_data["id"],
+        "headers": email_data.get("headers", {}),
+    }
+    # Decision of batch triage, the triage router routes on it without calling the LLM
+    if email_data.get("triage"):
+        email_input["triage"] = email_data["triage"]
+    return email_input
+
+
+async def ingest_email_to_langgraph(
+    email_data,
+    graph_name,
+    url="http://127.0.0.1:2024",
+    stats: IngestStats | None = None,
+    client: LangGraphClient | None = None,
+    admission: AdmissionController | None = None,
+):
+    """Ingest an email to LangGraph.
+
+    Pass a long-lived ``client`` (see ``create_langgraph_client``) to reuse its connection pool
+    across emails, otherwise a new client is created for this email. With an ``admission``
+    controller the run is only submitted once the server's run backlog allows it.
+    """
+    stats = stats or IngestStats()
+
+    if admission is not None:
+        stats.record("admission_wait", await admission.acquire())
+
     # Connect to LangGraph server
-    client = get_client(url=url)
+    if client is None:
+        client = get_client(url=url)
 
     # Create a consistent UUID for the thread
     raw_thread_id = email_data["thread_id"]
@@ -151,78 +154,124 @@ async def ingest_email_to_langgraph(email_data, graph_name, url="http://127.0.0.
     print(f"Gmail thread ID: {raw_thread_id} → LangGraph thread ID: {thread_id}")
 
     thread_exists = False
-    try:
-        # Try to get existing thread info
-        thread_info = await client.threads.get(thread_id)
-        thread_exists = True
-        print(f"Found existing thread: {thread_id}")
-    except Exception as e:
-        # If thread doesn't exist, create it
-        print(f"exception {e} - Creating new thread: {thread_id}")
-        thread_info = await client.threads.create(thread_id=thread_id)
-        print(thread_info)
+    with stats.stage("thread_get_or_create"):
+        try:
+            # Try to get existing thread info
+            thread_info = await client.threads.get(thread_id)
+            thread_exists = True
+            print(f"Found existing thread: {thread_id}")
+        except Exception as e:
+            # If thread doesn't exist, create it
+            print(f"exception {e} - Creating new thread: {thread_id}")
+            thread_info = await client.threads.create(thread_id=thread_id)
+            print(thread_info)
 
     # If thread exists, clean up previous runs
     if thread_exists:
-        try:
-            # List all runs for this thread
-            runs = await client.runs.list(thread_id)
-
-            # Delete all previous runs to avoid state accumulation
-            for run_info in runs:
-                run_id = run_info.get("run_id")
-                print(f"Deleting previous run {run_id} from thread {thread_id}")
-                try:
-                    await client.runs.delete(thread_id, run_id)
-                except Exception as e:
-                    print(f"Failed to delete run {run_id}: {str(e)}")
-        except Exception as e:
-            print(f"Error listing/deleting runs: {str(e)}")
+        with stats.stage("runs_cleanup"):
+            try:
+                # List all runs for this thread
+                runs = await client.runs.list(thread_id)
+
+                # Delete all previous runs to avoid state accumulation
+                for run_info in runs:
+                    run_id = run_info.get("run_id")
+                    print(f"Deleting previous run {run_id} from thread {thread_id}")
+                    try:
+                        await client.runs.delete(thread_id, run_id)
+                    except Exception as e:
+                        print(f"Failed to delete run {run_id}: {str(e)}")
+            except Exception as e:
+                print(f"Error listing/deleting runs: {str(e)}")
 
     # Update thread metadata with current email ID
-    await client.threads.update(thread_id, metadata={"email_id": email_data["id"]})
+    with stats.stage("thread_update"):
+        await client.threads.update(thread_id, metadata={"email_id": email_data["id"]})
 
     # Create a fresh run for this email
     print(f"Creating run for thread {thread_id} with graph {graph_name}")
 
-    run = await client.runs.create(
-        thread_id,
-        graph_name,
-        input={
-            "email_input": {
-                "from": email_data["from_email"],
-                "to": email_data["to_email"],
-                "subject": email_data["subject"],
-                "body": email_data["page_content"],
-                "id": email_data["id"],
-            }
-        },
-        multitask_strategy="rollback",
-    )
+    with stats.stage("run_create"):
+        run = await client.runs.create(
+            thread_id,
+            graph_name,
+            input={"email_input": graph_email_input(email_data)},
+            multitask_strategy="rollback",
+        )
 
     print(f"Run created successfully with thread ID: {thread_id}")
 
     return thread_id, run
 
 
-async def fetch_and_process_emails(args):
-    """Fetch emails from Gmail and process them through LangGraph."""
-    # Load Gmail credentials
-    credentials = load_gmail_credentials()
-    if not credentials:
-        print("Failed to load Gmail credentials")
-        return 1
+async def fetch_and_process_emails(
+    args,
+    client: LangGraphClient | None = None,
+    ledger: IngestLedger | None = None,
+    stats: IngestStats | None = None,
+    admission: AdmissionController | None = None,
+):
+    """Fetch emails from Gmail and process them through LangGraph.
 
-    # Build Gmail service
-    service = build("gmail", "v1", credentials=credentials)
+    Long-running callers (see ``ingest_daemon.py``) pass their own ``client``, ``ledger`` and
+    ``admission`` controller to keep them across runs, and a ``stats`` object to read the
+    counters of the run. Otherwise they are created for this run only.
+    """
+    # Load Gmail credentials, cached with the Gmail service by the process-wide factory
+    factory = get_service_factory()
+    if not await run_in_gmail_executor(factory.get_credentials, **gmail_account(args)):
+        print(f"Failed to load Gmail credentials for {args.email}")
+        return 1
 
-    # Process emails
-    processed_count = 0
+    stats = stats or IngestStats()
 
     try:
-        # Get messages from the specified email address
-        email_address = args.email
+        async with AsyncExitStack() as stack:
+            # The ledger records ingested emails so overlapping windows don't trigger triage twice,
+            # a single pooled client is shared by every email of the run
+            if ledger is None:
+                ledger = await stack.enter_async_context(open_ingest_ledger(args.ledger, args.ledger_path))
+            if client is None:
+                client = await stack.enter_async_context(
+                    pooled_langgraph_client(
+                        args.url,
+                        max_connections=args.max_connections,
+                        max_keepalive_connections=args.max_keepalive_connections,
+                    )
+                )
+
+            # Runs are only submitted as fast as the server's run backlog allows
+            if admission is None:
+                admission = create_admission_controller(client, args)
+
+            # The bytes downloaded from Gmail by this run are counted in its stats
+            with track_transfer(stats.transfer):
+                return await _fetch_and_ingest(args, ledger, client, stats, admission)
+
+    except Exception as e:
+        print(f"Error processing emails: {str(e)}")
+        return 1
+
+
+def gmail_account(args) -> Dict[str, Any]:
+    """Return the Gmail credentials of the ingested mailbox, as keyword arguments of the service factory.
+
+    Single-mailbox runs leave them unset and use the default credentials (GMAIL_TOKEN or the
+    local token file), see ``multi_ingest.py`` for runs over a roster of mailboxes.
+    """
+    return {"gmail_token": getattr(args, "gmail_token", None), "gmail_secret": getattr(args, "gmail_secret", None)}
+
 
+def _list_messages(args) -> Tuple[List[Dict[str, Any]], IncrementalSync | None]:
+    """List the message references to ingest; blocking, runs in the Gmail executor."""
+    service = get_service_factory().get_service("gmail", "v1", **gmail_account(args))
+    email_address = args.email
+
+    # In incremental mode only the messages added since the last run are listed
+    sync = IncrementalSync(service, email_address, getattr(args, "watermark_store", None)) if args.incremental else None
+    messages = sync.list_new_messages(include_read=args.include_read) if sync else None
+
+    if messages is None:
         # Construct Gmail search query
         query = f"to:{email_address} OR from:{email_address}"
 
@@ -241,63 +290,299 @@ async def fetch_and_process_emails(args):
         print(f"Gmail search query: {query}")
 
         # Execute the search
-        results = service.users().messages().list(userId="me", q=query).execute()
+        results = service.users().messages().list(userId="me", q=query, fields=MESSAGE_LIST_FIELDS).execute()
         messages = results.get("messages", [])
 
+    return messages, sync
+
+
+def _message_fetcher(args, message_id: str) -> Callable[[], dict]:
+    """Return a blocking function fetching one full message of the ingested mailbox."""
+    account = gmail_account(args)
+
+    # httplib2 is not thread-safe, the factory caches one Gmail service per worker thread
+    def fetch():
+        service = get_service_factory().get_service("gmail", "v1", **account)
+        return service.users().messages().get(userId="me", id=message_id, fields=MESSAGE_FULL_FIELDS).execute()
+
+    return fetch
+
+
+async def _fetch_and_ingest(
+    args,
+    ledger: IngestLedger | None,
+    client: LangGraphClient,
+    stats: IngestStats,
+    admission: AdmissionController | None = None,
+):
+    """List the matching Gmail messages and ingest the new ones to LangGraph."""
+    # Get messages from the specified email address
+    email_address = args.email
+
+    # Gmail calls run in the Gmail executor so other mailboxes sharing the event loop keep going
+    with stats.stage("gmail_list"):
+        messages, sync = await run_in_gmail_executor(_list_messages, args)
+
+    if not messages:
+        print("No emails found matching the criteria")
+        if sync:
+            sync.commit()
+        return 0
+
+    print(f"Found {len(messages)} emails")
+
+    # Check the ledger in bulk for already processed emails, unless we were asked to rerun them
+    if ledger is not None and not args.rerun:
+        processed_ids = await ledger.get_processed_ids(email_address, [message["id"] for message in messages])
+        if processed_ids:
+            print(f"Skipping {len(processed_ids)} emails already ingested")
+            stats.skipped = len(processed_ids)
+            messages = [message for message in messages if message["id"] not in processed_ids]
+
         if not messages:
-            print("No emails found matching the criteria")
+            print("No new emails to process")
+            if sync:
+                sync.commit()
             return 0
 
-        print(f"Found {len(messages)} emails")
+    # Stop early if requested
+    stopped_early = args.early and len(messages) > 1
+    if stopped_early:
+        print("Early stop: only processing the first email")
+        messages = messages[:1]
 
-        # Process each email
-        for i, message_info in enumerate(messages):
-            # Stop early if requested
-            if args.early and i > 0:
-                print(f"Early stop after processing {i} emails")
-                break
+    throttled_before = admission.throttled_seconds if admission is not None else 0.0
 
-            # Check if we should reprocess this email
-            if not args.rerun:
-                # TODO: Add check for already processed emails
-                pass
+    # Emails are triaged in batches before their runs are created, see triage/batch.py
+    triager = await create_batch_triager(client, args)
+    if triager is not None and args.concurrency < triager.triage.batch_size:
+        print(f"Batch triage of {triager.triage.batch_size} emails needs a --concurrency at least as large")
 
-            # Get the full message
-            message = service.users().messages().get(userId="me", id=message_info["id"]).execute()
+    # Process each email
+    try:
+        if args.concurrency > 1:
+            await _ingest_concurrently(args, ledger, client, messages, stats, admission, triager)
+        else:
+            for i, message_info in enumerate(messages):
+                print(f"\nProcessing email {i + 1}/{len(messages)}:")
+                await _ingest_message(
+                    args, _message_fetcher(args, message_info["id"]), ledger, client, stats, admission, triager
+                )
+    finally:
+        if triager is not None:
+            await triager.close()
+
+    stats.finish()
+    if admission is not None:
+        stats.throttled_seconds = admission.throttled_seconds - throttled_before
+    print(f"\n{stats.format_report()}")
+    if admission is not None:
+        print(f"Admission control: {admission.summary()}")
+    if triager is not None:
+        print(f"Batch triage: {triager.stats.summary()}")
+
+    # Only move the history watermark once every listed message has been handled: an incremental sync
+    # never lists failed messages again, the next run retries them from the same watermark and the
+    # ledger skips the ones already ingested
+    if sync and not stopped_early:
+        if stats.failed:
+            print(f"Not moving the history watermark, {stats.failed} emails failed and will be retried")
+        else:
+            sync.commit()
+
+    print(f"\nProcessed {stats.ingested} emails successfully")
+    return 1 if stats.failed else 0
+
+
+async def _ingest_message(
+    args,
+    fetch_message: Callable[[], dict],
+    ledger: IngestLedger | None,
+    client: LangGraphClient,
+    stats: IngestStats,
+    admission: AdmissionController | None = None,
+    triager: BatchTriager | None = None,
+):
+    """Fetch one Gmail message, ingest it to LangGraph and record the outcome in the ledger."""
+    # Get the full message and extract the email data, failures count against the exit code
+    try:
+        with stats.stage("gmail_fetch"):
+            message = await run_in_gmail_executor(fetch_message)
+        email_data = extract_email_data(message, normalization_policy(args))
+    except Exception:
+        stats.failed += 1
+        raise
+    stats.record_normalization(**email_data["normalization"])
+
+    print(f"From: {email_data['from_email']}")
+    print(f"Subject: {email_data['subject']}")
+    if removed := {stage: chars for stage, chars in email_data["normalization"]["removed_chars"].items() if chars}:
+        print(f"Normalized body: ~{email_data['normalization']['tokens_saved']} tokens saved {removed}")
+
+    # Batch triage, the email waits for the other emails of its batch
+    if triager is not None:
+        try:
+            with stats.stage("batch_triage"):
+                decision = await triager.classify(graph_email_input(email_data))
+            if decision is not None:
+                email_data["triage"] = decision.model_dump()
+                print(f"Batch triage: {decision.classification}")
+        except Exception as e:
+            print(f"Batch triage failed, leaving the email to the triage router: {str(e)}")
 
-            # Extract email data
-            email_data = extract_email_data(message)
+    entry = LedgerEntry(
+        mailbox=args.email,
+        message_id=email_data["id"],
+        thread_id=email_data["thread_id"],
+        content_hash=content_hash(email_data),
+    )
 
-            print(f"\nProcessing email {i + 1}/{len(messages)}:")
-            print(f"From: {email_data['from_email']}")
-            print(f"Subject: {email_data['subject']}")
+    # Ingest to LangGraph
+    try:
+        thread_id, run = await ingest_email_to_langgraph(
+            email_data, args.graph_name, url=args.url, stats=stats, client=client, admission=admission
+        )
+    except Exception:
+        stats.failed += 1
+        if ledger is not None:
+            entry.outcome = OUTCOME_FAILED
+            await ledger.record([entry])
+        raise
+
+    if ledger is not None:
+        with stats.stage("ledger_record"):
+            entry.run_id = run.get("run_id")
+            await ledger.record([entry])
+
+    stats.ingested += 1
+    return thread_id, run
 
-            # Ingest to LangGraph
-            thread_id, run = await ingest_email_to_langgraph(email_data, args.graph_name, url=args.url)
 
-            processed_count += 1
+async def _ingest_concurrently(
+    args,
+    ledger: IngestLedger | None,
+    client: LangGraphClient,
+    messages,
+    stats: IngestStats,
+    admission: AdmissionController | None = None,
+    triager: BatchTriager | None = None,
+):
+    """
+    Ingest messages with at most ``args.concurrency`` emails in flight.
 
-        print(f"\nProcessed {processed_count} emails successfully")
-        return 0
+    Messages of the same Gmail thread are ingested one after another, in listing order, so that
+    LangGraph runs of a thread are never created concurrently.
+    """
+    semaphore = asyncio.Semaphore(args.concurrency)
+    thread_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def worker(i: int, message_info: dict):
+        # Take the thread lock before a pool slot so waiting messages don't hold slots
+        async with thread_locks[message_info["threadId"]]:
+            async with semaphore:
+                print(f"\nProcessing email {i + 1}/{len(messages)}:")
+                try:
+                    await _ingest_message(
+                        args, _message_fetcher(args, message_info["id"]), ledger, client, stats, admission, triager
+                    )
+                except Exception as e:
+                    print(f"Failed to ingest message {message_info['id']}: {str(e)}")
 
-    except Exception as e:
-        print(f"Error processing emails: {str(e)}")
-        return 1
+    print(f"Ingesting {len(messages)} emails with concurrency {args.concurrency}")
+    await asyncio.gather(*(worker(i, message_info) for i, message_info in enumerate(messages)))
 
 
-def parse_args():
-    """Parse command line arguments."""
-    parser = argparse.ArgumentParser(description="Simple Gmail ingestion for LangGraph with reliable tracing")
+def build_parser(description: str = "Simple Gmail ingestion for LangGraph with reliable tracing", with_email: bool = True):
+    """Build the command line parser of the ingestion options, with a required ``--email`` unless ``with_email`` is False."""
+    parser = argparse.ArgumentParser(description=description)
 
-    parser.add_argument("--email", type=str, required=True, help="Email address to fetch messages for")
+    if with_email:
+        parser.add_argument("--email", type=str, required=True, help="Email address to fetch messages for")
     parser.add_argument("--minutes-since", type=int, default=120, help="Only retrieve emails newer than this many minutes")
     parser.add_argument("--graph-name", type=str, default="email_assistant_hitl", help="Name of the LangGraph to use")
     parser.add_argument("--url", type=str, default="http://127.0.0.1:2024", help="URL of the LangGraph deployment")
     parser.add_argument("--early", action="store_true", help="Early stop after processing one email")
     parser.add_argument("--include-read", action="store_true", help="Include emails that have already been read")
     parser.add_argument("--rerun", action="store_true", help="Process the same emails again even if already processed")
+    parser.add_argument(
+        "--ledger",
+        type=str,
+        choices=["sqlite", "postgres", "none"],
+        default="sqlite",
+        help="Backend of the ledger of already processed emails",
+    )
+    parser.add_argument(
+        "--ledger-path", type=str, default=None, help="SQLite ledger path or Postgres URI (defaults to the local config)"
+    )
     parser.add_argument("--skip-filters", action="store_true", help="Skip filtering of emails")
-    return parser.parse_args()
+    parser.add_argument(
+        "--batch-triage",
+        type=int,
+        default=0,
+        help="Triage emails in LLM batches of this size before creating their runs (0 leaves triage to the graph)",
+    )
+    parser.add_argument(
+        "--batch-triage-wait",
+        type=float,
+        default=TRIAGE_BATCH_MAX_WAIT,
+        help="Seconds a partial triage batch waits for more emails",
+    )
+    parser.add_argument(
+        "--normalize",
+        type=str,
+        default=EMAIL_NORMALIZE_POLICY,
+        help="Body normalization stages: all, none or a comma separated list of forwarded, quotes, footer, signature",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Maximum number of emails fetched and ingested concurrently"
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=DEFAULT_MAX_CONNECTIONS,
+        help="Maximum number of connections to the LangGraph server",
+    )
+    parser.add_argument(
+        "--max-keepalive-connections",
+        type=int,
+        default=DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        help="Maximum number of idle keep-alive connections to the LangGraph server",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch emails added since the last run (Gmail historyId watermark), falling back to --minutes-since",
+    )
+    parser.add_argument(
+        "--max-pending-runs",
+        type=int,
+        default=0,
+        help="Pause submission while the graph has this many busy threads on the server (0 disables admission control)",
+    )
+    parser.add_argument(
+        "--resume-pending-runs",
+        type=int,
+        default=None,
+        help="Backlog at which paused submission resumes and below which runs are not delayed (default: half)",
+    )
+    parser.add_argument(
+        "--max-admission-delay",
+        type=float,
+        default=DEFAULT_MAX_ADMISSION_DELAY,
+        help="Delay in seconds of a submission just below --max-pending-runs",
+    )
+    parser.add_argument(
+        "--backlog-probe-interval",
+        type=float,
+        default=DEFAULT_BACKLOG_PROBE_INTERVAL,
+        help="Minimum seconds between two probes of the server's run backlog",
+    )
+    return parser
+
+
+def parse_args():
+    """Parse command line arguments."""
+    return build_parser().parse_args()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+"""Cached factory of Google API credentials and Gmail/Calendar service objects.
+
+Building a service with ``googleapiclient.discovery.build`` parses the discovery document of the
+API on every call, and loading the credentials parses the token JSON again. The factory keeps,
+per account, the parsed credentials and, per API, the parsed discovery document. Service objects
+are cached per account, API and thread because the underlying httplib2 connections are not
+thread-safe. Tokens are refreshed ahead of their expiry under a per-account lock, so concurrent
+worker threads don't refresh the same token at once.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from google.auth.transport.requests import Request
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.http_metrics import (
+    TransferCounter,
+    counting_authorized_http,
+)
+
+# Refresh tokens that expire within this many seconds
+DEFAULT_REFRESH_MARGIN = 300
+
+_TOKEN_PATH = Path(__file__).parent.absolute() / ".secrets" / "token.json"
+
+CredentialsLoader = Callable[[str | None, str | None], Any]
+
+
+def _account_key(gmail_token: Any | None = None, gmail_secret: str | None = None) -> str:
+    """Identify the account whose credentials ``get_credentials`` would load.
+
+    Follows the same source order as the loader (parameter, GMAIL_TOKEN environment variable,
+    local token file) without parsing the token. A rewritten token file gets a new key.
+    """
+    if gmail_token:
+        source = gmail_token if isinstance(gmail_token, str) else json.dumps(gmail_token, sort_keys=True)
+    elif os.getenv("GMAIL_TOKEN"):
+        source = os.environ["GMAIL_TOKEN"]
+    elif _TOKEN_PATH.exists():
+        source = f"{_TOKEN_PATH}:{_TOKEN_PATH.stat().st_mtime_ns}"
+    else:
+        source = ""
+    return hashlib.sha256(f"{source}\x00{gmail_secret or ''}".encode()).hexdigest()[:16]
+
+
+class GoogleServiceFactory:
+    """Thread-safe cache of Google API credentials and service objects.
+
+    Args:
+        credentials_loader: Function loading the credentials of an account from
+            ``(gmail_token, gmail_secret)``, returning None when none can be found
+        refresh_margin: Seconds before expiry at which a token is refreshed
+        api_endpoints: Optional endpoint per API name overriding the Google endpoint, e.g. to
+            point the services to a local emulator
+    """
+
+    def __init__(
+        self,
+        credentials_loader: CredentialsLoader,
+        refresh_margin: int = DEFAULT_REFRESH_MARGIN,
+        api_endpoints: Dict[str, str] | None = None,
+    ):
+        self.credentials_loader = credentials_loader
+        self.refresh_margin = refresh_margin
+        self.api_endpoints = api_endpoints or {}
+        # Bytes downloaded by every service built by the factory
+        self.transfer = TransferCounter()
+        self._credentials: Dict[str, Any] = {}
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+        self._documents: Dict[Tuple[str, str], dict | None] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get_credentials(self, gmail_token: Any | None = None, gmail_secret: str | None = None):
+        """Return the cached, fresh credentials of an account, loading them on first use.
+
+        Args:
+            gmail_token: Optional JSON string or dict containing token data
+            gmail_secret: Optional JSON string containing credentials
+
+        Returns:
+            Google OAuth2 Credentials object or None if credentials can't be loaded
+        """
+        return self._get_credentials(_account_key(gmail_token, gmail_secret), gmail_token, gmail_secret)
+
+    def _get_credentials(self, key: str, gmail_token: Any | None, gmail_secret: str | None):
+        with self._lock:
+            credentials = self._credentials.get(key)
+            refresh_lock = self._refresh_locks.setdefault(key, threading.Lock())
+
+        if credentials is None:
+            with refresh_lock:
+                credentials = self._credentials.get(key)
+                if credentials is None:
+                    credentials = self.credentials_loader(gmail_token, gmail_secret)
+                    if credentials is None:
+                        return None
+                    with self._lock:
+                        self._credentials[key] = credentials
+
+        self._refresh_if_needed(key, credentials, refresh_lock)
+        return credentials
+
+    def _needs_refresh(self, credentials) -> bool:
+        if not getattr(credentials, "refresh_token", None):
+            return False
+        if not credentials.token:
+            return True
+        if credentials.expiry is None:
+            return False
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.now(UTC).replace(tzinfo=None)
+        return credentials.expiry - timedelta(seconds=self.refresh_margin) <= now
+
+    def _refresh_if_needed(self, key: str, credentials, refresh_lock: threading.Lock):
+        if not self._needs_refresh(credentials):
+            return
+        with refresh_lock:
+            # Another thread may have refreshed the token while we waited for the lock
+            if not self._needs_refresh(credentials):
+                return
+            try:
+                credentials.refresh(Request())
+                logger.info(f"Refreshed Google API token for account {key}, expires at {credentials.expiry}")
+            except Exception as e:
+                # The authorized HTTP object retries the refresh on the next 401
+                logger.warning(f"Could not refresh Google API token for account {key}: {str(e)}")
+
+    def _discovery_document(self, api: str, version: str) -> dict | None:
+        with self._lock:
+            if (api, version) not in self._documents:
+                document = discovery_cache.get_static_doc(api, version)
+                self._documents[(api, version)] = json.loads(document) if document else None
+            return self._documents[(api, version)]
+
+    def get_service(self, api: str, version: str, gmail_token: Any | None = None, gmail_secret: str | None = None):
+        """Return the calling thread's cached service object for an account and API.
+
+        Args:
+            api: API name, e.g. "gmail" or "calendar"
+            version: API version, e.g. "v1" or "v3"
+            gmail_token: Optional JSON string or dict containing token data
+            gmail_secret: Optional JSON string containing credentials
+
+        Returns:
+            Resource object of the API
+
+        Raises:
+            ValueError: If no credentials can be loaded for the account
+        """
+        account = _account_key(gmail_token, gmail_secret)
+        credentials = self._get_credentials(account, gmail_token, gmail_secret)
+        if credentials is None:
+            raise ValueError("No Google API credentials available")
+
+        services = getattr(self._local, "services", None)
+        if services is None:
+            services = self._local.services = {}
+
+        key = (account, api, version)
+        service = services.get(key)
+        if service is None or service._http.credentials is not credentials:
+            http = counting_authorized_http(credentials, self.transfer)
+            client_options = {"api_endpoint": self.api_endpoints[api]} if api in self.api_endpoints else None
+            document = self._discovery_document(api, version)
+            if document is not None:
+                service = build_from_document(document, http=http, client_options=client_options)
+            else:
+                service = build(api, version, http=http, client_options=client_options)
+            services[key] = service
+            logger.info(f"Built {api} {version} service on thread {threading.current_thread().name}")
+        return service
+
+    def clear(self):
+        """Drop the cached credentials and the calling thread's services."""
+        with self._lock:
+            self._credentials.clear()
+        self._local.services = {}
+
+
+_default_factory: GoogleServiceFactory | None = None
+_default_factory_lock = threading.Lock()
+
+
+def set_service_factory(factory: GoogleServiceFactory):
+    """Install the process-wide service factory, e.g. one using other credentials or endpoints."""
+    global _default_factory
+    with _default_factory_lock:
+        _default_factory = factory
+
+
+def get_service_factory() -> GoogleServiceFactory:
+    """Return the process-wide service factory, loading credentials with ``gmail_tools.get_credentials``."""
+    global _default_factory
+    with _default_factory_lock:
+        if _default_factory is None:
+            from email_assistant.tools.gmail.gmail_tools import get_credentials
+
+            _default_factory = GoogleServiceFactory(get_credentials)
+        return _default_factory
@@ -20,6 +20,7 @@ async def main(
     schedule: str = "*/10 * * * *",
     graph_name: str = "email_assistant_hitl_memory_gmail",
     include_read: bool = False,
+    incremental: bool = False,
 ):
     """Set up a cron job for email ingestion"""
     # Connect to LangGraph server
@@ -38,6 +39,7 @@ async def main(
         "rerun": False,
         "early": False,
         "skip_filters": False,
+        "incremental": incremental,
     }
 
     # Register the cron job
@@ -94,6 +96,12 @@ if __name__ == "__main__":
         help="Include emails that have already been read",
     )
 
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process emails added since the previous run (Gmail historyId watermark)",
+    )
+
     args = parser.parse_args()
 
     asyncio.run(
@@ -104,5 +112,6 @@ if __name__ == "__main__":
             schedule=args.schedule,
             graph_name=args.graph_name,
             include_read=args.include_read,
+            incremental=args.incremental,
         )
     )
@@ -0,0 +1 @@
+"""Triage of incoming emails ahead of and around the LLM router."""
@@ -0,0 +1,290 @@
+"""Batch triage: classification of several emails in one structured-output LLM call.
+
+A single-email triage call re-sends the whole system prompt, background and triage instructions
+for every email. ``triage_batch`` sends them once for up to ``batch_size`` emails and asks for one
+classification per email, keyed by a short id given in the prompt. Emails missing from the answer,
+or every email of a batch whose call or parsing failed, fall back to single-email calls.
+
+``BatchTriager`` groups the emails of concurrent callers into batches, so ingestion can triage a
+burst or a backfill in batches and pass every decision with its email (``email_input["triage"]``).
+The triage router then routes on that decision without calling the LLM, see
+``pretriaged_decision``.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+from email_assistant.logger import logger
+from email_assistant.prompt_assembly import triage_system_message
+from email_assistant.prompts import (
+    batch_triage_email_prompt,
+    batch_triage_user_prompt,
+    default_triage_instructions,
+    triage_user_prompt,
+)
+from email_assistant.schemas import RouterSchema
+from email_assistant.triage.classifier import local_triage
+from email_assistant.triage.rules import (
+    CLASSIFICATIONS,
+    TRIAGE_RULES_ENABLED,
+    get_triage_rules,
+)
+
+TRIAGE_BATCH_SIZE = int(os.getenv("TRIAGE_BATCH_SIZE", "10"))
+
+# Seconds a partial batch waits for more emails before it is classified
+TRIAGE_BATCH_MAX_WAIT = float(os.getenv("TRIAGE_BATCH_MAX_WAIT", "0.5"))
+
+
+def _fields(email_input: Dict[str, Any]) -> Dict[str, str]:
+    """Return the author, recipient, subject and body of an email in the Gmail or the evaluation schema."""
+    return {
+        "author": email_input.get("from") or email_input.get("author") or "",
+        "to": email_input.get("to") or "",
+        "subject": email_input.get("subject") or "",
+        "email_thread": email_input.get("body") or email_input.get("email_thread") or "",
+    }
+
+
+def pretriaged_decision(email_input: Dict[str, Any]) -> RouterSchema | None:
+    """Return the triage decision passed with an email by batch triage, if any."""
+    triage = email_input.get("triage")
+    if not isinstance(triage, dict) or triage.get("classification") not in CLASSIFICATIONS:
+        return None
+    return RouterSchema(reasoning=triage.get("reasoning", ""), classification=triage["classification"])
+
+
+@dataclass
+class BatchTriageStats:
+    """Counters of the batch triage calls."""
+
+    emails: int = 0
+    batches: int = 0
+    batch_failures: int = 0
+    fallback_emails: int = 0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the counters as a dict."""
+        return {
+            "emails": self.emails,
+            "batches": self.batches,
+            "batch_failures": self.batch_failures,
+            "fallback_emails": self.fallback_emails,
+            "llm_calls": self.llm_calls,
+            "emails_per_call": self.emails / self.llm_calls if self.llm_calls else 0.0,
+            "llm_s": self.llm_seconds,
+        }
+
+
+class BatchTriage:
+    """Classify emails in batches with the LLM, falling back to single-email calls.
+
+    Args:
+        triage_instructions: Triage instructions of the system prompt
+        batch_size: Maximum number of emails per LLM call
+        batch_router: Structured-output model returning a ``BatchRouterSchema``, defaults to
+            ``llm_batch_router`` of the triage chain
+        router: Structured-output model returning a ``RouterSchema`` for the fallback, defaults to
+            ``llm_router`` of the triage chain
+    """
+
+    def __init__(
+        self,
+        triage_instructions: str,
+        batch_size: int = TRIAGE_BATCH_SIZE,
+        batch_router=None,
+        router=None,
+    ):
+        if batch_router is None or router is None:
+            from email_assistant.chains.triage_chain import llm_batch_router, llm_router
+
+            batch_router = batch_router or llm_batch_router
+            router = router or llm_router
+        self.batch_router = batch_router
+        self.router = router
+        self.batch_size = max(1, batch_size)
+        self.system_prompt = triage_system_message(triage_instructions)
+        self.stats = BatchTriageStats()
+
+    async def _invoke(self, model, user_prompt: str):
+        start = time.perf_counter()
+        try:
+            return await model.ainvoke(
+                [
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ]
+            )
+        finally:
+            self.stats.llm_calls += 1
+            self.stats.llm_seconds += time.perf_counter() - start
+
+    async def _classify_one(self, email_input: Dict[str, Any]) -> RouterSchema:
+        return await self._invoke(self.router, triage_user_prompt.format(**_fields(email_input)))
+
+    async def classify_batch(self, batch: Sequence[Dict[str, Any]]) -> List[RouterSchema]:
+        """Classify one batch, emails missing from the answer are classified one by one."""
+        self.stats.batches += 1
+        self.stats.emails += len(batch)
+        emails = "\n\n".join(
+            batch_triage_email_prompt.format(email_id=idx, **_fields(email_input))
+            for idx, email_input in enumerate(batch, 1)
+        )
+        try:
+            user_prompt = batch_triage_user_prompt.format(count=len(batch), emails=emails)
+            result = await self._invoke(self.batch_router, user_prompt)
+            by_id = {item.email_id.strip(): item for item in result.classifications}
+        except Exception as e:
+            self.stats.batch_failures += 1
+            logger.warning(f"Batch triage of {len(batch)} emails failed, classifying them one by one: {str(e)}")
+            by_id = {}
+
+        decisions: List[RouterSchema | None] = [
+            RouterSchema(reasoning=item.reasoning, classification=item.classification)
+            if (item := by_id.get(str(idx)))
+            else None
+            for idx in range(1, len(batch) + 1)
+        ]
+        missing = [idx for idx, decision in enumerate(decisions) if decision is None]
+        if missing:
+            self.stats.fallback_emails += len(missing)
+            fallbacks = await asyncio.gather(*(self._classify_one(batch[idx]) for idx in missing))
+            for idx, decision in zip(missing, fallbacks):
+                decisions[idx] = decision
+        return decisions
+
+    async def classify(self, email_inputs: Sequence[Dict[str, Any]]) -> List[RouterSchema]:
+        """Classify emails in batches of ``batch_size``, returning the decisions in input order."""
+        size = self.batch_size
+        batches = [email_inputs[start : start + size] for start in range(0, len(email_inputs), size)]
+        results = await asyncio.gather(*(self.classify_batch(batch) for batch in batches))
+        return [decision for batch_decisions in results for decision in batch_decisions]
+
+
+async def triage_batch(
+    email_inputs: Sequence[Dict[str, Any]],
+    triage_instructions: str,
+    batch_size: int = TRIAGE_BATCH_SIZE,
+    **routers,
+) -> Dict[str, RouterSchema]:
+    """Classify emails with one LLM call per ``batch_size`` emails.
+
+    Args:
+        email_inputs: Email inputs of the graph, in the Gmail or the evaluation schema
+        triage_instructions: Triage instructions of the system prompt
+        batch_size: Maximum number of emails per LLM call
+        **routers: ``batch_router`` and ``router`` overriding the models of the triage chain
+
+    Returns:
+        The decisions keyed by email id, or by position in ``email_inputs`` for emails without id
+    """
+    decisions = await BatchTriage(triage_instructions, batch_size, **routers).classify(email_inputs)
+    return {
+        str(email_input.get("id", idx)): decision
+        for idx, (email_input, decision) in enumerate(zip(email_inputs, decisions))
+    }
+
+
+class BatchTriager:
+    """Group the emails classified by concurrent callers into batches.
+
+    ``classify`` waits until ``batch_size`` emails are pending or the oldest one has waited
+    ``max_wait`` seconds, then classifies them in one call. Emails matched by the triage rules or
+    confidently classified by the local classifier are left to the triage router and take no place
+    in the batches.
+
+    Args:
+        triage_instructions: Triage instructions of the system prompt
+        batch_size: Maximum number of emails per LLM call
+        max_wait: Seconds a partial batch waits for more emails
+        **routers: ``batch_router`` and ``router`` overriding the models of the triage chain
+    """
+
+    def __init__(
+        self,
+        triage_instructions: str,
+        batch_size: int = TRIAGE_BATCH_SIZE,
+        max_wait: float = TRIAGE_BATCH_MAX_WAIT,
+        **routers,
+    ):
+        self.triage = BatchTriage(triage_instructions, batch_size, **routers)
+        self.max_wait = max_wait
+        self._pending: List[tuple] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set = set()
+
+    @property
+    def stats(self) -> BatchTriageStats:
+        """Return the counters of the batch triage calls."""
+        return self.triage.stats
+
+    async def classify(self, email_input: Dict[str, Any]) -> RouterSchema | None:
+        """Return the decision of one email, or None if the triage rules or the local classifier classify it."""
+        if (TRIAGE_RULES_ENABLED and get_triage_rules().match(email_input)) or local_triage(email_input):
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((email_input, future))
+        if len(self._pending) >= self.triage.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]):
+        try:
+            decisions = await self.triage.classify_batch([email_input for email_input, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), decision in zip(batch, decisions):
+            if not future.done():
+                future.set_result(decision)
+
+    async def close(self):
+        """Classify the pending emails and wait for the batches in flight."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def create_batch_triager(client, args) -> BatchTriager | None:
+    """Return the batch triager configured by the ingestion options, or None if disabled.
+
+    The triage instructions are read from the long-term memory of the LangGraph server, like the
+    triage router of the memory graphs does, and default to the default triage instructions.
+    """
+    batch_size = getattr(args, "batch_triage", 0) or 0
+    if batch_size <= 0:
+        return None
+
+    triage_instructions = default_triage_instructions
+    try:
+        item = await client.store.get_item(["email_assistant", "triage_preferences"], "user_preferences")
+        if item and isinstance(item.get("value"), str):
+            triage_instructions = item["value"]
+    except Exception as e:
+        logger.info(f"Using the default triage instructions for batch triage: {str(e)}")
+
+    return BatchTriager(
+        triage_instructions,
+        batch_size=batch_size,
+        max_wait=getattr(args, "batch_triage_wait", TRIAGE_BATCH_MAX_WAIT),
+    )
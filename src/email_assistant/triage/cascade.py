@@ -0,0 +1,204 @@
+"""Triage model cascade: cheap models first, the large model of the triage chain on escalation.
+
+Most emails are classified correctly by a small local model such as ``ollama:granite3.3:8b``. The
+cascade asks the cheap tiers first, in order, for a classification and a confidence
+(``ScoredRouterSchema``), and moves on to the next tier when a tier
+
+- fails or times out (``TRIAGE_CASCADE_TIMEOUT`` seconds),
+- returns no structured output, or one that fails validation,
+- is less confident than ``TRIAGE_CASCADE_THRESHOLD``.
+
+The last tier is the model of the triage chain (``model_name``), whose decision is final.
+
+The cheap tiers are configured with ``TRIAGE_CASCADE_MODELS``, a comma separated list of
+``provider:model`` names, for example ``ollama:granite3.3:8b``. Without it triage calls the model
+of the triage chain directly. Per-tier calls, latency and escalations are recorded in
+``triage_cascade_stats`` to tune the tiers and the threshold.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from email_assistant.logger import logger
+from email_assistant.prompt_assembly import track_prompt_cache
+from email_assistant.schemas import RouterSchema, ScoredRouterSchema
+
+TRIAGE_CASCADE_MODELS = [name.strip() for name in os.getenv("TRIAGE_CASCADE_MODELS", "").split(",") if name.strip()]
+TRIAGE_CASCADE_THRESHOLD = float(os.getenv("TRIAGE_CASCADE_THRESHOLD", "0.8"))
+TRIAGE_CASCADE_TIMEOUT = float(os.getenv("TRIAGE_CASCADE_TIMEOUT", "20"))
+
+
+@dataclass
+class CascadeTier:
+    """One model of the cascade."""
+
+    name: str
+    router: Any
+    final: bool = False
+
+
+@dataclass
+class TierStats:
+    """Calls, latency and escalations of one tier."""
+
+    calls: int = 0
+    seconds: float = 0.0
+    accepted: int = 0
+    escalations: Counter = field(default_factory=Counter)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the statistics of the tier as a dict."""
+        escalated = sum(self.escalations.values())
+        return {
+            "calls": self.calls,
+            "mean_ms": 1000 * self.seconds / self.calls if self.calls else 0.0,
+            "accepted": self.accepted,
+            "escalated": escalated,
+            "escalation_rate": escalated / self.calls if self.calls else 0.0,
+            "reasons": dict(self.escalations),
+        }
+
+
+@dataclass
+class TriageCascadeStats:
+    """Per-tier statistics of the triage cascade."""
+
+    tiers: Dict[str, TierStats] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, tier: str, seconds: float, escalation: str | None = None):
+        """Record the latency of a tier call and the reason of its escalation, if any."""
+        with self._lock:
+            stats = self.tiers.setdefault(tier, TierStats())
+            stats.calls += 1
+            stats.seconds += seconds
+            if escalation:
+                stats.escalations[escalation] += 1
+            else:
+                stats.accepted += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return the statistics of every tier as a dict."""
+        with self._lock:
+            return {tier: stats.summary() for tier, stats in self.tiers.items()}
+
+
+triage_cascade_stats = TriageCascadeStats()
+
+
+class TriageCascade:
+    """Structured-output router trying its tiers in order, a drop-in replacement of ``llm_router``.
+
+    Args:
+        tiers: Cheap tiers first, the last tier is final
+        threshold: Minimum confidence of a cheap tier's decision
+        timeout: Seconds a cheap tier has to answer
+        stats: Statistics to record the calls in
+    """
+
+    def __init__(
+        self,
+        tiers: List[CascadeTier],
+        threshold: float = TRIAGE_CASCADE_THRESHOLD,
+        timeout: float = TRIAGE_CASCADE_TIMEOUT,
+        stats: TriageCascadeStats = triage_cascade_stats,
+    ):
+        if not tiers or not tiers[-1].final:
+            raise ValueError("The last tier of the triage cascade must be final")
+        self.tiers = tiers
+        self.threshold = threshold
+        self.timeout = timeout
+        self.stats = stats
+
+    @property
+    def name(self) -> str:
+        """Name of the cascade, for the triage cache key."""
+        return " > ".join(tier.name for tier in self.tiers)
+
+    async def _try_tier(self, tier: CascadeTier, messages) -> Tuple[ScoredRouterSchema | None, str | None]:
+        """Return the result of a cheap tier and the reason to escalate, None if it is accepted."""
+        try:
+            result = await asyncio.wait_for(tier.router.ainvoke(messages), self.timeout)
+        except TimeoutError:
+            return None, "timeout"
+        except Exception as e:
+            # Malformed JSON and schema validation errors of the structured output end up here
+            logger.info(f"Triage tier {tier.name} failed: {str(e)}")
+            return None, "invalid"
+        if not isinstance(result, ScoredRouterSchema):
+            return None, "invalid"
+        if result.confidence < self.threshold:
+            return result, "low_confidence"
+        return result, None
+
+    async def ainvoke(self, messages, config=None) -> RouterSchema:
+        """Classify an email with the first tier confident in its decision."""
+        for tier in self.tiers:
+            start = time.perf_counter()
+            if tier.final:
+                try:
+                    return await tier.router.ainvoke(messages, config)
+                finally:
+                    self.stats.record(tier.name, time.perf_counter() - start)
+                    logger.info(f"Triage cascade: {self.stats.summary()}")
+
+            result, escalation = await self._try_tier(tier, messages)
+            self.stats.record(tier.name, time.perf_counter() - start, escalation)
+            if escalation is None:
+                logger.info(f"Triage tier {tier.name}: {result.classification} ({result.confidence:.2f})")
+                logger.info(f"Triage cascade: {self.stats.summary()}")
+                return RouterSchema(reasoning=result.reasoning, classification=result.classification)
+            logger.info(
+                f"Triage tier {tier.name} escalated ({escalation}"
+                f"{f', {result.classification} at {result.confidence:.2f}' if result else ''})"
+            )
+
+
+def create_triage_cascade(cheap_models: List[str], final_name: str, final_router, **kwargs) -> TriageCascade:
+    """Create a cascade of cheap models ending with the router of the triage chain.
+
+    Args:
+        cheap_models: ``provider:model`` names of the cheap tiers, in order
+        final_name: Name of the final model
+        final_router: Structured-output router of the final model
+        **kwargs: ``threshold`` and ``timeout`` of the cascade
+    """
+    from email_assistant.chains.triage_chain import init_triage_llm
+
+    tiers = [
+        CascadeTier(
+            name,
+            track_prompt_cache(init_triage_llm(name), f"triage:{name}")
+            .with_config({"tags": ["triage_decision"]})
+            .with_structured_output(ScoredRouterSchema),
+        )
+        for name in cheap_models
+    ]
+    tiers.append(CascadeTier(final_name, final_router, final=True))
+    return TriageCascade(tiers, **kwargs)
+
+
+_router = None
+
+
+def get_triage_router():
+    """Return the triage router and its name, for the triage cache key.
+
+    The router is the cascade configured by ``TRIAGE_CASCADE_MODELS``, or the router of the triage chain.
+    """
+    global _router
+    if _router is None:
+        from email_assistant.chains.triage_chain import llm_router, model_name
+
+        if TRIAGE_CASCADE_MODELS:
+            cascade = create_triage_cascade(TRIAGE_CASCADE_MODELS, model_name, llm_router)
+            logger.info(f"Triage cascade: {cascade.name}, threshold {cascade.threshold}")
+            _router = (cascade, cascade.name)
+        else:
+            _router = (llm_router, model_name)
+    return _router
@@ -0,0 +1,312 @@
+"""Local triage classifier: hashed features and a linear model, ahead of the LLM router.
+
+Most emails that reach the LLM router are easy: the same senders and the same kinds of requests
+come back every day. A multinomial logistic regression over hashed word features classifies them
+in microseconds, and only the emails it is not confident about go to the LLM.
+
+Features are hashed (CRC32) into ``TRIAGE_CLASSIFIER_FEATURES`` buckets, so the model needs no
+vocabulary and its size doesn't grow with the data:
+
+- the sender address and its domains, the number of recipients,
+- the words of the subject, with a flag for replies and forwards,
+- the words and word pairs of the normalized body.
+
+The model is trained from the triage evaluation dataset and the corrections of the user in Agent
+Inbox (see ``email_assistant.triage.corrections``) by ``python -m email_assistant.triage.train_classifier``
+and saved to ``TRIAGE_CLASSIFIER_PATH``. Without a model file the stage is skipped. A retrained
+model is picked up by running graphs on their next triage, without a restart.
+
+A prediction is used when its probability reaches ``TRIAGE_CLASSIFIER_THRESHOLD``.
+``TRIAGE_CLASSIFIER_ENABLED=false`` disables the stage. The user feedback only labels ``notify``
+emails when a notification is accepted in Agent Inbox, ignoring or responding to it labels it
+``ignore`` or ``respond``: with few ``notify`` examples the model is rarely confident about
+``notify`` and leaves these emails to the LLM, as the threshold is meant to.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import getaddresses, parseaddr
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from email_assistant import SRC_ROOT
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.normalize import normalize_email_body
+from email_assistant.triage.rules import CLASSIFICATIONS
+from email_assistant.utils import str_to_bool
+
+TRIAGE_CLASSIFIER_PATH = os.getenv("TRIAGE_CLASSIFIER_PATH", f"{SRC_ROOT}/config/triage_classifier.npz")
+TRIAGE_CLASSIFIER_ENABLED = str_to_bool(os.getenv("TRIAGE_CLASSIFIER_ENABLED", "true"))
+TRIAGE_CLASSIFIER_THRESHOLD = float(os.getenv("TRIAGE_CLASSIFIER_THRESHOLD", "0.9"))
+TRIAGE_CLASSIFIER_FEATURES = int(os.getenv("TRIAGE_CLASSIFIER_FEATURES", str(2**18)))
+
+# Version of the feature extraction, models trained with another version are refused
+FEATURES_VERSION = 1
+
+# Characters of the body used for the features
+BODY_MAX_CHARS = 4000
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'_-]*[a-z0-9]|[a-z0-9]")
+_REPLY_RE = re.compile(r"^\s*(re|fwd?|tr|aw|wg)\s*:", re.I)
+
+
+def email_tokens(email_input: Dict[str, Any]) -> List[str]:
+    """Return the feature tokens of an email.
+
+    Args:
+        email_input: Email input of the graph, in the Gmail or the evaluation schema
+    """
+    _, address = parseaddr(email_input.get("from") or email_input.get("author") or "")
+    address = address.lower()
+    tokens = [f"from:{address}"]
+    domain = address.rpartition("@")[2]
+    while "." in domain:
+        tokens.append(f"domain:{domain}")
+        domain = domain.partition(".")[2]
+
+    recipients = [a for _, a in getaddresses([email_input.get("to") or ""]) if a]
+    tokens.append(f"to:{min(len(recipients), 5)}")
+
+    subject = email_input.get("subject") or ""
+    if _REPLY_RE.match(subject):
+        tokens.append("subject:reply")
+    tokens.extend(f"s:{word}" for word in _WORD_RE.findall(subject.lower()))
+
+    body = email_input.get("body") or email_input.get("email_thread") or ""
+    words = _WORD_RE.findall(normalize_email_body(body[:BODY_MAX_CHARS]).text.lower())
+    tokens.extend(f"b:{word}" for word in words)
+    tokens.extend(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+    return tokens
+
+
+def hash_features(email_input: Dict[str, Any], n_features: int = TRIAGE_CLASSIFIER_FEATURES) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the hashed features of an email as sparse ``(indices, values)`` arrays.
+
+    Values are log-scaled counts normalized to unit length, so long emails don't outweigh short ones.
+    """
+    counts = Counter(zlib.crc32(token.encode("utf-8")) % n_features for token in email_tokens(email_input))
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    norm = np.linalg.norm(values)
+    return indices, values / norm if norm else values
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max())
+    return exp / exp.sum()
+
+
+@dataclass(frozen=True)
+class LocalPrediction:
+    """Classification of an email by the local classifier."""
+
+    classification: str
+    confidence: float
+
+    @property
+    def reasoning(self) -> str:
+        """Return the reasoning recorded with the decision."""
+        return f"Classified as {self.classification} by the local triage classifier ({self.confidence:.0%} confidence), without an LLM call."
+
+
+class TriageClassifier:
+    """Multinomial logistic regression over hashed email features.
+
+    Args:
+        weights: ``(n_features, n_classes)`` weights
+        bias: ``(n_classes,)`` bias
+        classes: Classification of every column of the weights
+        metadata: Training information saved with the model
+    """
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, classes: Sequence[str] = CLASSIFICATIONS, metadata=None):
+        self.weights = weights
+        self.bias = bias
+        self.classes = tuple(classes)
+        self.n_features = weights.shape[0]
+        self.metadata = metadata or {}
+
+    @classmethod
+    def fit(
+        cls,
+        email_inputs: Sequence[Dict[str, Any]],
+        labels: Sequence[str],
+        sample_weights: Sequence[float] | None = None,
+        n_features: int = TRIAGE_CLASSIFIER_FEATURES,
+        epochs: int = 30,
+        learning_rate: float = 1.0,
+        l2: float = 1e-4,
+        seed: int = 0,
+    ) -> "TriageClassifier":
+        """Train a classifier with stochastic gradient descent.
+
+        Classes are weighted by their inverse frequency, so the rare ``ignore`` emails are not
+        drowned by the others.
+
+        Args:
+            email_inputs: Training emails, in the Gmail or the evaluation schema
+            labels: Classification of every email
+            sample_weights: Optional weight of every email, for example to favor user corrections
+            n_features: Number of hash buckets
+            epochs: Passes over the training emails
+            learning_rate: Initial step size, decayed over the epochs
+            l2: L2 regularization of the weights seen by an update
+            seed: Seed of the shuffling of the emails
+        """
+        if len(email_inputs) != len(labels):
+            raise ValueError(f"Got {len(email_inputs)} emails but {len(labels)} labels")
+        if not email_inputs:
+            raise ValueError("Cannot train the triage classifier without emails")
+
+        classes = CLASSIFICATIONS
+        features = [hash_features(email_input, n_features) for email_input in email_inputs]
+        targets = np.array([classes.index(label) for label in labels])
+        weights = np.ones(len(targets)) if sample_weights is None else np.asarray(sample_weights, dtype=np.float64)
+        frequency = np.bincount(targets, minlength=len(classes))
+        class_weights = len(targets) / (len(classes) * np.maximum(frequency, 1))
+
+        W = np.zeros((n_features, len(classes)), dtype=np.float32)
+        b = np.zeros(len(classes), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            step = learning_rate / (1 + epoch)
+            for i in rng.permutation(len(targets)):
+                indices, values = features[i]
+                gradient = _softmax(values @ W[indices] + b)
+                gradient[targets[i]] -= 1.0
+                gradient *= step * weights[i] * class_weights[targets[i]]
+                W[indices] -= np.outer(values, gradient) + step * l2 * W[indices]
+                b -= gradient
+
+        metadata = {
+            "features_version": FEATURES_VERSION,
+            "trained_at": time.time(),
+            "examples": len(targets),
+            "class_counts": {c: int(n) for c, n in zip(classes, frequency)},
+        }
+        return cls(W, b, classes, metadata)
+
+    def predict_proba(self, email_input: Dict[str, Any]) -> Dict[str, float]:
+        """Return the probability of every classification of an email."""
+        indices, values = hash_features(email_input, self.n_features)
+        probabilities = _softmax(values @ self.weights[indices] + self.bias)
+        return {c: float(p) for c, p in zip(self.classes, probabilities)}
+
+    def predict(self, email_input: Dict[str, Any]) -> LocalPrediction:
+        """Return the most probable classification of an email."""
+        probabilities = self.predict_proba(email_input)
+        classification = max(probabilities, key=probabilities.get)
+        return LocalPrediction(classification, probabilities[classification])
+
+    def save(self, path: str):
+        """Save the model to a compressed NumPy archive."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        metadata = dict(self.metadata, classes=list(self.classes))
+        with open(path, "wb") as f:
+            np.savez_compressed(f, weights=self.weights, bias=self.bias, metadata=np.array(json.dumps(metadata)))
+
+    @classmethod
+    def load(cls, path: str) -> "TriageClassifier":
+        """Load a model saved by ``save``."""
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            if metadata.get("features_version") != FEATURES_VERSION:
+                raise ValueError(
+                    f"Triage classifier {path} was trained with features version {metadata.get('features_version')}, "
+                    f"expected {FEATURES_VERSION}: retrain it"
+                )
+            return cls(data["weights"], data["bias"], metadata.pop("classes"), metadata)
+
+
+@dataclass
+class TriageClassifierStats:
+    """Share of the emails the local classifier decided, i.e. LLM calls saved."""
+
+    evaluated: int = 0
+    seconds: float = 0.0
+    decided: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, prediction: LocalPrediction | None, seconds: float):
+        """Record the latency of a prediction and its decision, if confident."""
+        with self._lock:
+            self.evaluated += 1
+            self.seconds += seconds
+            if prediction:
+                self.decided[prediction.classification] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the statistics as a dict."""
+        with self._lock:
+            decided = sum(self.decided.values())
+            return {
+                "evaluated": self.evaluated,
+                "decided": decided,
+                "llm_calls_saved_rate": decided / self.evaluated if self.evaluated else 0.0,
+                "mean_us": 1e6 * self.seconds / self.evaluated if self.evaluated else 0.0,
+                "classifications": dict(self.decided),
+            }
+
+
+triage_classifier_stats = TriageClassifierStats()
+
+_classifier: TriageClassifier | None = None
+_classifier_mtime: float | None = None
+_classifier_lock = threading.Lock()
+
+
+def get_triage_classifier(path: str = TRIAGE_CLASSIFIER_PATH) -> TriageClassifier | None:
+    """Return the process-wide classifier, or None without a model file.
+
+    The model is reloaded when its file changes, so a retrained model is used without a restart.
+    """
+    global _classifier, _classifier_mtime
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    if mtime != _classifier_mtime:
+        with _classifier_lock:
+            if mtime != _classifier_mtime:
+                try:
+                    _classifier = TriageClassifier.load(path)
+                    logger.info(f"Loaded triage classifier {path}: {_classifier.metadata}")
+                except Exception as e:
+                    _classifier = None
+                    logger.warning(f"Could not load the triage classifier {path}: {str(e)}")
+                _classifier_mtime = mtime
+    return _classifier
+
+
+def local_triage(email_input: Dict[str, Any], threshold: float = TRIAGE_CLASSIFIER_THRESHOLD) -> LocalPrediction | None:
+    """Return the prediction of the local classifier if it is confident, otherwise None."""
+    if not TRIAGE_CLASSIFIER_ENABLED:
+        return None
+    classifier = get_triage_classifier()
+    if classifier is None:
+        return None
+    prediction = classifier.predict(email_input)
+    return prediction if prediction.confidence >= threshold else None
+
+
+def classify_locally(email_input: Dict[str, Any]) -> LocalPrediction | None:
+    """Classify an email with the local classifier, recording the outcome in ``triage_classifier_stats``."""
+    if not TRIAGE_CLASSIFIER_ENABLED or get_triage_classifier() is None:
+        return None
+    start = time.perf_counter()
+    prediction = local_triage(email_input)
+    triage_classifier_stats.record(prediction, time.perf_counter() - start)
+
+    summary = triage_classifier_stats.summary()
+    logger.info(
+        f"Triage classifier: {f'{prediction.classification} ({prediction.confidence:.2f})' if prediction else 'not confident'} - "
+        f"{summary['decided']}/{summary['evaluated']} decided ({100 * summary['llm_calls_saved_rate']:.0f}% LLM calls saved)"
+    )
+    return prediction
@@ -0,0 +1,107 @@
+"""Triage corrections made by the user in Agent Inbox, kept as labelled examples.
+
+Long-term memory turns human feedback into natural language triage preferences. The corrections
+themselves are also worth keeping: every time the user responds to an email classified as notify,
+ignores it, accepts it as a notification, or ignores a draft of the response agent, the email and
+the classification the user chose are stored in the ``TRIAGE_CORRECTIONS_NAMESPACE`` namespace of the LangGraph store. They are
+training data of the local triage classifier (``email_assistant.triage.classifier``) and the
+few-shot examples of the triage prompt (``email_assistant.triage.few_shot``).
+
+Each item is keyed by the Gmail id of the email, or a hash of its content, so a correction of the
+same email replaces the previous one.
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, List, Tuple
+
+from langgraph.store.base import BaseStore, Item
+
+from email_assistant.logger import logger
+from email_assistant.triage.rules import CLASSIFICATIONS
+
+TRIAGE_CORRECTIONS_NAMESPACE: Tuple[str, str] = ("email_assistant", "triage_corrections")
+
+# Characters of the body kept with a correction, enough for the classifier features
+CORRECTION_BODY_MAX_CHARS = 4000
+
+
+def correction_example(email_input: Dict[str, Any]) -> Dict[str, str]:
+    """Return the fields of an email kept with a correction, in the evaluation schema."""
+    return {
+        "author": email_input.get("from") or email_input.get("author") or "",
+        "to": email_input.get("to") or "",
+        "subject": email_input.get("subject") or "",
+        "email_thread": (email_input.get("body") or email_input.get("email_thread") or "")[:CORRECTION_BODY_MAX_CHARS],
+    }
+
+
+def correction_key(email_input: Dict[str, Any]) -> str:
+    """Return the store key of the correction of an email."""
+    if email_input.get("id"):
+        return str(email_input["id"])
+    digest = hashlib.sha256()
+    for value in correction_example(email_input).values():
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+async def record_triage_correction(
+    store: BaseStore, email_input: Dict[str, Any], classification: str, predicted: str | None = None
+):
+    """Store the classification the user chose for an email.
+
+    Errors are logged rather than raised: a lost correction must not fail the graph run.
+
+    Args:
+        store: LangGraph store of the graph
+        email_input: Email input of the graph, in the Gmail or the evaluation schema
+        classification: Classification chosen by the user
+        predicted: Classification of the triage router, if known
+    """
+    try:
+        if classification not in CLASSIFICATIONS:
+            raise ValueError(f"Invalid triage correction '{classification}', expected one of {CLASSIFICATIONS}")
+        value = {
+            "email_input": correction_example(email_input),
+            "classification": classification,
+            "predicted": predicted,
+            "created_at": time.time(),
+        }
+        await store.aput(TRIAGE_CORRECTIONS_NAMESPACE, correction_key(email_input), value, index=False)
+        logger.info(f"Recorded triage correction: {predicted or 'unknown'} -> {classification}")
+    except Exception as e:
+        logger.warning(f"Could not record the triage correction: {str(e)}")
+
+
+def _valid(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("classification") in CLASSIFICATIONS and isinstance(value.get("email_input"), dict)
+
+
+async def search_triage_corrections(store: BaseStore, page_size: int = 500, limit: int = 100_000) -> List[Item]:
+    """Return the stored correction items of a LangGraph store, oldest first."""
+    items: List[Item] = []
+    while len(items) < limit:
+        page = await store.asearch(TRIAGE_CORRECTIONS_NAMESPACE, limit=page_size, offset=len(items))
+        items.extend(page)
+        if len(page) < page_size:
+            break
+    return sorted((item for item in items if _valid(item.value)), key=lambda item: item.value.get("created_at", 0))
+
+
+async def load_triage_corrections(store: BaseStore, page_size: int = 500, limit: int = 100_000) -> List[Dict[str, Any]]:
+    """Return the stored corrections of a LangGraph store, oldest first."""
+    return [item.value for item in await search_triage_corrections(store, page_size, limit)]
+
+
+async def fetch_triage_corrections(client, page_size: int = 500, limit: int = 100_000) -> List[Dict[str, Any]]:
+    """Return the stored corrections of a LangGraph server through its SDK client, oldest first."""
+    corrections: List[Dict[str, Any]] = []
+    while len(corrections) < limit:
+        response = await client.store.search_items(list(TRIAGE_CORRECTIONS_NAMESPACE), limit=page_size, offset=len(corrections))
+        items = response.get("items", [])
+        corrections.extend(item["value"] for item in items)
+        if len(items) < page_size:
+            break
+    return sorted((value for value in corrections if _valid(value)), key=lambda value: value.get("created_at", 0))
@@ -0,0 +1,304 @@
+"""Few-shot examples of the triage prompt, retrieved by embedding similarity from the user corrections.
+
+Long-term memory folds every triage correction into the ``triage_preferences`` text, which grows
+with every correction and is sent in full with every email. With ``TRIAGE_FEW_SHOT=true`` the
+triage router keeps the default triage instructions and adds to the prompt the ``TRIAGE_FEW_SHOT_K``
+corrections most similar to the email instead, and the interrupt handlers only record corrections
+(see ``email_assistant.triage.corrections``) without updating the triage preferences.
+
+Corrections are embedded with ``TRIAGE_EMBEDDINGS_MODEL``: ``hashing`` (default), a local signed
+feature hashing of the words and word pairs that needs no model, or a ``provider:model`` name of
+``init_embeddings`` such as ``openai:text-embedding-3-small`` or ``ollama:nomic-embed-text``.
+Embeddings are kept in the correction items of the store, so they are computed once per correction
+and model, and in an LRU cache of the process for the emails being triaged.
+
+``TriageExampleIndex`` is a brute-force NumPy index of the normalized embeddings: a search is one
+matrix-vector product and a partial sort, about 2 ms for 10k and 40 ms for 100k corrections of
+1024 dimensions. The index of a store is rebuilt from the store every
+``TRIAGE_FEW_SHOT_REFRESH_SECONDS``.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from langgraph.store.base import BaseStore
+
+from email_assistant.logger import logger
+from email_assistant.tools.gmail.normalize import normalize_email_body
+from email_assistant.triage.corrections import (
+    TRIAGE_CORRECTIONS_NAMESPACE,
+    search_triage_corrections,
+)
+from email_assistant.utils import str_to_bool
+
+TRIAGE_FEW_SHOT = str_to_bool(os.getenv("TRIAGE_FEW_SHOT", "false"))
+TRIAGE_FEW_SHOT_K = int(os.getenv("TRIAGE_FEW_SHOT_K", "5"))
+TRIAGE_FEW_SHOT_REFRESH_SECONDS = float(os.getenv("TRIAGE_FEW_SHOT_REFRESH_SECONDS", "300"))
+TRIAGE_EMBEDDINGS_MODEL = os.getenv("TRIAGE_EMBEDDINGS_MODEL", "hashing")
+
+# Number of email embeddings kept in memory, 0 disables the cache
+TRIAGE_EMBEDDING_CACHE_SIZE = int(os.getenv("TRIAGE_EMBEDDING_CACHE_SIZE", "2048"))
+
+# Dimensions of the ``hashing`` embeddings
+HASHING_DIMENSIONS = 1024
+
+# Characters of the body embedded with the sender and subject
+EMBEDDING_BODY_MAX_CHARS = 2000
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'_-]*[a-z0-9]|[a-z0-9]")
+
+
+def embedding_text(email_input: Dict[str, Any]) -> str:
+    """Return the text embedded for an email in the Gmail or the evaluation schema."""
+    body = email_input.get("body") or email_input.get("email_thread") or ""
+    return (
+        f"From: {email_input.get('from') or email_input.get('author') or ''}\n"
+        f"Subject: {email_input.get('subject') or ''}\n\n"
+        f"{normalize_email_body(body[:EMBEDDING_BODY_MAX_CHARS]).text}"
+    )
+
+
+class HashingEmbeddings:
+    """Embeddings computed locally by signed feature hashing of the words and word pairs of a text.
+
+    Args:
+        dimensions: Dimensions of the embeddings
+    """
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        words = _WORD_RE.findall(text.lower())
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in words + [f"{first} {second}" for first, second in zip(words, words[1:])]:
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts by feature hashing."""
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query by feature hashing."""
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts by feature hashing."""
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query by feature hashing."""
+        return self._embed(text)
+
+
+def init_triage_embeddings(name: str = TRIAGE_EMBEDDINGS_MODEL):
+    """Return the embeddings model of a ``TRIAGE_EMBEDDINGS_MODEL`` name."""
+    if name == "hashing":
+        return HashingEmbeddings()
+    from langchain.embeddings import init_embeddings
+
+    return init_embeddings(name)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingCache:
+    """LRU cache of normalized embeddings keyed by the hash of the text and the model.
+
+    Args:
+        embeddings: Embeddings model
+        model: Name of the model, part of the keys
+        maxsize: Number of embeddings kept, 0 disables the cache
+    """
+
+    def __init__(self, embeddings, model: str, maxsize: int = TRIAGE_EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.model = model
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[str, bytes], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> Tuple[str, bytes]:
+        return self.model, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the normalized embeddings of texts, computing the missing ones in one call."""
+        vectors: List[np.ndarray | None] = [None] * len(texts)
+        with self._lock:
+            for idx, text in enumerate(texts):
+                key = self._key(text)
+                if self.maxsize > 0 and key in self._entries:
+                    self._entries.move_to_end(key)
+                    vectors[idx] = self._entries[key]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        missing = [idx for idx, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = _normalize(np.asarray(await self.embeddings.aembed_documents([texts[i] for i in missing]), dtype=np.float32))
+            with self._lock:
+                for idx, vector in zip(missing, computed):
+                    vectors[idx] = vector
+                    if self.maxsize > 0:
+                        self._entries[self._key(texts[idx])] = vector
+                        if len(self._entries) > self.maxsize:
+                            self._entries.popitem(last=False)
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def info(self) -> Dict[str, Any]:
+        """Return the cache metrics as a dict."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+@dataclass
+class FewShotExample:
+    """A past correction similar to the email being triaged."""
+
+    email_input: Dict[str, Any]
+    original: str | None
+    correct: str
+    score: float
+
+    @property
+    def value(self) -> str:
+        """Text of the example in the format of ``utils.format_few_shot_examples``, which adds the ``Email:`` label."""
+        email = self.email_input
+        return (
+            f"{{'author': {email.get('author', '')!r}, 'subject': {email.get('subject', '')!r}, "
+            f"'email_thread': {email.get('email_thread', '')[:500]!r}}} "
+            f"Original routing: {self.original or 'unknown'} Correct routing: {self.correct}"
+        )
+
+
+class TriageExampleIndex:
+    """Brute-force cosine similarity index of normalized embeddings.
+
+    Args:
+        dimensions: Dimensions of the embeddings
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.examples: List[Dict[str, Any]] = []
+        self._matrix = np.zeros((0, dimensions), dtype=np.float32)
+
+    def __len__(self) -> int:
+        """Return the number of indexed examples."""
+        return len(self.examples)
+
+    def build(self, vectors: np.ndarray, examples: List[Dict[str, Any]]):
+        """Replace the content of the index by normalized ``vectors`` and their examples."""
+        if len(vectors) != len(examples):
+            raise ValueError(f"Got {len(vectors)} vectors but {len(examples)} examples")
+        self._matrix = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(examples), self.dimensions)
+        self.examples = list(examples)
+
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return the ``k`` examples most similar to a normalized vector, most similar first."""
+        if not self.examples or k <= 0:
+            return []
+        scores = self._matrix @ vector
+        if k < len(scores):
+            top = np.argpartition(-scores, k)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return [(float(scores[i]), self.examples[i]) for i in top]
+
+
+class TriageFewShot:
+    """Few-shot examples of the triage of a LangGraph store.
+
+    Args:
+        store: LangGraph store holding the triage corrections
+        model: ``TRIAGE_EMBEDDINGS_MODEL`` name of the embeddings
+        k: Number of examples retrieved
+        refresh_seconds: Age of the index after which it is rebuilt from the store
+    """
+
+    def __init__(
+        self,
+        store: BaseStore,
+        model: str = TRIAGE_EMBEDDINGS_MODEL,
+        k: int = TRIAGE_FEW_SHOT_K,
+        refresh_seconds: float = TRIAGE_FEW_SHOT_REFRESH_SECONDS,
+    ):
+        self.store = store
+        self.model = model
+        self.k = k
+        self.refresh_seconds = refresh_seconds
+        self.cache = EmbeddingCache(init_triage_embeddings(model), model)
+        self.index: TriageExampleIndex | None = None
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        """Rebuild the index from the store, embedding and saving the corrections without embedding."""
+        items = await search_triage_corrections(self.store)
+        stale = [item for item in items if (item.value.get("embedding") or {}).get("model") != self.model]
+        if stale:
+            vectors = await self.cache.embed([embedding_text(item.value["email_input"]) for item in stale])
+            for item, vector in zip(stale, vectors):
+                item.value["embedding"] = {"model": self.model, "vector": vector.tolist()}
+                await self.store.aput(TRIAGE_CORRECTIONS_NAMESPACE, item.key, item.value, index=False)
+
+        if items:
+            vectors = np.asarray([item.value["embedding"]["vector"] for item in items], dtype=np.float32)
+            index = TriageExampleIndex(vectors.shape[1])
+            index.build(vectors, [{k: v for k, v in item.value.items() if k != "embedding"} for item in items])
+        else:
+            index = None
+        self.index = index
+        self._built_at = time.monotonic()
+        logger.info(f"Triage few-shot index: {len(items)} corrections, {len(stale)} embedded")
+
+    async def examples(self, email_input: Dict[str, Any]) -> List[FewShotExample]:
+        """Return the corrections most similar to an email."""
+        async with self._lock:
+            if self.index is None or time.monotonic() - self._built_at > self.refresh_seconds:
+                await self.refresh()
+        if self.index is None:
+            return []
+        vector = (await self.cache.embed([embedding_text(email_input)]))[0]
+        return [
+            FewShotExample(value["email_input"], value.get("predicted"), value["classification"], score)
+            for score, value in self.index.search(vector, self.k)
+        ]
+
+
+_few_shots: Dict[int, TriageFewShot] = {}
+
+
+async def triage_few_shot_examples(store: BaseStore, email_input: Dict[str, Any]) -> List[FewShotExample]:
+    """Return the few-shot examples of an email from the corrections of a store, none on errors."""
+    try:
+        few_shot = _few_shots.get(id(store))
+        if few_shot is None:
+            few_shot = _few_shots[id(store)] = TriageFewShot(store)
+        start = time.perf_counter()
+        examples = await few_shot.examples(email_input)
+        logger.info(
+            f"Triage few-shot: {len(examples)} examples in {1000 * (time.perf_counter() - start):.1f} ms, "
+            f"embedding cache {few_shot.cache.info()}"
+        )
+        return examples
+    except Exception as e:
+        logger.warning(f"Could not retrieve the triage few-shot examples: {str(e)}")
+        return []
@@ -0,0 +1,247 @@
+"""Deterministic triage of emails by sender and header rules, ahead of the LLM router.
+
+Newsletters, bulk mail and automated notifications make up a large share of an inbox and their
+classification doesn't need a model: their senders and headers (``List-Unsubscribe``,
+``Precedence: bulk``, ``Auto-Submitted``) give it away. ``TriageRules.match`` checks an email input
+against, in order:
+
+1. exact sender addresses,
+2. sender domains, a rule for ``example.com`` also matching its subdomains,
+3. header rules, a regular expression on the value of a header.
+
+The first match decides the classification and the triage router skips the LLM call. Rules are
+loaded from the JSON file of ``TRIAGE_RULES_PATH``::
+
+    {
+        "senders": {"ceo@company.com": "respond"},
+        "domains": {"github.com": "notify", "news.example.com": "ignore"},
+        "headers": [{"name": "Precedence", "pattern": "^(bulk|junk)$", "classification": "ignore"}]
+    }
+
+Without a file, or for the sections missing from it, the defaults below apply. They only route to
+``notify``, never to ``ignore``: ``notify`` decisions still interrupt the HITL graph, where the user
+can override them, while ``ignore`` ends the run before any preference or correction applies.
+Mailing list headers don't make an email ignorable on their own, company announcements and HR or
+renewal reminders carry them too and are notify emails in the default triage instructions, so
+rules ignoring ``List-Unsubscribe`` or ``Precedence: bulk`` emails have to be set explicitly in a
+``TRIAGE_RULES_PATH`` file. ``TRIAGE_RULES_ENABLED=false`` disables the rules.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import parseaddr
+from typing import Any, Dict, Iterable, List
+
+from email_assistant.logger import logger
+from email_assistant.utils import str_to_bool
+
+CLASSIFICATIONS = ("ignore", "respond", "notify")
+
+TRIAGE_RULES_PATH = os.getenv("TRIAGE_RULES_PATH")
+TRIAGE_RULES_ENABLED = str_to_bool(os.getenv("TRIAGE_RULES_ENABLED", "true"))
+
+# Headers kept with the email for the triage rules, see ``select_triage_headers``
+TRIAGE_HEADERS = (
+    "List-Unsubscribe",
+    "List-Id",
+    "Precedence",
+    "Auto-Submitted",
+    "X-Auto-Response-Suppress",
+    "Sender",
+)
+
+DEFAULT_SENDER_RULES: Dict[str, str] = {"notifications@github.com": "notify"}
+DEFAULT_DOMAIN_RULES: Dict[str, str] = {}
+DEFAULT_HEADER_RULES: List[Dict[str, str]] = [
+    # Notifications sent by a system rather than a person: build results, monitoring, out of office
+    {"name": "Auto-Submitted", "pattern": r"^auto-(generated|replied|notified)", "classification": "notify"},
+]
+
+
+@dataclass(frozen=True)
+class HeaderRule:
+    """Classify emails whose header ``name`` matches ``pattern``, case-insensitively."""
+
+    name: str
+    pattern: str
+    classification: str
+
+    def __post_init__(self):
+        """Compile the pattern, case-insensitively."""
+        object.__setattr__(self, "_regex", re.compile(self.pattern, re.I))
+
+    def matches(self, value: str) -> bool:
+        """Return whether the pattern matches the stripped value."""
+        return bool(self._regex.search(value.strip()))
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    """Rule that decided the classification of an email."""
+
+    rule: str
+    classification: str
+
+    @property
+    def reasoning(self) -> str:
+        """Return the reasoning recorded with the decision."""
+        return f"Classified as {self.classification} by the triage rule {self.rule}, without an LLM call."
+
+
+def _check_classification(classification: str, rule: str) -> str:
+    if classification not in CLASSIFICATIONS:
+        raise ValueError(f"Invalid classification '{classification}' of triage rule {rule}, expected one of {CLASSIFICATIONS}")
+    return classification
+
+
+def select_triage_headers(headers: Iterable[Dict[str, str]]) -> Dict[str, str]:
+    """Return the ``TRIAGE_HEADERS`` present in a list of Gmail API ``{"name", "value"}`` headers."""
+    wanted = {name.lower(): name for name in TRIAGE_HEADERS}
+    return {wanted[h["name"].lower()]: h.get("value", "") for h in headers if h.get("name", "").lower() in wanted}
+
+
+class TriageRules:
+    """Sender, domain and header rules classifying emails without the LLM.
+
+    Args:
+        senders: Classification of exact sender addresses
+        domains: Classification of sender domains and their subdomains
+        headers: Header rules, checked in order
+    """
+
+    def __init__(
+        self,
+        senders: Dict[str, str] | None = None,
+        domains: Dict[str, str] | None = None,
+        headers: List[Dict[str, str]] | None = None,
+    ):
+        self.senders = {
+            address.lower(): _check_classification(classification, f"sender:{address}")
+            for address, classification in (senders or {}).items()
+        }
+        self.domains = {
+            domain.lower().lstrip("@."): _check_classification(classification, f"domain:{domain}")
+            for domain, classification in (domains or {}).items()
+        }
+        self.headers = [
+            HeaderRule(rule["name"], rule["pattern"], _check_classification(rule["classification"], f"header:{rule['name']}"))
+            for rule in headers or []
+        ]
+
+    @classmethod
+    def defaults(cls) -> "TriageRules":
+        """Return the default rules."""
+        return cls(DEFAULT_SENDER_RULES, DEFAULT_DOMAIN_RULES, DEFAULT_HEADER_RULES)
+
+    @classmethod
+    def load(cls, path: str) -> "TriageRules":
+        """Load rules from a JSON file, the missing sections keep their defaults."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            data.get("senders", DEFAULT_SENDER_RULES),
+            data.get("domains", DEFAULT_DOMAIN_RULES),
+            data.get("headers", DEFAULT_HEADER_RULES),
+        )
+
+    def match(self, email_input: Dict[str, Any]) -> RuleMatch | None:
+        """Return the first rule matching an email, or None if the LLM has to classify it.
+
+        Args:
+            email_input: Email input of the graph, in the Gmail (``from``, ``headers``) or the
+                evaluation (``author``) schema
+        """
+        _, address = parseaddr(email_input.get("from") or email_input.get("author") or "")
+        address = address.lower()
+
+        if address in self.senders:
+            return RuleMatch(f"sender:{address}", self.senders[address])
+
+        domain = address.rpartition("@")[2]
+        while domain:
+            if domain in self.domains:
+                return RuleMatch(f"domain:{domain}", self.domains[domain])
+            domain = domain.partition(".")[2]
+
+        headers = {name.lower(): value for name, value in (email_input.get("headers") or {}).items()}
+        for rule in self.headers:
+            value = headers.get(rule.name.lower())
+            if value is not None and rule.matches(value):
+                return RuleMatch(f"header:{rule.name}", rule.classification)
+        return None
+
+
+@dataclass
+class TriageRuleStats:
+    """Rule hit rate of the triage router and LLM latency saved by the hits."""
+
+    evaluated: int = 0
+    rule_seconds: float = 0.0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    hits: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_match(self, match: RuleMatch | None, seconds: float):
+        """Record the latency of a rules evaluation and the rule that matched, if any."""
+        with self._lock:
+            self.evaluated += 1
+            self.rule_seconds += seconds
+            if match:
+                self.hits[match.rule] += 1
+
+    def record_llm(self, seconds: float):
+        """Record the latency of an LLM triage call."""
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the statistics as a dict, the latency saved assumes the mean LLM triage latency."""
+        with self._lock:
+            hits = sum(self.hits.values())
+            mean_llm = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+            return {
+                "evaluated": self.evaluated,
+                "hits": hits,
+                "hit_rate": hits / self.evaluated if self.evaluated else 0.0,
+                "mean_rule_us": 1e6 * self.rule_seconds / self.evaluated if self.evaluated else 0.0,
+                "llm_calls": self.llm_calls,
+                "mean_llm_ms": 1000 * mean_llm,
+                "latency_saved_s": hits * mean_llm,
+                "rules": dict(self.hits),
+            }
+
+
+_rules: TriageRules | None = None
+triage_rule_stats = TriageRuleStats()
+
+
+def get_triage_rules() -> TriageRules:
+    """Return the process-wide rules, loaded from ``TRIAGE_RULES_PATH`` on first use."""
+    global _rules
+    if _rules is None:
+        _rules = TriageRules.load(TRIAGE_RULES_PATH) if TRIAGE_RULES_PATH else TriageRules.defaults()
+    return _rules
+
+
+def match_triage_rules(email_input: Dict[str, Any]) -> RuleMatch | None:
+    """Match an email against the configured rules, recording the outcome in ``triage_rule_stats``."""
+    if not TRIAGE_RULES_ENABLED:
+        return None
+    start = time.perf_counter()
+    match = get_triage_rules().match(email_input)
+    triage_rule_stats.record_match(match, time.perf_counter() - start)
+
+    summary = triage_rule_stats.summary()
+    logger.info(
+        f"Triage rules: {'matched ' + match.rule if match else 'no match'} - "
+        f"{summary['hits']}/{summary['evaluated']} hits ({100 * summary['hit_rate']:.0f}%), "
+        f"~{summary['latency_saved_s']:.1f}s of LLM latency saved"
+    )
+    return match
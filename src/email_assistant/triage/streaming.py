@@ -0,0 +1,144 @@
+"""Early-exit streaming triage: route as soon as the classification has been generated.
+
+``RouterSchema`` asks for the reasoning before the classification, so the triage router waits for
+the whole reasoning to be generated before it can route. In streaming mode the router asks for a
+``StreamingRouterSchema`` instead, classification first, streams the structured output and returns
+as soon as a partial output holds a valid classification. The labels are not prefixes of each other
+and partial outputs are validated against the ``Literal`` of the schema, so a label is only
+accepted once it is complete.
+
+``TRIAGE_STREAMING`` selects the mode:
+
+- ``off`` (default): the blocking ``llm_router`` call, reasoning first;
+- ``background``: the router routes on the label and the rest of the stream, the reasoning, is
+  consumed by a background task and logged for audit;
+- ``label``: the stream is closed after the label, the reasoning is never generated.
+
+When the stream ends without a classification, the triage router falls back to the blocking
+``llm_router`` call. Streamed decisions hold a partial reasoning, or none in ``label`` mode, so the
+triage cache keys them by streaming mode, apart from the blocking decisions.
+
+Streaming is not combined with the triage cascade (``TRIAGE_CASCADE_MODELS``), whose tiers need the
+whole answer for its confidence. The time to decision of every LLM triage is recorded per mode in
+``triage_decision_stats``, ``off`` being the blocking call.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set
+
+import numpy as np
+
+from email_assistant.logger import logger
+from email_assistant.schemas import RouterSchema
+from email_assistant.triage.rules import CLASSIFICATIONS
+
+STREAMING_MODES = ("off", "background", "label")
+
+TRIAGE_STREAMING = os.getenv("TRIAGE_STREAMING", "off")
+if TRIAGE_STREAMING not in STREAMING_MODES:
+    raise ValueError(f"Invalid TRIAGE_STREAMING '{TRIAGE_STREAMING}', expected one of {STREAMING_MODES}")
+
+
+@dataclass
+class TriageDecisionStats:
+    """Time to decision of the LLM triage, per mode."""
+
+    samples: Dict[str, List[float]] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, mode: str, seconds: float):
+        """Record the time to decision of one triage in a mode."""
+        with self._lock:
+            self.samples.setdefault(mode, []).append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return the count and the p50, p90 and p99 time to decision in ms of every mode."""
+        with self._lock:
+            samples = {mode: list(values) for mode, values in self.samples.items()}
+        return {
+            mode: {
+                "count": len(values),
+                **{f"p{q}_ms": 1000 * float(np.percentile(values, q)) for q in (50, 90, 99)},
+            }
+            for mode, values in samples.items()
+        }
+
+
+triage_decision_stats = TriageDecisionStats()
+
+# Background tasks finishing the reasoning, referenced until done
+_background: Set[asyncio.Task] = set()
+
+
+def get_streaming_router():
+    """Return the streaming router of the triage chain, or None when streaming is off or a cascade is configured."""
+    from email_assistant.triage.cascade import TRIAGE_CASCADE_MODELS
+
+    if TRIAGE_STREAMING == "off" or TRIAGE_CASCADE_MODELS:
+        return None
+    from email_assistant.chains.triage_chain import llm_streaming_router
+
+    return llm_streaming_router
+
+
+def _classification(chunk: Any) -> str | None:
+    value = chunk.get("classification") if isinstance(chunk, dict) else getattr(chunk, "classification", None)
+    return value if value in CLASSIFICATIONS else None
+
+
+def _reasoning(chunk: Any) -> str:
+    value = chunk.get("reasoning") if isinstance(chunk, dict) else getattr(chunk, "reasoning", None)
+    return value or ""
+
+
+async def _finish_reasoning(stream, classification: str, last: Any, start: float):
+    """Consume the rest of the stream and log the reasoning of a decision already routed."""
+    try:
+        async for chunk in stream:
+            last = chunk
+        logger.info(
+            f"Triage reasoning for {classification} ({time.perf_counter() - start:.2f}s after the call): {_reasoning(last)}"
+        )
+    except Exception as e:
+        logger.warning(f"Could not finish the triage reasoning: {str(e)}")
+
+
+async def wait_background_reasoning():
+    """Wait for the reasoning of the decisions already routed to be finished."""
+    await asyncio.gather(*_background)
+
+
+async def stream_triage(router, messages, mode: str = TRIAGE_STREAMING) -> RouterSchema:
+    """Classify an email with a streaming router, returning as soon as the classification has parsed.
+
+    Args:
+        router: Structured-output model returning a ``StreamingRouterSchema``
+        messages: Messages of the triage prompt
+        mode: ``background`` to finish the reasoning in a background task, ``label`` to stop after
+            the classification
+
+    Returns:
+        The decision, with the reasoning generated so far
+
+    Raises:
+        ValueError: If the stream ends without a classification
+    """
+    start = time.perf_counter()
+    stream = router.astream(messages).__aiter__()
+    async for chunk in stream:
+        classification = _classification(chunk)
+        if classification is None:
+            continue
+        logger.info(f"Triage decision {classification} streamed after {1000 * (time.perf_counter() - start):.0f} ms")
+        if mode == "label":
+            await stream.aclose()
+        else:
+            task = asyncio.create_task(_finish_reasoning(stream, classification, chunk, start))
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+        return RouterSchema(reasoning=_reasoning(chunk), classification=classification)
+    raise ValueError("The triage stream ended without a classification")
@@ -0,0 +1,82 @@
+"""Train or refresh the local triage classifier.
+
+The classifier is trained from the triage evaluation dataset and, with ``--url``, the triage
+corrections stored on the LangGraph server. Corrections carry the preferences of the user, so they
+weigh ``--correction-weight`` times a dataset email and replace the dataset label of the same email.
+Running graphs pick up the new model on their next triage.
+
+Usage:
+    python -m email_assistant.triage.train_classifier --url http://127.0.0.1:2024
+"""
+
+import argparse
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+from langgraph_sdk import get_client
+
+from email_assistant.eval.email_dataset import examples_triage
+from email_assistant.triage.classifier import (
+    TRIAGE_CLASSIFIER_FEATURES,
+    TRIAGE_CLASSIFIER_PATH,
+    TRIAGE_CLASSIFIER_THRESHOLD,
+    TriageClassifier,
+)
+from email_assistant.triage.corrections import correction_key, fetch_triage_corrections
+
+
+def training_set(
+    corrections: List[Dict[str, Any]], use_dataset: bool = True, correction_weight: float = 3.0
+) -> Tuple[List[Dict[str, Any]], List[str], List[float]]:
+    """Return the emails, labels and sample weights of the dataset and the corrections."""
+    examples: Dict[str, Tuple[Dict[str, Any], str, float]] = {}
+    if use_dataset:
+        for example in examples_triage:
+            email_input = example["inputs"]["email_input"]
+            examples[correction_key(email_input)] = (email_input, example["outputs"]["classification"], 1.0)
+    for correction in corrections:
+        email_input = correction["email_input"]
+        examples[correction_key(email_input)] = (email_input, correction["classification"], correction_weight)
+
+    email_inputs, labels, weights = zip(*examples.values()) if examples else ((), (), ())
+    return list(email_inputs), list(labels), list(weights)
+
+
+async def main():
+    """Train the classifier from the command line."""
+    parser = argparse.ArgumentParser(description="Train the local triage classifier")
+    parser.add_argument("--url", type=str, default=None, help="LangGraph deployment to read the triage corrections from")
+    parser.add_argument("--output", type=str, default=TRIAGE_CLASSIFIER_PATH, help="Path of the model file")
+    parser.add_argument("--no-dataset", action="store_true", help="Train on the corrections only")
+    parser.add_argument("--correction-weight", type=float, default=3.0, help="Weight of a correction")
+    parser.add_argument("--features", type=int, default=TRIAGE_CLASSIFIER_FEATURES, help="Number of hash buckets")
+    parser.add_argument("--epochs", type=int, default=30, help="Training epochs")
+    parser.add_argument("--threshold", type=float, default=TRIAGE_CLASSIFIER_THRESHOLD, help="Confidence threshold")
+    args = parser.parse_args()
+
+    corrections = []
+    if args.url:
+        corrections = await fetch_triage_corrections(get_client(url=args.url))
+        print(f"Fetched {len(corrections)} triage corrections from {args.url}")
+
+    email_inputs, labels, weights = training_set(corrections, not args.no_dataset, args.correction_weight)
+    classifier = TriageClassifier.fit(
+        email_inputs, labels, sample_weights=weights, n_features=args.features, epochs=args.epochs
+    )
+    classifier.metadata["corrections"] = len(corrections)
+
+    predictions = [classifier.predict(email_input) for email_input in email_inputs]
+    confident = [(p, label) for p, label in zip(predictions, labels) if p.confidence >= args.threshold]
+    agree = sum(p.classification == label for p, label in confident)
+    print(f"Trained on {len(labels)} emails: {classifier.metadata['class_counts']}")
+    print(
+        f"Training set: {len(confident)}/{len(labels)} above {args.threshold} confidence, "
+        f"{agree}/{len(confident)} agreeing with their label"
+    )
+
+    classifier.save(args.output)
+    print(f"Saved triage classifier to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,7 @@
 import json
 from typing import Any, List
 
-import html2text
+from email_assistant.html_text import html_to_text, is_html
 
 
 def format_email_markdown(subject, author, to, email_thread, email_id=None):
@@ -28,7 +28,7 @@ def format_email_markdown(subject, author, to, email_thread, email_id=None):
 """  # noqa E221
 
 
-def format_gmail_markdown(subject, author, to, email_thread, email_id=None):
+def format_gmail_markdown(subject, author, to, email_thread, email_id=None, html_backend=None):
     """Format Gmail email details into a nicely formatted markdown string for display,
     with HTML to text conversion for HTML content
 
@@ -38,19 +38,13 @@ def format_gmail_markdown(subject, author, to, email_thread, email_id=None):
         to: Email recipient
         email_thread: Email content (possibly HTML)
         email_id: Optional email ID (for Gmail API)
+        html_backend: Optional HTML to text backend, defaults to ``HTML_TO_TEXT_BACKEND``
     """
     id_section = f"\n**ID**: {email_id}" if email_id else ""
 
-    # Check if email_thread is HTML content and convert to text if needed
-    if email_thread and (
-        email_thread.strip().startswith("<!DOCTYPE") or email_thread.strip().startswith("<html") or "<body" in email_thread
-    ):
-        # Convert HTML to markdown text
-        h = html2text.HTML2Text()
-        h.ignore_links = False
-        h.ignore_images = True
-        h.body_width = 0  # Don't wrap text
-        email_thread = h.handle(email_thread)
+    # Convert HTML content to markdown text, conversions are cached across nodes
+    if is_html(email_thread):
+        email_thread = html_to_text(email_thread, backend=html_backend)
 
     return f"""
 